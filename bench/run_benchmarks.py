@@ -0,0 +1,286 @@
+from typing import (
+    Any, Callable, Dict, List, Optional, Tuple
+)
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from src.data_model import CompatibilityScoreMark
+from src.data_reader import AcListerVillagerDataReader
+from src.utils import (
+    get_villager_data_path, get_personality_compatibility_data_path, get_star_sign_by_birthday,
+    calc_villager_compatibility, evaluate_compatibility, calculate_compatibility_matrix
+)
+
+# Bump when the meaning of the numbers changes, results of different versions aren't comparable
+RESULT_FORMAT_VERSION = 1
+
+
+class Benchmark:
+    """
+    One timed stage. setup() is run once, untimed, and returns the zero argument callable that is timed; `ops` is
+    how many operations (lookups, pairs, cells...) one call performs, to report a per operation time.
+    """
+
+    def __init__(self, name, params, setup, ops):
+        # type: (str, Dict[str, Any], Callable[[], Callable[[], Any]], int) -> None
+        self.name = name
+        self.params = params
+        self.setup = setup
+        self.ops = ops
+
+    @property
+    def key(self):
+        # type: () -> str
+        return self.name + "".join("[{}={}]".format(k, v) for k, v in sorted(self.params.items()))
+
+
+def measure(func, min_time=0.2, repeat=5):
+    # type: (Callable[[], Any], float, int) -> Dict[str, Any]
+    """
+    timeit style: find how many calls take at least min_time, time `repeat` batches of that many calls, then run
+    one more call under tracemalloc for its peak memory. A call slower than min_time is only timed once.
+    """
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    timings = [elapsed / number]
+    for _ in range(repeat - 1 if number > 1 else 0):
+        gc.collect()
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started) / number)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "number": number,
+        "repeat": len(timings),
+        "best": min(timings),
+        "median": statistics.median(timings),
+        "peak_memory": peak_memory,
+    }
+
+
+def _silently(func, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+
+def collect_benchmarks(work_dir, synthetic_sizes=(2000,)):
+    # type: (str, Tuple[int, ...]) -> List[Benchmark]
+    from src.compatibility_caculator import print_villager_compatibility
+    from src.compatibility_matrix import RosterCompatibilityMatrix
+    from src.roster_snapshot import compile_snapshot
+    from bench.synthetic_roster import write_roster
+
+    benchmarks = []  # type: List[Benchmark]
+    data_src = AcListerVillagerDataReader(use_snapshot=False)
+    villager_ids = data_src.get_all_villager_ids()
+    complete_ids = [
+        v for v in villager_ids
+        if calc_villager_compatibility(data_src.get_data_by_villager_id(v), data_src.get_data_by_villager_id(v))
+    ]
+
+    snapshot_loc = compile_snapshot(get_villager_data_path(), get_personality_compatibility_data_path(),
+                                    os.path.join(work_dir, "villager.snapshot"))
+    benchmarks.append(Benchmark(
+        "reader_construction", {"roster": "real", "source": "json"},
+        lambda: lambda: AcListerVillagerDataReader(use_snapshot=False), 1
+    ))
+    benchmarks.append(Benchmark(
+        "reader_construction", {"roster": "real", "source": "snapshot"},
+        lambda: lambda: AcListerVillagerDataReader(snapshot_loc=snapshot_loc), 1
+    ))
+
+    def lookup_all(reader):
+        return lambda: [reader.get_data_by_villager_id(v) for v in villager_ids]
+
+    benchmarks.append(Benchmark(
+        "get_data_by_villager_id", {"cache": "warm"},
+        lambda: lookup_all(data_src), len(villager_ids)
+    ))
+    benchmarks.append(Benchmark(
+        "get_data_by_villager_id", {"cache": "none"},
+        lambda: lookup_all(AcListerVillagerDataReader(use_snapshot=False, cache_size=0)), len(villager_ids)
+    ))
+
+    days_in_month = [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+    birthdays = [(m + 1, d + 1) for m in range(12) for d in range(days_in_month[m])]
+    benchmarks.append(Benchmark(
+        "get_star_sign_by_birthday", {},
+        lambda: lambda: [get_star_sign_by_birthday(b) for b in birthdays], len(birthdays)
+    ))
+
+    pair_villagers = [data_src.get_data_by_villager_id(v) for v in complete_ids[:30]]
+    benchmarks.append(Benchmark(
+        "calc_villager_compatibility", {},
+        lambda: lambda: [calc_villager_compatibility(a, b) for a in pair_villagers for b in pair_villagers],
+        len(pair_villagers) ** 2
+    ))
+
+    marks = list(CompatibilityScoreMark)
+    mark_triples = [[a, b, c] for a in marks for b in marks for c in marks]
+    benchmarks.append(Benchmark(
+        "evaluate_compatibility", {},
+        lambda: lambda: [evaluate_compatibility(m) for m in mark_triples], len(mark_triples)
+    ))
+
+    for n in [10, 100, len(complete_ids)]:
+        island = complete_ids[:n]
+        benchmarks.append(Benchmark(
+            "calculate_compatibility_matrix", {"roster": "real", "n": n},
+            lambda _island=island: lambda: calculate_compatibility_matrix(_island, data_src), n * n
+        ))
+    benchmarks.append(Benchmark(
+        "roster_compatibility_matrix", {"roster": "real"},
+        lambda: lambda: RosterCompatibilityMatrix(data_src), len(villager_ids) ** 2
+    ))
+
+    render_island = complete_ids[:10]
+    benchmarks.append(Benchmark(
+        "print_villager_compatibility", {"n": len(render_island)},
+        lambda: lambda: _silently(print_villager_compatibility, render_island, data_src), len(render_island) ** 2
+    ))
+
+    for size in synthetic_sizes:
+        roster_loc = os.path.join(work_dir, "synthetic_{}.json".format(size))
+
+        def setup_reader(_roster_loc=roster_loc, _size=size):
+            write_roster(_roster_loc, _size)
+            return lambda: AcListerVillagerDataReader(_roster_loc, use_snapshot=False)
+
+        def setup_reader_for(_roster_loc=roster_loc, _size=size):
+            write_roster(_roster_loc, _size)
+            return AcListerVillagerDataReader(_roster_loc, use_snapshot=False)
+
+        def setup_roster_matrix(_setup_reader_for=setup_reader_for):
+            synthetic_src = _setup_reader_for()
+            return lambda: RosterCompatibilityMatrix(synthetic_src)
+
+        def setup_island_matrix(_setup_reader_for=setup_reader_for):
+            synthetic_src = _setup_reader_for()
+            synthetic_ids = [
+                v for v in synthetic_src.get_all_villager_ids() if synthetic_src.get_data_by_villager_id(v).birthday
+            ][:100]
+            return lambda: calculate_compatibility_matrix(synthetic_ids, synthetic_src)
+
+        benchmarks.append(Benchmark(
+            "reader_construction", {"roster": "synthetic", "source": "json", "size": size}, setup_reader, 1
+        ))
+        benchmarks.append(Benchmark(
+            "roster_compatibility_matrix", {"roster": "synthetic", "size": size}, setup_roster_matrix, size * size
+        ))
+        # The full python matrix of a large roster takes minutes under tracemalloc, the roster matrix covers it
+        benchmarks.append(Benchmark(
+            "calculate_compatibility_matrix", {"roster": "synthetic", "size": size, "n": min(100, size)},
+            setup_island_matrix, min(100, size) ** 2
+        ))
+    return benchmarks
+
+
+def run_benchmarks(benchmarks, min_time=0.2, repeat=5, progress=None):
+    # type: (List[Benchmark], float, int, Optional[Callable[[Dict[str, Any]], None]]) -> Dict[str, Any]
+    results = []
+    for benchmark in benchmarks:
+        result = {"name": benchmark.name, "params": benchmark.params, "key": benchmark.key, "ops": benchmark.ops}
+        result.update(measure(benchmark.setup(), min_time, repeat))
+        result["per_op"] = result["best"] / benchmark.ops
+        results.append(result)
+        if progress is not None:
+            progress(result)
+    return {
+        "format_version": RESULT_FORMAT_VERSION,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "min_time": min_time,
+        "results": results,
+    }
+
+
+def compare_results(baseline, current):
+    # type: (Dict[str, Any], Dict[str, Any]) -> List[Tuple[str, float, float, float]]
+    """(key, baseline best, current best, current / baseline) of every benchmark present in both runs"""
+    if baseline.get("format_version") != current.get("format_version"):
+        raise ValueError("Can't compare results of format version {} and {}".format(
+            baseline.get("format_version"), current.get("format_version")
+        ))
+    baseline_by_key = {r["key"]: r for r in baseline["results"]}
+    return [
+        (r["key"], baseline_by_key[r["key"]]["best"], r["best"], r["best"] / baseline_by_key[r["key"]]["best"])
+        for r in current["results"] if r["key"] in baseline_by_key
+    ]
+
+
+def _format_result(result):
+    # type: (Dict[str, Any]) -> str
+    return "{:<70} {:>12.3f} ms {:>12.3f} us/op {:>10.1f} KiB".format(
+        result["key"], result["best"] * 1e3, result["per_op"] * 1e6, result["peak_memory"] / 1024
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.run_benchmarks",
+        description="Time (and measure the peak memory of) each stage of the compatibility calculation"
+    )
+    parser.add_argument("-o", "--output", default=None, help="write the JSON results there")
+    parser.add_argument("-k", "--filter", default=None, help="only run the benchmarks whose key contains that text")
+    parser.add_argument("--synthetic", type=int, action="append", default=None, metavar="SIZE",
+                        help="synthetic roster size to benchmark, may be repeated (default 2000)")
+    parser.add_argument("--quick", action="store_true", help="shorter timing runs, for a smoke test")
+    parser.add_argument("--compare", default=None, metavar="BASELINE",
+                        help="JSON results of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    min_time, repeat = (0.02, 2) if args.quick else (0.2, 5)
+    synthetic_sizes = tuple(args.synthetic) if args.synthetic is not None else (2000,)
+    with tempfile.TemporaryDirectory() as work_dir:
+        benchmarks = collect_benchmarks(work_dir, synthetic_sizes)
+        if args.filter:
+            benchmarks = [b for b in benchmarks if args.filter in b.key]
+        results = run_benchmarks(benchmarks, min_time, repeat,
+                                 lambda r: print(_format_result(r), file=sys.stderr))
+
+    if args.output:
+        with open(args.output, "w") as fp_out:
+            json.dump(results, fp_out, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare, "r") as fp_in:
+            baseline = json.load(fp_in)
+        print("{:<70} {:>12} {:>12} {:>8}".format("benchmark", "baseline ms", "current ms", "ratio"), file=sys.stderr)
+        for key, baseline_best, current_best, ratio in compare_results(baseline, results):
+            print("{:<70} {:>12.3f} {:>12.3f} {:>7.2f}x".format(key, baseline_best * 1e3, current_best * 1e3, ratio),
+                  file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+from typing import (
+    List, Dict
+)
+
+import json
+import random
+
+from src.data_model import Personality, Species
+
+_MONTH_NAMES = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+                "November", "December"]
+_DAYS_IN_MONTH = [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+
+def generate_roster(size, seed=0, missing_ratio=0.01):
+    # type: (int, int, float) -> List[Dict[str, object]]
+    """
+    `size` random villagers in the format of data/villager.json, with ids Synth00000, Synth00001, ... About
+    missing_ratio of them have no birthday, like Verdun in the real roster. The same seed gives the same roster.
+    """
+    rng = random.Random(seed)
+    species = [s.name for s in Species]
+    personalities = [p.name for p in Personality]
+    roster = []
+    for idx in range(size):
+        villager_id = "Synth{:05d}".format(idx)
+        if rng.random() < missing_ratio:
+            birthday = ""
+        else:
+            month = rng.randrange(12)
+            birthday = "{} {}".format(_MONTH_NAMES[month], rng.randint(1, _DAYS_IN_MONTH[month]))
+        roster.append({
+            "name": villager_id,
+            "id": villager_id,
+            "species": rng.choice(species),
+            "personality": rng.choice(personalities),
+            "coffee": "",
+            "birthday": birthday,
+            "wiki": "",
+            "store": "",
+            "hasProfileImage": False,
+            "hasIconImage": False,
+        })
+    return roster
+
+
+def write_roster(path, size, seed=0, missing_ratio=0.01):
+    # type: (str, int, int, float) -> str
+    with open(path, "w") as fp_out:
+        json.dump(generate_roster(size, seed, missing_ratio), fp_out)
+    return path
@@ -1,11 +1,281 @@
 import sys
 
-from src.compatibility_caculator import compatibility_calculator
+
+def best_island_main(argv):
+    import argparse
+    from src.compatibility_caculator import best_island_calculator
+    from src.island_optimizer import ISLAND_SIZE
+
+    parser = argparse.ArgumentParser(
+        prog="{} best-island".format(sys.argv[0]),
+        description="Find the island with the most villager pairs in good compatibility"
+    )
+    parser.add_argument("-r", "--require", action="append", default=[], metavar="ID",
+                        help="villager that must be on the island, may be repeated")
+    parser.add_argument("-x", "--exclude", action="append", default=[], metavar="ID",
+                        help="villager that must not be on the island, may be repeated")
+    parser.add_argument("-n", "--size", type=int, default=ISLAND_SIZE, help="number of islanders")
+    parser.add_argument("--minimize-bad", action="store_true",
+                        help="among the islands with the most good pairs, pick one with the fewest bad pairs")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="number of worker processes")
+    parser.add_argument("-t", "--timeout", type=float, default=None,
+                        help="give up after that many seconds and report the best island found so far")
+    parser.add_argument("--anneal", type=float, default=None, metavar="SECONDS",
+                        help="run simulated annealing for that many seconds instead of the exact search")
+    parser.add_argument("--chains", type=int, default=1, help="number of independent annealing chains")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first annealing chain")
+    args = parser.parse_args(argv)
+    best_island_calculator(
+        required=args.require, excluded=args.exclude, island_size=args.size, minimize_bad=args.minimize_bad,
+        workers=args.workers, timeout=args.timeout, anneal_budget=args.anneal, chains=args.chains, seed=args.seed
+    )
+
+
+def batch_main(argv):
+    import argparse
+    from src.batch import INPUT_FORMATS, CHUNK_SIZE, guess_input_format, run_batch
+
+    parser = argparse.ArgumentParser(
+        prog="{} batch".format(sys.argv[0]),
+        description="Score many islands, one per line as a JSON list or a CSV row of villager ids, "
+                    "and write one JSON record per island"
+    )
+    parser.add_argument("input", nargs="?", default="-", help="island file, - (the default) for stdin")
+    parser.add_argument("-o", "--output", default="-", help="record file, - (the default) for stdout")
+    parser.add_argument("-f", "--input-format", choices=INPUT_FORMATS, default=None,
+                        help="csv for a .csv input, jsonl otherwise by default")
+    parser.add_argument("--pairs", action="store_true", help="add the marks and verdict of every pair to the records")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="number of worker processes")
+    parser.add_argument("--unordered", action="store_true",
+                        help="with workers, write the records as they complete instead of in input order")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="islands handed to a worker at once")
+    args = parser.parse_args(argv)
+
+    input_format = args.input_format
+    if input_format is None:
+        input_format = guess_input_format(None if args.input == "-" else args.input)
+    fp_in = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8", newline="")
+    fp_out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        run_batch(fp_in, fp_out, input_format=input_format, with_pairs=args.pairs, workers=args.workers,
+                  ordered=not args.unordered, chunk_size=args.chunk_size)
+    finally:
+        if fp_in is not sys.stdin:
+            fp_in.close()
+        if fp_out is not sys.stdout:
+            fp_out.close()
+
+
+def recommend_main(argv):
+    import argparse
+    import json
+    from src.compatibility_caculator import print_recommendations
+    from src.compatibility_matrix import RosterCompatibilityMatrix
+    from src.data_reader import AcListerVillagerDataReader
+    from src.recommendations import DEFAULT_TOP_K, recommend
+
+    parser = argparse.ArgumentParser(
+        prog="{} recommend".format(sys.argv[0]),
+        description="Rank the villagers to move onto an island by the good and bad pairs they would add"
+    )
+    parser.add_argument("villager", nargs="+", help="id of a current islander")
+    parser.add_argument("-k", "--top", type=int, default=DEFAULT_TOP_K, help="number of candidates to list")
+    parser.add_argument("--json", action="store_true", help="print the recommendations as JSON")
+    args = parser.parse_args(argv)
+    report = recommend(RosterCompatibilityMatrix(AcListerVillagerDataReader()), args.villager, args.top)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_recommendations(report)
+
+
+def harmony_main(argv):
+    import argparse
+    from src.compatibility_caculator import harmony_calculator
+
+    parser = argparse.ArgumentParser(
+        prog="{} harmony".format(sys.argv[0]),
+        description="Find the largest groups of villagers where every pair is in good compatibility"
+    )
+    parser.add_argument("-p", "--pin", action="append", default=[], metavar="ID",
+                        help="villager that must be in the group, may be repeated")
+    parser.add_argument("-x", "--exclude", action="append", default=[], metavar="ID",
+                        help="villager that must not be in the group, may be repeated")
+    parser.add_argument("--not-bad", action="store_true", help="only require that no pair is in bad compatibility")
+    parser.add_argument("--all", action="store_true", help="list every largest group instead of one")
+    parser.add_argument("--min-size", type=int, default=None,
+                        help="list every group no villager can join with at least that many villagers")
+    parser.add_argument("--limit", type=int, default=None, help="list at most that many groups")
+    parser.add_argument("-t", "--timeout", type=float, default=None,
+                        help="give up after that many seconds and report the best groups found so far")
+    args = parser.parse_args(argv)
+    harmony_calculator(
+        pinned=args.pin, excluded=args.exclude, mode="not_bad" if args.not_bad else "good", enumerate_all=args.all,
+        min_size=args.min_size, limit=args.limit, timeout=args.timeout
+    )
+
+
+def serve_main(argv):
+    import argparse
+    from src.http_api import DEFAULT_HOST, DEFAULT_PORT, serve
+
+    parser = argparse.ArgumentParser(
+        prog="{} serve".format(sys.argv[0]),
+        description="Answer villager, pair compatibility and island queries as JSON over HTTP"
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help="address to listen on")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument("--cache-size", type=int, default=1024, help="number of island responses kept in memory")
+    parser.add_argument("-q", "--quiet", action="store_true", help="don't log the requests")
+    parser.add_argument("--metrics", action="store_true", help="time the stages and export them on GET /metrics")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.cache_size, args.quiet, args.metrics)
+
+
+def daemon_main(argv):
+    import argparse
+    from src.daemon import run_daemon, stop_daemon
+
+    parser = argparse.ArgumentParser(
+        prog="{} daemon".format(sys.argv[0]),
+        description="Keep the villager DB loaded and answer the villager list invocations of this script"
+    )
+    parser.add_argument("-s", "--socket", default=None, help="Unix socket path, $AC_COMPAT_SOCKET by default")
+    parser.add_argument("--stop", action="store_true", help="stop the running daemon")
+    parser.add_argument("--metrics", action="store_true", help="time the stages and export them on the metrics command")
+    args = parser.parse_args(argv)
+    if args.stop:
+        if not stop_daemon(args.socket):
+            print("No daemon is running", file=sys.stderr)
+    else:
+        run_daemon(args.socket, args.metrics)
+
+
+def villager_list_main(argv):
+    if not any(arg.startswith("--") for arg in argv):
+        from src.daemon_client import forward_compatibility_calculator
+        if not forward_compatibility_calculator(argv):
+            from src.compatibility_caculator import compatibility_calculator
+            compatibility_calculator(argv)
+        return
+
+    # Runs with options are never forwarded to the daemon
+    import argparse
+    from src.compatibility_caculator import compatibility_calculator
+    from src.output_formats import OUTPUT_FORMATS
+
+    parser = argparse.ArgumentParser(
+        prog=sys.argv[0], description="Show the compatibility of every pair of the villagers"
+    )
+    parser.add_argument("villager", nargs="+", help="villager id")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="table",
+                        help="table (the default), or one NDJSON record / CSV line / binary edge per pair")
+    parser.add_argument("--unique-pairs", action="store_true",
+                        help="with a machine readable format, write each unordered pair once and no villager against "
+                             "itself")
+    parser.add_argument("--report-cache", default=None, metavar="PATH",
+                        help="keep the computed islands in that SQLite file and reuse them across runs")
+    parser.add_argument("--timings", action="store_true", help="print the time spent in each stage to stderr")
+    parser.add_argument("--profile", action="store_true", help="print a cProfile report to stderr")
+    args = parser.parse_args(argv)
+
+    def run():
+        if args.report_cache is None:
+            compatibility_calculator(args.villager, output_format=args.format, unique_pairs=args.unique_pairs)
+            return
+        from src.report_cache import IslandReportCache
+        with IslandReportCache(args.report_cache) as report_cache:
+            compatibility_calculator(args.villager, output_format=args.format, unique_pairs=args.unique_pairs,
+                                     report_cache=report_cache)
+
+    if not (args.timings or args.profile):
+        run()
+        return
+
+    from src.profiling import profiling
+
+    with profiling() as profiler:
+        if args.profile:
+            import cProfile
+            import pstats
+            cprofiler = cProfile.Profile()
+            try:
+                cprofiler.runcall(run)
+            finally:
+                print(file=sys.stderr)
+                pstats.Stats(cprofiler, stream=sys.stderr).sort_stats("cumulative").print_stats(25)
+                print(profiler.format_table(), file=sys.stderr)
+        else:
+            try:
+                run()
+            finally:
+                print(file=sys.stderr)
+                print(profiler.format_table(), file=sys.stderr)
+
+
+def merge_sources_main(argv):
+    import argparse
+    from src.villager_sources import MergedVillagerDataReader, get_source_formats
+
+    parser = argparse.ArgumentParser(
+        prog="{} merge-sources".format(sys.argv[0]),
+        description="Merge villager databases, a later one taking precedence, and cache the result"
+    )
+    parser.add_argument("source", nargs="+", help="database file, FORMAT:PATH to name its format ({})".format(
+        ", ".join(get_source_formats())
+    ))
+    parser.add_argument("-c", "--cache", default=None, help="merged cache path, next to the first source by default")
+    args = parser.parse_args(argv)
+
+    sources = []
+    for source in args.source:
+        source_format, _, path = source.partition(":")
+        sources.append((path, source_format) if path and source_format in get_source_formats() else source)
+    data_src = MergedVillagerDataReader(sources, args.cache)
+    print("{} villagers from {} sources{}".format(
+        len(data_src.get_all_villager_ids()), len(data_src.sources),
+        " (from the cache)" if data_src.from_cache else ""
+    ))
+
+
+def compile_snapshot_main():
+    from src.roster_snapshot import compile_snapshot
+    from src.utils import get_villager_data_path, get_personality_compatibility_data_path
+
+    snapshot_loc = compile_snapshot(get_villager_data_path(), get_personality_compatibility_data_path())
+    print("Snapshot written to {}".format(snapshot_loc))
+
 
 if len(sys.argv) <= 1:
-    print("Usage: {} <Islander 1 Name>, <Islander 2 Name>, ...".format(sys.argv[0]), file=sys.stderr)
+    print("Usage: {} [--format FORMAT] [--unique-pairs] [--report-cache PATH] [--timings] [--profile] "
+          "<Islander 1 Name>, <Islander 2 Name>, ...".format(sys.argv[0]), file=sys.stderr)
+    print("       {} best-island [-h] [options]".format(sys.argv[0]), file=sys.stderr)
+    print("       {} batch [-h] [options] [ISLAND FILE]".format(sys.argv[0]), file=sys.stderr)
+    print("       {} recommend [-h] [-k K] [--json] <Islander 1 Name> ...".format(sys.argv[0]), file=sys.stderr)
+    print("       {} harmony [-h] [options]".format(sys.argv[0]), file=sys.stderr)
+    print("       {} serve [-h] [options]".format(sys.argv[0]), file=sys.stderr)
+    print("       {} daemon [-h] [--stop]".format(sys.argv[0]), file=sys.stderr)
+    print("       {} merge-sources [-h] [-c CACHE] <SOURCE> ...".format(sys.argv[0]), file=sys.stderr)
+    print("       {} compile-snapshot".format(sys.argv[0]), file=sys.stderr)
 else:
     try:
-        compatibility_calculator(sys.argv[1:])
+        if sys.argv[1] == "best-island":
+            best_island_main(sys.argv[2:])
+        elif sys.argv[1] == "batch":
+            batch_main(sys.argv[2:])
+        elif sys.argv[1] == "recommend":
+            recommend_main(sys.argv[2:])
+        elif sys.argv[1] == "harmony":
+            harmony_main(sys.argv[2:])
+        elif sys.argv[1] == "serve":
+            serve_main(sys.argv[2:])
+        elif sys.argv[1] == "daemon":
+            daemon_main(sys.argv[2:])
+        elif sys.argv[1] == "merge-sources":
+            merge_sources_main(sys.argv[2:])
+        elif sys.argv[1] == "compile-snapshot":
+            compile_snapshot_main()
+        else:
+            villager_list_main(sys.argv[1:])
     except ValueError as ve:
         print("{}".format(ve), file=sys.stderr)
@@ -0,0 +1,132 @@
+from typing import (
+    Any, IO, Iterable, Iterator, List, Optional, Tuple
+)
+
+import collections
+import csv
+import json
+
+from src.compatibility_matrix import RosterCompatibilityMatrix
+from src.data_reader import AcListerVillagerDataReader, VillagerDataReader
+from src.island_report import island_report
+
+INPUT_FORMATS = ("jsonl", "csv")
+
+# How many islands are handed to a worker process at once, and how many chunks per worker may be in flight
+CHUNK_SIZE = 512
+_CHUNKS_PER_WORKER = 4
+
+
+def guess_input_format(path):
+    # type: (Optional[str]) -> str
+    """csv for a .csv file, jsonl for anything else including stdin"""
+    if path and path.lower().endswith(".csv"):
+        return "csv"
+    return "jsonl"
+
+
+def _parse_island(text, input_format):
+    # type: (str, str) -> List[str]
+    if input_format == "jsonl":
+        island = json.loads(text)
+        if not isinstance(island, list) or not all(isinstance(v, str) for v in island):
+            raise ValueError("An island must be a JSON list of villager ids")
+        return island
+    return [v.strip() for v in next(csv.reader([text])) if v.strip()]
+
+
+def _score_chunk(roster_matrix, chunk, input_format, with_pairs):
+    # type: (RosterCompatibilityMatrix, List[Tuple[int, str]], str, bool) -> List[str]
+    """Score the (line number, line) of a chunk into one JSON record each, a bad line gives an error record"""
+    records = []
+    for line_no, text in chunk:
+        try:
+            record = island_report(roster_matrix, _parse_island(text, input_format), with_pairs)
+        except ValueError as ve:  # json.JSONDecodeError is a ValueError too
+            record = {"error": str(ve)}
+        record["line"] = line_no
+        records.append(json.dumps(record, ensure_ascii=False))
+    return records
+
+
+def _read_chunks(fp_in, chunk_size):
+    # type: (Iterable[str], int) -> Iterator[List[Tuple[int, str]]]
+    chunk = []
+    for line_no, text in enumerate(fp_in, 1):
+        if not text.strip():
+            continue
+        chunk.append((line_no, text))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# The roster matrix of the worker processes, built once by _init_worker() instead of being pickled per chunk
+_worker_roster_matrix = None  # type: Optional[RosterCompatibilityMatrix]
+
+
+def _init_worker():
+    global _worker_roster_matrix
+    _worker_roster_matrix = RosterCompatibilityMatrix(AcListerVillagerDataReader())
+
+
+def _score_chunk_in_worker(args):
+    # type: (Tuple[List[Tuple[int, str]], str, bool]) -> List[str]
+    return _score_chunk(_worker_roster_matrix, *args)
+
+
+def score_islands(fp_in, input_format="jsonl", with_pairs=False, workers=1, ordered=True, chunk_size=CHUNK_SIZE,
+                  data_src=None):
+    # type: (Iterable[str], str, bool, int, bool, int, Optional[VillagerDataReader]) -> Iterator[str]
+    """
+    Score every island of fp_in, one island per line as a JSON list or a CSV row of villager ids, and yield one JSON
+    record per island as soon as it is ready: the island_report() of the island, or {"error": message} when the line
+    can't be parsed or names an unknown villager, plus the "line" number it was read from. Blank lines are skipped.
+
+    The roster is loaded once. With workers > 1 the chunks of chunk_size lines are scored by a process pool whose
+    workers load their own roster (data_src is then ignored), at most a few chunks per worker are read ahead. With
+    ordered the records come in input order, otherwise as the chunks complete.
+    """
+    if input_format not in INPUT_FORMATS:
+        raise ValueError("Unknown input format {}, must be either {}".format(input_format, " or ".join(INPUT_FORMATS)))
+    chunks = _read_chunks(fp_in, chunk_size)
+
+    if workers <= 1:
+        roster_matrix = RosterCompatibilityMatrix(data_src if data_src is not None else AcListerVillagerDataReader())
+        for chunk in chunks:
+            yield from _score_chunk(roster_matrix, chunk, input_format, with_pairs)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_score_chunk_in_worker, (chunk, input_format, with_pairs)))
+            while len(pending) >= workers * _CHUNKS_PER_WORKER:
+                if ordered:
+                    yield from pending.popleft().result()
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pending.remove(future)
+                        yield from future.result()
+        if ordered:
+            while pending:
+                yield from pending.popleft().result()
+        else:
+            for future in as_completed(pending):
+                yield from future.result()
+
+
+def run_batch(fp_in, fp_out, **kwargs):
+    # type: (IO[str], IO[str], **Any) -> int
+    """Write the records of score_islands(fp_in, **kwargs) to fp_out, one per line, return how many were written"""
+    count = 0
+    for record in score_islands(fp_in, **kwargs):
+        fp_out.write(record)
+        fp_out.write("\n")
+        count += 1
+    return count
@@ -0,0 +1,98 @@
+from typing import (
+    Any, Dict, Hashable
+)
+
+from collections import OrderedDict
+import threading
+
+EVICTION_POLICIES = ("lru", "fifo")
+
+
+class BoundedCache:
+    """
+    A thread safe key-value cache holding at most max_size entries. When full, the "lru" policy evicts the least
+    recently used entry and the "fifo" policy the oldest inserted one. A max_size of 0 disables caching.
+    """
+
+    def __init__(self, max_size=128, policy="lru"):
+        # type: (int, str) -> None
+        if policy not in EVICTION_POLICIES:
+            raise ValueError("Unknown eviction policy {}, must be either {}".format(
+                policy, " or ".join(EVICTION_POLICIES)))
+        if max_size < 0:
+            raise ValueError("The cache size can't be negative")
+        self._max_size = max_size
+        self._policy = policy
+        self._entries = OrderedDict()  # type: OrderedDict
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key, default=None):
+        # type: (Hashable, Any) -> Any
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self._misses += 1
+                return default
+            self._hits += 1
+            if self._policy == "lru":
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        # type: (Hashable, Any) -> None
+        if self._max_size == 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = value
+                if self._policy == "lru":
+                    self._entries.move_to_end(key)
+                return
+            while len(self._entries) >= self._max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+            self._entries[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def max_size(self):
+        # type: () -> int
+        return self._max_size
+
+    @property
+    def hits(self):
+        # type: () -> int
+        return self._hits
+
+    @property
+    def misses(self):
+        # type: () -> int
+        return self._misses
+
+    @property
+    def evictions(self):
+        # type: () -> int
+        return self._evictions
+
+    def stats(self):
+        # type: () -> Dict[str, int]
+        return {
+            "size": len(self._entries),
+            "max_size": self._max_size,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+        }
@@ -0,0 +1,337 @@
+from typing import (
+    Iterable, Iterator, List, Optional, Dict, Set, Tuple
+)
+
+import time
+
+from src.compatibility_bitsets import CompatibilityBitsets, popcount
+
+# "good": every pair of the group is GOOD, "not_bad": no pair of the group is BAD
+CLIQUE_MODES = ("good", "not_bad")
+
+# How many search nodes are visited between two deadline checks
+_CHECK_INTERVAL = 1024
+
+
+class CliqueSearchResult:
+    def __init__(self, cliques, complete, explored_nodes):
+        # type: (List[List[str]], bool, int) -> None
+        self._cliques = cliques
+        self._complete = complete
+        self._explored_nodes = explored_nodes
+
+    @property
+    def cliques(self):
+        # type: () -> List[List[str]]
+        """The groups found, largest first, each with the pinned villagers first and the others in roster order"""
+        return self._cliques
+
+    @property
+    def largest(self):
+        # type: () -> List[str]
+        return self._cliques[0] if self._cliques else []
+
+    @property
+    def complete(self):
+        # type: () -> bool
+        """
+        False when the search was stopped by the timeout (or the limit), the groups are then the best ones found so
+        far
+        """
+        return self._complete
+
+    @property
+    def explored_nodes(self):
+        # type: () -> int
+        return self._explored_nodes
+
+    def __repr__(self):
+        return "CliqueSearchResult(largest={}, cliques={}, complete={})".format(
+            self.largest, len(self._cliques), self._complete
+        )
+
+
+def clique_adjacency(bitsets, mode="good"):
+    # type: (CompatibilityBitsets, str) -> List[int]
+    """
+    The neighborhood bitset of every roster ordinal in the compatibility graph of the mode. Villagers whose
+    compatibility can't be calculated have no neighbors in either mode.
+    """
+    if mode == "good":
+        return [bitsets.good_mask(o) for o in range(len(bitsets))]
+    if mode == "not_bad":
+        valid = bitsets.valid_mask
+        return [
+            valid & ~bitsets.bad_mask(o) & ~(1 << o) if valid >> o & 1 else 0 for o in range(len(bitsets))
+        ]
+    raise ValueError("Unknown clique mode {}, must be one of {}".format(mode, ", ".join(CLIQUE_MODES)))
+
+
+def _ordinals(mask):
+    # type: (int) -> Iterator[int]
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+
+def degeneracy_order(adjacency, vertices):
+    # type: (List[int], int) -> List[int]
+    """
+    The vertices of the mask in degeneracy order: each one has the fewest neighbors among itself and the vertices
+    after it. Every vertex then has at most `degeneracy` neighbors later in the order.
+    """
+    degrees = {v: popcount(adjacency[v] & vertices) for v in _ordinals(vertices)}
+    buckets = dict()  # type: Dict[int, Set[int]]
+    for v, degree in degrees.items():
+        buckets.setdefault(degree, set()).add(v)
+    order = []
+    remaining = vertices
+    min_degree = 0
+    while degrees:
+        while not buckets.get(min_degree):
+            min_degree += 1
+        v = min(buckets[min_degree])
+        buckets[min_degree].remove(v)
+        del degrees[v]
+        order.append(v)
+        remaining &= ~(1 << v)
+        for w in _ordinals(adjacency[v] & remaining):
+            buckets[degrees[w]].remove(w)
+            degrees[w] -= 1
+            buckets.setdefault(degrees[w], set()).add(w)
+        min_degree = max(0, min_degree - 1)
+    return order
+
+
+class _CliqueSearch:
+    """
+    Candidates with the same neighbors, each other included (twins, like villagers of one species, personality and
+    star sign group), are in every maximal clique together or not at all: they're merged into one vertex weighing
+    their number and both searches run on that smaller graph. Its vertices are relabeled in reverse degeneracy
+    order, so the bit order is the order in which the greedy coloring visits them: the densest core first.
+    """
+
+    def __init__(self, adjacency, candidates, deadline=None):
+        # type: (List[int], int, Optional[float]) -> None
+        group_by_neighbors = dict()  # type: Dict[int, List[int]]
+        for v in _ordinals(candidates):
+            group_by_neighbors.setdefault(adjacency[v] & candidates | 1 << v, []).append(v)
+        groups = list(group_by_neighbors.values())
+        group_of = dict((v, idx) for idx, group in enumerate(groups) for v in group)
+        group_adjacency = []
+        for idx, group in enumerate(groups):
+            neighbors = 0
+            for w in _ordinals(adjacency[group[0]] & candidates):
+                neighbors |= 1 << group_of[w]
+            group_adjacency.append(neighbors & ~(1 << idx))
+        order = degeneracy_order(group_adjacency, (1 << len(groups)) - 1)[::-1]
+        local = dict((g, idx) for idx, g in enumerate(order))
+        self.groups = [groups[g] for g in order]
+        self.weights = [len(group) for group in self.groups]
+        self.adjacency = [sum(1 << local[h] for h in _ordinals(group_adjacency[g])) for g in order]
+        self.all_mask = (1 << len(order)) - 1
+        self._deadline = deadline
+        self.nodes = 0
+        self.timed_out = False
+        self.best = []  # type: List[int]
+        self.best_weight = 0
+
+    def _check(self):
+        self.nodes += 1
+        if self.nodes % _CHECK_INTERVAL == 0 and self._deadline is not None and time.monotonic() > self._deadline:
+            self.timed_out = True
+
+    def _weight(self, mask):
+        # type: (int) -> int
+        weights = self.weights
+        return sum(weights[v] for v in _ordinals(mask))
+
+    def _expand_groups(self, vertices):
+        # type: (List[int]) -> List[int]
+        return [v for g in vertices for v in self.groups[g]]
+
+    def _color_sort(self, candidates, min_bound):
+        # type: (int, int) -> List[Tuple[int, int]]
+        """
+        Greedily color the candidates, independent sets in bit order. A clique holds at most one vertex of each
+        color, so the candidates up to a color weigh at most the sum of the heaviest vertex of every color up to it.
+        Returns the (vertex, that bound) of the candidates whose bound reaches min_bound, by increasing bound.
+        """
+        adjacency = self.adjacency
+        weights = self.weights
+        colored = []
+        bound = 0
+        while candidates:
+            color_class = []
+            uncolored = candidates
+            while uncolored:
+                low_bit = uncolored & -uncolored
+                v = low_bit.bit_length() - 1
+                candidates ^= low_bit
+                uncolored = (uncolored ^ low_bit) & ~adjacency[v]
+                color_class.append(v)
+            bound += max(weights[v] for v in color_class)
+            if bound >= min_bound:
+                colored.extend((v, bound) for v in color_class)
+        return colored
+
+    def maximum(self):
+        # type: () -> List[int]
+        """A maximum clique of the candidates by branch and bound on the coloring bound, in roster ordinals"""
+        self._expand([], 0, self.all_mask)
+        return self._expand_groups(self.best)
+
+    def _expand(self, picks, weight, candidates):
+        # type: (List[int], int, int) -> None
+        self._check()
+        for v, bound in reversed(self._color_sort(candidates, self.best_weight - weight + 1)):
+            if self.timed_out or weight + bound <= self.best_weight:
+                return
+            picks.append(v)
+            next_candidates = candidates & self.adjacency[v]
+            if next_candidates:
+                self._expand(picks, weight + self.weights[v], next_candidates)
+            elif weight + self.weights[v] > self.best_weight:
+                self.best = list(picks)
+                self.best_weight = weight + self.weights[v]
+            picks.pop()
+            candidates &= ~(1 << v)
+
+    def maximal(self, min_size=1):
+        # type: (int) -> Iterator[List[int]]
+        """
+        Every maximal clique of the candidates of min_size vertices or more, in roster ordinals: Bron-Kerbosch with
+        Tomita pivoting, the outermost level going through the degeneracy order.
+        """
+        adjacency = self.adjacency
+        # Reversed back to degeneracy order: each vertex has few neighbors after it
+        for v in reversed(range(len(self.groups))):
+            later = (1 << v) - 1
+            for clique in self._bron_kerbosch([v], self.weights[v], adjacency[v] & later, adjacency[v] & ~later,
+                                              min_size):
+                yield self._expand_groups(clique)
+            if self.timed_out:
+                return
+
+    def _bron_kerbosch(self, picks, weight, candidates, excluded, min_size):
+        # type: (List[int], int, int, int, int) -> Iterator[List[int]]
+        self._check()
+        if self.timed_out:
+            return
+        if not candidates:
+            if not excluded and weight >= min_size:
+                yield list(picks)
+            return
+        if weight + self._weight(candidates) < min_size:
+            return
+        adjacency = self.adjacency
+        pivot = max(_ordinals(candidates | excluded), key=lambda u: popcount(candidates & adjacency[u]))
+        for v in _ordinals(candidates & ~adjacency[pivot]):
+            picks.append(v)
+            for clique in self._bron_kerbosch(picks, weight + self.weights[v], candidates & adjacency[v],
+                                              excluded & adjacency[v], min_size):
+                yield clique
+            picks.pop()
+            candidates &= ~(1 << v)
+            excluded |= 1 << v
+            if self.timed_out:
+                return
+
+
+def _resolve_clique_constraints(bitsets, adjacency, pinned, excluded):
+    # type: (CompatibilityBitsets, List[int], Iterable[str], Iterable[str]) -> Tuple[List[str], int]
+    """Validate the pinned / excluded villagers and return the pinned ones and the candidates bitset"""
+    pinned = list(dict.fromkeys(pinned))
+    pinned_mask = bitsets.to_mask(pinned)
+    excluded_mask = bitsets.to_mask(excluded)
+    if pinned_mask & excluded_mask:
+        raise ValueError(
+            "Villager {} is both pinned and excluded".format(bitsets.from_mask(pinned_mask & excluded_mask)[0])
+        )
+    roster_matrix = bitsets.roster_matrix
+    candidates = bitsets.valid_mask & ~excluded_mask & ~pinned_mask
+    for idx, villager_a in enumerate(pinned):
+        ordinal_a = roster_matrix.get_ordinal(villager_a)
+        if not bitsets.valid_mask >> ordinal_a & 1:
+            raise ValueError("The compatibility of villager {} can't be calculated".format(villager_a))
+        for villager_b in pinned[idx + 1:]:
+            if not adjacency[ordinal_a] >> roster_matrix.get_ordinal(villager_b) & 1:
+                raise ValueError("Villagers {} and {} are in {} compatibility".format(
+                    villager_a, villager_b, roster_matrix.get_verdict(villager_a, villager_b).name
+                ))
+        candidates &= adjacency[ordinal_a]
+    return pinned, candidates
+
+
+def _to_villagers(bitsets, pinned, ordinals):
+    # type: (CompatibilityBitsets, List[str], Iterable[int]) -> List[str]
+    mask = 0
+    for ordinal in ordinals:
+        mask |= 1 << ordinal
+    return pinned + bitsets.from_mask(mask)
+
+
+def find_maximum_clique(bitsets, mode="good", pinned=(), excluded=(), timeout=None):
+    # type: (CompatibilityBitsets, str, Iterable[str], Iterable[str], Optional[float]) -> CliqueSearchResult
+    """
+    Find a largest group of villagers in which every pair is GOOD (with mode "not_bad", no pair is BAD), by branch
+    and bound over bitset neighborhoods bounded by greedy coloring. `pinned` villagers are always in the group,
+    `excluded` ones never. When `timeout` seconds pass the largest group found so far is returned with
+    complete=False.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    adjacency = clique_adjacency(bitsets, mode)
+    pinned, candidates = _resolve_clique_constraints(bitsets, adjacency, pinned, excluded)
+    search = _CliqueSearch(adjacency, candidates, deadline)
+    clique = _to_villagers(bitsets, pinned, search.maximum())
+    return CliqueSearchResult([clique] if clique else [], not search.timed_out, search.nodes)
+
+
+def find_maximal_cliques(bitsets,  # type: CompatibilityBitsets
+                         mode="good",  # type: str
+                         pinned=(),  # type: Iterable[str]
+                         excluded=(),  # type: Iterable[str]
+                         min_size=None,  # type: Optional[int]
+                         limit=None,  # type: Optional[int]
+                         timeout=None,  # type: Optional[float]
+                         ):
+    # type: (...) -> CliqueSearchResult
+    """
+    Enumerate the groups of villagers in which every pair is GOOD (with mode "not_bad", no pair is BAD) and which no
+    other villager can join, holding at least min_size villagers, pinned ones included. When min_size is None only
+    the largest groups are enumerated, their size found first with find_maximum_clique(). At most `limit` groups are
+    returned; when they're cut short by the limit or the timeout, complete is False.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    adjacency = clique_adjacency(bitsets, mode)
+    pinned, candidates = _resolve_clique_constraints(bitsets, adjacency, pinned, excluded)
+    if limit is not None and limit < 0:
+        raise ValueError("The limit can't be negative")
+
+    nodes = 0
+    if min_size is None:
+        search = _CliqueSearch(adjacency, candidates, deadline)
+        largest = search.maximum()
+        nodes = search.nodes
+        if search.timed_out:
+            clique = _to_villagers(bitsets, pinned, largest)
+            return CliqueSearchResult([clique] if clique else [], False, nodes)
+        min_size = len(pinned) + len(largest)
+
+    search = _CliqueSearch(adjacency, candidates, deadline)
+    cliques = []  # type: List[List[str]]
+    complete = True
+    if not candidates:
+        # The pinned villagers alone, when there are any
+        if pinned and len(pinned) >= min_size and limit != 0:
+            cliques.append(list(pinned))
+        complete = limit != 0 or not pinned
+    else:
+        for clique in search.maximal(max(1, min_size - len(pinned))):
+            if limit is not None and len(cliques) >= limit:
+                complete = False
+                break
+            cliques.append(_to_villagers(bitsets, pinned, clique))
+    cliques.sort(key=len, reverse=True)
+    return CliqueSearchResult(cliques, complete and not search.timed_out, nodes + search.nodes)
@@ -0,0 +1,168 @@
+from typing import (
+    Iterable, List, Optional
+)
+
+from src.compatibility_matrix import RosterCompatibilityMatrix, NO_DATA_CODE
+from src.data_reader import AcListerVillagerDataReader, VillagerDataReader
+from src.island_report import count_slot
+
+# int.bit_count() is Python 3.10+
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count
+else:
+    def popcount(bits):
+        # type: (int) -> int
+        return bin(bits).count("1")
+
+# bytes.translate() tables turning a row of roster matrix codes into ASCII "1" for every GOOD (BAD) pair, "0" otherwise
+_GOOD_DIGITS = bytes(ord("1") if count_slot(code) == 2 else ord("0") for code in range(256))
+_BAD_DIGITS = bytes(ord("1") if count_slot(code) == 0 else ord("0") for code in range(256))
+
+
+def _row_bits(row, digits):
+    # type: (bytes, bytes) -> int
+    """The row as a bitset, bit i set when the code of ordinal i translates to "1" """
+    if not row:
+        return 0
+    return int(row.translate(digits)[::-1], 2)
+
+
+class CompatibilityBitsets:
+    """
+    For every villager of the roster, the set of villagers it's in good compatibility with and the set it's in bad
+    compatibility with, as Python int bitsets over the roster ordinals (bit i for the villager of ordinal i, see
+    RosterCompatibilityMatrix.get_ordinal). A villager is never in its own sets. Questions about a set of villagers
+    are then answered with AND, OR and popcount over whole bitsets.
+
+    The "mask" methods take and return bitsets, for the search algorithms built on top; the others take and return
+    villager ids.
+    """
+
+    def __init__(self, data_src=None, roster_matrix=None):
+        # type: (Optional[VillagerDataReader], Optional[RosterCompatibilityMatrix]) -> None
+        if roster_matrix is None:
+            if data_src is None:
+                data_src = AcListerVillagerDataReader()
+            roster_matrix = RosterCompatibilityMatrix(data_src)
+        self._roster_matrix = roster_matrix
+        self._villager_ids = roster_matrix.villager_ids
+        self._good = []  # type: List[int]
+        self._bad = []  # type: List[int]
+        # The villagers whose compatibility can be calculated
+        self._valid = 0
+        for ordinal, villager_id in enumerate(self._villager_ids):
+            row = bytes(roster_matrix.get_row_codes(villager_id))
+            self_bit = 1 << ordinal
+            self._good.append(_row_bits(row, _GOOD_DIGITS) & ~self_bit)
+            self._bad.append(_row_bits(row, _BAD_DIGITS) & ~self_bit)
+            if row[ordinal] != NO_DATA_CODE:
+                self._valid |= self_bit
+
+    def __len__(self):
+        return len(self._villager_ids)
+
+    @property
+    def roster_matrix(self):
+        # type: () -> RosterCompatibilityMatrix
+        return self._roster_matrix
+
+    @property
+    def all_mask(self):
+        # type: () -> int
+        return (1 << len(self._villager_ids)) - 1
+
+    @property
+    def valid_mask(self):
+        # type: () -> int
+        """The villagers whose compatibility can be calculated"""
+        return self._valid
+
+    def good_mask(self, ordinal):
+        # type: (int) -> int
+        return self._good[ordinal]
+
+    def bad_mask(self, ordinal):
+        # type: (int) -> int
+        return self._bad[ordinal]
+
+    def to_mask(self, villagers):
+        # type: (Iterable[str]) -> int
+        mask = 0
+        for ordinal in self._roster_matrix.get_ordinals(villagers):
+            mask |= 1 << ordinal
+        return mask
+
+    def from_mask(self, mask):
+        # type: (int) -> List[str]
+        """The villagers of the bitset, in roster order"""
+        villagers = []
+        while mask:
+            low_bit = mask & -mask
+            villagers.append(self._villager_ids[low_bit.bit_length() - 1])
+            mask ^= low_bit
+        return villagers
+
+    @staticmethod
+    def _ordinals(mask):
+        while mask:
+            low_bit = mask & -mask
+            yield low_bit.bit_length() - 1
+            mask ^= low_bit
+
+    def count_good_pairs_mask(self, mask):
+        # type: (int) -> int
+        return sum(popcount(self._good[o] & mask) for o in self._ordinals(mask)) // 2
+
+    def count_bad_pairs_mask(self, mask):
+        # type: (int) -> int
+        return sum(popcount(self._bad[o] & mask) for o in self._ordinals(mask)) // 2
+
+    def has_bad_pair_mask(self, mask):
+        # type: (int) -> bool
+        return any(self._bad[o] & mask for o in self._ordinals(mask))
+
+    def good_with_all_mask(self, mask, candidates=None):
+        # type: (int, Optional[int]) -> int
+        """The candidates (every villager by default) in good compatibility with each villager of the mask"""
+        result = self.all_mask if candidates is None else candidates
+        for o in self._ordinals(mask):
+            result &= self._good[o]
+        return result
+
+    def not_bad_with_all_mask(self, mask, candidates=None):
+        # type: (int, Optional[int]) -> int
+        """
+        The candidates (every villager by default) in bad compatibility with none of the villagers of the mask,
+        excluding those villagers and the ones whose compatibility can't be calculated
+        """
+        result = (self._valid if candidates is None else candidates & self._valid) & ~mask
+        for o in self._ordinals(mask):
+            result &= ~self._bad[o]
+        return result
+
+    def count_good_pairs(self, villagers):
+        # type: (Iterable[str]) -> int
+        """How many pairs of the villagers are in good compatibility"""
+        return self.count_good_pairs_mask(self.to_mask(villagers))
+
+    def count_bad_pairs(self, villagers):
+        # type: (Iterable[str]) -> int
+        return self.count_bad_pairs_mask(self.to_mask(villagers))
+
+    def has_bad_pair(self, villagers):
+        # type: (Iterable[str]) -> bool
+        return self.has_bad_pair_mask(self.to_mask(villagers))
+
+    def good_with_all(self, villagers, candidates=None):
+        # type: (Iterable[str], Optional[Iterable[str]]) -> List[str]
+        """The villagers (among the candidates) in good compatibility with every one of villagers, in roster order"""
+        return self.from_mask(self.good_with_all_mask(
+            self.to_mask(villagers), None if candidates is None else self.to_mask(candidates)
+        ))
+
+    def not_bad_with_all(self, villagers, candidates=None):
+        # type: (Iterable[str], Optional[Iterable[str]]) -> List[str]
+        """The other villagers (among the candidates) in bad compatibility with none of villagers, in roster order"""
+        return self.from_mask(self.not_bad_with_all_mask(
+            self.to_mask(villagers), None if candidates is None else self.to_mask(candidates)
+        ))
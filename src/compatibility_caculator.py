@@ -1,9 +1,18 @@
-from tabulate import tabulate
+import itertools
+import sys
+
 from src.data_reader import AcListerVillagerDataReader
-from src.utils import get_star_sign_by_birthday, calculate_compatibility_matrix, evaluate_compatibility
+from src.grid_renderer import print_compatibility_grid
+from src.profiling import timed_stage
+from src.utils import (
+    calculate_compatibility_matrix, get_star_sign_by_birthday, iter_compatibility_pairs, iter_unique_pairs
+)
 
 
+@timed_stage("render")
 def print_villager_details(villager, data_src):
+    from tabulate import tabulate
+
     tabulate_content = []
     tabulate_header = ["Id", "Species", "Personality", "Birthday", "Star Sign"]
     for v in villager:
@@ -23,39 +32,133 @@ def print_villager_details(villager, data_src):
     print(tabulate(tabulate_content, headers=tabulate_header, tablefmt="psql"))
 
 
-def print_villager_compatibility(villager, data_src):
-    comp_matrix = calculate_compatibility_matrix(villager, data_src)
-
-    tabulate_content = list(
-        map(
-            (
-                lambda d: [d[0]] + list(
-                    map(
-                        (
-                            lambda c: "".join(
-                                map(
-                                    (
-                                        lambda _: str(_)
-                                    ), [c['species'], c['personality'], c['star_sign']]
-                                )
-                            ) + " | " + str(evaluate_compatibility(c.values()))
-                        ), d[1]
-                    )
-                )
-            ), zip(villager, comp_matrix)
-        )
-    )
-
-    print(tabulate(tabulate_content, headers=[""] + villager, tablefmt='fancy_grid'))
+@timed_stage("render")
+def print_villager_compatibility(villager, data_src, roster_matrix=None, report_cache=None):
+    print_compatibility_grid(villager, data_src, roster_matrix, report_cache=report_cache)
 
 
-def compatibility_calculator(villager):
-    data_src = AcListerVillagerDataReader()
+def compatibility_calculator(villager, data_src=None, roster_matrix=None, output_format="table", out=None,
+                             unique_pairs=False, report_cache=None):
+    if data_src is None:
+        data_src = AcListerVillagerDataReader()
+    if output_format != "table":
+        write_compatibility(villager, data_src, roster_matrix, output_format, out, unique_pairs, report_cache)
+        return
     print("Islander basic information:")
     print_villager_details(villager, data_src)
     print()
     print("Islander compatibility (Species/Personality/StarSign | Result):")
-    print_villager_compatibility(villager, data_src)
+    print_villager_compatibility(villager, data_src, roster_matrix, report_cache)
+
+
+@timed_stage("render")
+def write_compatibility(villager, data_src, roster_matrix=None, output_format="ndjson", out=None,
+                        unique_pairs=False, report_cache=None):
+    """
+    Stream the compatibility of every villager pair to out (stdout by default, its binary buffer for the binary
+    format) in one of the machine readable OUTPUT_FORMATS. With unique_pairs, each unordered pair is written once
+    and the villagers aren't paired with themselves. With a report_cache, the island is read from it, or computed
+    whole and stored in it, before the pairs are written.
+    """
+    from src import output_formats
+
+    writers = {
+        "ndjson": output_formats.write_ndjson,
+        "csv": output_formats.write_csv,
+        "binary": output_formats.write_binary_edges,
+    }
+    if output_format not in writers:
+        raise ValueError("Unknown output format {}, must be one of {}".format(
+            output_format, ", ".join(output_formats.OUTPUT_FORMATS)
+        ))
+    if out is None:
+        out = sys.stdout.buffer if output_format == "binary" else sys.stdout
+    if report_cache is not None:
+        comp_matrix = calculate_compatibility_matrix(villager, data_src, roster_matrix, report_cache=report_cache)
+        if unique_pairs:
+            pairs = iter([(villager[i], villager[j], comp_matrix[i][j])
+                          for i in range(len(villager)) for j in range(i + 1, len(villager))])
+        else:
+            pairs = iter([(villager_a, villager_b, comp) for villager_a, row in zip(villager, comp_matrix)
+                          for villager_b, comp in zip(villager, row)])
+    elif unique_pairs:
+        pairs = iter_unique_pairs(villager, data_src, roster_matrix)
+    else:
+        pairs = iter_compatibility_pairs(villager, data_src, roster_matrix)
+    # Look every villager up before writing anything
+    first_pair = next(pairs, None)
+    writers[output_format](villager, itertools.chain([first_pair], pairs) if first_pair is not None else [], out)
+    out.flush()
+
+
+def print_recommendations(report):
+    from tabulate import tabulate
+
+    print("Island: {} good pairs, {} bad pairs".format(report["good_pairs"], report["bad_pairs"]))
+    print()
+    print("Best villagers to move in:")
+    print(tabulate(
+        [[c["villager"], c["good_pairs_added"], c["bad_pairs_added"]] for c in report["candidates"]],
+        headers=["Id", "Good Pairs Added", "Bad Pairs Added"], tablefmt="psql"
+    ))
+    swap = report["best_swap"]
+    if swap is not None:
+        print()
+        print("Best single swap: {} out, {} in ({} good pairs, {} bad pairs, {:+d} / {:+d})".format(
+            swap["villager_out"], swap["villager_in"], swap["good_pairs"], swap["bad_pairs"],
+            swap["good_pairs_delta"], swap["bad_pairs_delta"]
+        ))
+
+
+def best_island_calculator(required=(), excluded=(), island_size=None, minimize_bad=False, workers=1,
+                           timeout=None, anneal_budget=None, chains=1, seed=0):
+    from src.island_optimizer import find_best_island, ISLAND_SIZE
+    from src.island_search import search_island
+
+    if island_size is None:
+        island_size = ISLAND_SIZE
+    data_src = AcListerVillagerDataReader()
+    if anneal_budget is not None:
+        result = search_island(
+            data_src, island_size=island_size, required=required, excluded=excluded, minimize_bad=minimize_bad,
+            time_budget=anneal_budget, chains=chains, workers=workers, seed=seed
+        )
+        note = " (simulated annealing, {} moves, may not be optimal)".format(result.iterations)
+    else:
+        result = find_best_island(
+            data_src, island_size=island_size, required=required, excluded=excluded, minimize_bad=minimize_bad,
+            workers=workers, timeout=timeout
+        )
+        note = "" if result.optimal else " (timed out, may not be optimal)"
+    print("Best island found: {} good pairs, {} bad pairs{}".format(result.good_pairs, result.bad_pairs, note))
+    print()
+    compatibility_calculator(result.villagers, data_src)
+
+
+def harmony_calculator(pinned=(), excluded=(), mode="good", enumerate_all=False, min_size=None, limit=None,
+                       timeout=None):
+    from src.clique_finder import find_maximal_cliques, find_maximum_clique
+    from src.compatibility_bitsets import CompatibilityBitsets
+
+    data_src = AcListerVillagerDataReader()
+    bitsets = CompatibilityBitsets(data_src)
+    pair_desc = "good" if mode == "good" else "not bad"
+    if enumerate_all or min_size is not None:
+        result = find_maximal_cliques(bitsets, mode=mode, pinned=pinned, excluded=excluded, min_size=min_size,
+                                      limit=limit, timeout=timeout)
+        print("{} groups where every pair is {}{}".format(
+            len(result.cliques), pair_desc, "" if result.complete else " (cut short, there may be more)"
+        ))
+        for clique in result.cliques:
+            print("{}: {}".format(len(clique), ", ".join(clique)))
+        return
+
+    result = find_maximum_clique(bitsets, mode=mode, pinned=pinned, excluded=excluded, timeout=timeout)
+    print("Largest group where every pair is {}: {} villagers{}".format(
+        pair_desc, len(result.largest), "" if result.complete else " (timed out, may not be the largest)"
+    ))
+    print()
+    print_villager_details(result.largest, data_src)
 
 
 def main():
@@ -0,0 +1,130 @@
+from typing import (
+    Iterable, List, Optional, Dict, Tuple, Union
+)
+
+from src.compatibility_matrix import RosterCompatibilityMatrix
+from src.data_model import Compatibility
+from src.data_reader import VillagerDataReader
+from src.island_report import COUNT_SLOT_BY_CODE
+
+# COUNT_SLOT_BY_CODE slot of each verdict
+_SLOT_BY_VERDICT = {Compatibility.BAD: 0, Compatibility.AVERAGE: 1, Compatibility.GOOD: 2}
+
+
+def parse_verdict(verdict):
+    # type: (Union[Compatibility, str]) -> Compatibility
+    """A Compatibility, or its name in any case"""
+    if isinstance(verdict, Compatibility):
+        return verdict
+    try:
+        return Compatibility[str(verdict).upper()]
+    except KeyError:
+        raise ValueError("Unknown verdict {}, must be one of {}".format(
+            verdict, ", ".join(c.name.lower() for c in Compatibility)
+        ))
+
+
+class PartnerPage:
+    """One page of the partners of a query, `total` being the number of partners on every page"""
+
+    def __init__(self, villagers, total, offset, limit):
+        # type: (List[str], int, int, Optional[int]) -> None
+        self._villagers = villagers
+        self._total = total
+        self._offset = offset
+        self._limit = limit
+
+    @property
+    def villagers(self):
+        # type: () -> List[str]
+        return self._villagers
+
+    @property
+    def total(self):
+        # type: () -> int
+        return self._total
+
+    @property
+    def offset(self):
+        # type: () -> int
+        return self._offset
+
+    @property
+    def limit(self):
+        # type: () -> Optional[int]
+        return self._limit
+
+    @property
+    def next_offset(self):
+        # type: () -> Optional[int]
+        """The offset of the next page, None on the last one"""
+        end = self._offset + len(self._villagers)
+        return end if end < self._total else None
+
+    def __repr__(self):
+        return "PartnerPage(villagers={}, total={}, offset={})".format(self._villagers, self._total, self._offset)
+
+
+class CompatibilityIndex:
+    """
+    Inverted index of the roster matrix: for every villager, the sorted ids of the other villagers it's in good,
+    average and bad compatibility with. "Who is good with Bob" is then one lookup, and "who is good with all of Bob,
+    Alice and Chow" an intersection of sorted lists, instead of a pass over the whole roster. The pairs that can't
+    be calculated aren't indexed.
+    """
+
+    def __init__(self, data_src, roster_matrix=None):
+        # type: (VillagerDataReader, Optional[RosterCompatibilityMatrix]) -> None
+        if roster_matrix is None:
+            roster_matrix = RosterCompatibilityMatrix(data_src)
+        self._roster_matrix = roster_matrix
+
+        sorted_ids = sorted(roster_matrix.villager_ids)
+        sorted_ordinals = [roster_matrix.get_ordinal(v) for v in sorted_ids]
+        self._partners = dict()  # type: Dict[str, Tuple[Tuple[str, ...], ...]]
+        for villager_id in sorted_ids:
+            row = roster_matrix.get_row_codes(villager_id)
+            by_slot = ([], [], [], [])  # type: Tuple[List[str], ...]
+            for other_id, ordinal in zip(sorted_ids, sorted_ordinals):
+                if other_id != villager_id:
+                    by_slot[COUNT_SLOT_BY_CODE[row[ordinal]]].append(other_id)
+            self._partners[villager_id] = tuple(tuple(ids) for ids in by_slot[:3])
+
+    def __contains__(self, villager_id):
+        return villager_id in self._partners
+
+    def _require_villager(self, villager_id):
+        # type: (str) -> None
+        if villager_id not in self._partners:
+            raise ValueError("No villager with id {} in the database".format(villager_id))
+
+    def get_partners(self, villager_id, verdict):
+        # type: (str, Union[Compatibility, str]) -> Tuple[str, ...]
+        """The sorted ids of every villager in `verdict` compatibility with the villager"""
+        self._require_villager(villager_id)
+        return self._partners[villager_id][_SLOT_BY_VERDICT[parse_verdict(verdict)]]
+
+    def get_group_partners(self, villager_ids, verdict):
+        # type: (Iterable[str], Union[Compatibility, str]) -> List[str]
+        """The sorted ids of every villager in `verdict` compatibility with each of the villagers"""
+        partner_lists = sorted((self.get_partners(v, verdict) for v in set(villager_ids)), key=len)
+        if not partner_lists:
+            raise ValueError("The group needs at least one villager")
+        # Walk the shortest list, the others are only probed
+        others = [frozenset(p) for p in partner_lists[1:]]
+        return [v for v in partner_lists[0] if all(v in p for p in others)]
+
+    def query(self, villager_ids, verdict, offset=0, limit=None):
+        # type: (Union[str, Iterable[str]], Union[Compatibility, str], int, Optional[int]) -> PartnerPage
+        """
+        A page of the villagers in `verdict` compatibility with a villager, or with every villager of a group, in
+        id order: `limit` of them (all by default) from the `offset`th one
+        """
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("The offset and the limit can't be negative")
+        if isinstance(villager_ids, str):
+            partners = self.get_partners(villager_ids, verdict)  # type: Union[Tuple[str, ...], List[str]]
+        else:
+            partners = self.get_group_partners(villager_ids, verdict)
+        end = len(partners) if limit is None else offset + limit
+        return PartnerPage(list(partners[offset:end]), len(partners), offset, limit)
@@ -0,0 +1,281 @@
+from typing import (
+    Iterable, Iterator, List, Optional, Dict, Tuple, Union
+)
+
+import operator
+
+from src.data_model import CompatibilityScoreMark, Compatibility
+from src.data_reader import VillagerDataReader
+from src.profiling import timed_stage
+from src.utils import evaluate_compatibility, get_verdict_by_marks_index
+
+# Every cell of the roster matrix is packed into one byte:
+#   bit 7-6: species mark + 1, bit 5-4: personality mark + 1, bit 3-2: star sign mark + 1, bit 1-0: verdict + 1
+# A cell whose compatibility can't be calculated (missing birthday, species or personality) holds NO_DATA_CODE.
+NO_DATA_CODE = 0xFF
+
+# (species mark, personality mark, star sign mark, verdict) of a code
+DecodedCode = Tuple[CompatibilityScoreMark, CompatibilityScoreMark, CompatibilityScoreMark, Compatibility]
+
+
+def pack_compatibility(comp):
+    # type: (Optional[Dict[str, CompatibilityScoreMark]]) -> int
+    if comp is None:
+        return NO_DATA_CODE
+    verdict = evaluate_compatibility(list(comp.values()))
+    return ((comp["species"].value + 1) << 6) | \
+           ((comp["personality"].value + 1) << 4) | \
+           ((comp["star_sign"].value + 1) << 2) | \
+           (verdict.value + 1)
+
+
+def unpack_marks(code):
+    # type: (int) -> Tuple[CompatibilityScoreMark, CompatibilityScoreMark, CompatibilityScoreMark]
+    return (
+        CompatibilityScoreMark(((code >> 6) & 0x3) - 1),
+        CompatibilityScoreMark(((code >> 4) & 0x3) - 1),
+        CompatibilityScoreMark(((code >> 2) & 0x3) - 1),
+    )
+
+
+def marks_to_code(marks_code):
+    # type: (int) -> int
+    """The full code of a code holding only the three marks (its verdict bits clear)"""
+    # Bits 7-2 of the code are the three marks packed as get_verdict_by_marks_index() takes them
+    return marks_code | (get_verdict_by_marks_index(marks_code >> 2).value + 1)
+
+
+def _build_decode_table():
+    # type: () -> List[Optional[DecodedCode]]
+    decode_tbl = [None] * 256
+    for code in range(256):
+        if code == NO_DATA_CODE:
+            continue
+        try:
+            decode_tbl[code] = unpack_marks(code) + (Compatibility((code & 0x3) - 1),)
+        except ValueError:
+            pass
+    return decode_tbl
+
+
+_decode_tbl = _build_decode_table()
+
+
+def unpack_compatibility(code):
+    # type: (int) -> Optional[Dict[str, CompatibilityScoreMark]]
+    decoded = _decode_tbl[code]
+    if decoded is None:
+        return None
+    return {
+        "personality": decoded[1],
+        "species": decoded[0],
+        "star_sign": decoded[2]
+    }
+
+
+def unpack_verdict(code):
+    # type: (int) -> Optional[Compatibility]
+    decoded = _decode_tbl[code]
+    if decoded is None:
+        return None
+    return decoded[3]
+
+
+STORAGE_LAYOUTS = ("full", "triangular")
+
+
+class RosterCompatibilityMatrix:
+    """
+    The compatibility of every villager pair in a roster, calculated once and kept as a byte array indexed by
+    villager ordinal. Pair lookups and island sub-matrices become plain array indexing.
+
+    Compatibility is symmetric, so only the unordered pairs (and the diagonal, a villager against itself) are
+    calculated, once per pair of villager_classes. The "full" storage then mirrors them into an N*N array, whose
+    rows get_row_codes() hands out without copying. The "triangular" storage keeps only the upper triangle and the
+    diagonal, N*(N+1)/2 bytes, and mirrors on access instead.
+    """
+
+    @timed_stage("matrix")
+    def __init__(self, data_src, engine="python", storage="full"):
+        # type: (VillagerDataReader, str, str) -> None
+        if storage not in STORAGE_LAYOUTS:
+            raise ValueError("Unknown storage {}, must be either {}".format(storage, " or ".join(STORAGE_LAYOUTS)))
+        self._villager_ids = data_src.get_all_villager_ids()
+        self._villager_id_to_ordinal = dict()  # type: Dict[str, int]
+        for ordinal, villager_id in enumerate(self._villager_ids):
+            self._villager_id_to_ordinal[villager_id] = ordinal
+        self._size = n = len(self._villager_ids)
+        self._storage = storage
+        # Where row i of the upper triangle, cells (i, i) to (i, N-1), starts in the triangular array
+        self._row_offsets = [i * n - i * (i - 1) // 2 for i in range(n)]
+        self._data_src = data_src
+        self._villager_classes = None  # type: Optional[VillagerClasses]
+
+        if engine == "numpy":
+            triangle = self._build_with_numpy(data_src)
+        elif engine == "python":
+            triangle = self._build(data_src)
+        else:
+            raise ValueError("Unknown compatibility engine {}, must be either python or numpy".format(engine))
+
+        if storage == "triangular":
+            self._cells = triangle
+        else:
+            self._cells = bytearray(n * n)
+            for i in range(n):
+                upper = triangle[self._row_offsets[i]:self._row_offsets[i] + n - i]
+                self._cells[i * n + i:(i + 1) * n] = upper
+                self._cells[(i + 1) * n + i::n] = upper[1:]
+
+    def _build_with_numpy(self, data_src):
+        # type: (VillagerDataReader) -> bytearray
+        from src import vectorized_engine
+        import numpy as np
+
+        codes = vectorized_engine.encode_villagers([data_src.get_data_by_villager_id(v) for v in self._villager_ids])
+        arrays = vectorized_engine.calculate_compatibility_arrays(codes, codes)
+        packed = ((arrays["species"] + 1).astype(np.uint8) << 6) | \
+                 ((arrays["personality"] + 1).astype(np.uint8) << 4) | \
+                 ((arrays["star_sign"] + 1).astype(np.uint8) << 2) | \
+                 (arrays["verdict"] + 1).astype(np.uint8)
+        packed[~arrays["valid"]] = NO_DATA_CODE
+        return bytearray(packed[np.triu_indices(self._size)].tobytes())
+
+    def _build(self, data_src):
+        # type: (VillagerDataReader) -> bytearray
+        # Only the species, personality and star sign group matter: the codes of every pair of VillagerClasses are
+        # calculated once, then the row of each class is gathered over the villagers (at C speed, itemgetter) and
+        # shared by the villagers of that class, the diagonal included.
+        classes = self.villager_classes
+        n = self._size
+        if not n:
+            return bytearray()
+        # The villagers in no class get an extra one, NO_DATA_CODE with everybody
+        no_class = len(classes)
+        class_ids = [classes.get_class(v) for v in self._villager_ids]
+        class_ids = [no_class if class_id is None else class_id for class_id in class_ids]
+        gather = operator.itemgetter(*class_ids) if n > 1 else (lambda _row: (_row[class_ids[0]],))
+
+        class_rows = {no_class: bytes([NO_DATA_CODE]) * n}  # type: Dict[int, bytes]
+        triangle = bytearray()
+        for i, class_id in enumerate(class_ids):
+            row = class_rows.get(class_id)
+            if row is None:
+                class_row = bytes(classes.get_class_row(class_id)) + bytes([NO_DATA_CODE])
+                row = class_rows[class_id] = bytes(gather(class_row))
+            triangle += row[i:]
+        return triangle
+
+    @property
+    def villager_classes(self):
+        # type: () -> VillagerClasses
+        """Built on first use, the numpy engine doesn't need them"""
+        if self._villager_classes is None:
+            from src.villager_classes import VillagerClasses
+            self._villager_classes = VillagerClasses(self._data_src, self._villager_ids)
+        return self._villager_classes
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, villager_id):
+        return villager_id in self._villager_id_to_ordinal
+
+    @property
+    def villager_ids(self):
+        # type: () -> List[str]
+        return list(self._villager_ids)
+
+    def get_ordinal(self, villager_id):
+        # type: (str) -> Optional[int]
+        return self._villager_id_to_ordinal.get(villager_id)
+
+    @property
+    def storage(self):
+        # type: () -> str
+        return self._storage
+
+    @property
+    def nbytes(self):
+        # type: () -> int
+        """Size of the cell array"""
+        return len(self._cells)
+
+    def get_code_by_ordinal(self, ordinal_a, ordinal_b):
+        # type: (int, int) -> int
+        if self._storage == "full":
+            return self._cells[ordinal_a * self._size + ordinal_b]
+        if ordinal_a > ordinal_b:
+            ordinal_a, ordinal_b = ordinal_b, ordinal_a
+        return self._cells[self._row_offsets[ordinal_a] + ordinal_b - ordinal_a]
+
+    def get_row_codes(self, villager_id):
+        # type: (str) -> Union[memoryview, bytes]
+        """The codes of the villager against every villager, a view on the array with the full storage"""
+        ordinal = self._villager_id_to_ordinal[villager_id]
+        if self._storage == "full":
+            return memoryview(self._cells)[ordinal * self._size:(ordinal + 1) * self._size]
+        # Cells (k, ordinal) for k < ordinal are in the earlier rows of the triangle, then row `ordinal` itself
+        column = bytes(self._cells[self._row_offsets[k] + ordinal - k] for k in range(ordinal))
+        return column + self._cells[self._row_offsets[ordinal]:self._row_offsets[ordinal] + self._size - ordinal]
+
+    def require_ordinal(self, villager_id, nth=0):
+        # type: (str, int) -> int
+        """The ordinal of the villager, a ValueError naming it as the nth (0-based) villager when it isn't known"""
+        ordinal = self._villager_id_to_ordinal.get(villager_id)
+        if ordinal is None:
+            raise ValueError(
+                "Failed to query the information for the {}th villager: no villager with id {} in the database".format(
+                    nth + 1, villager_id
+                )
+            )
+        return ordinal
+
+    def get_ordinals(self, villagers):
+        # type: (Iterable[str]) -> List[int]
+        """The ordinals of the villagers, in order, see require_ordinal()"""
+        return [self.require_ordinal(v, idx) for idx, v in enumerate(villagers)]
+
+    def get_compatibility(self, villager_a, villager_b):
+        # type: (str, str) -> Optional[Dict[str, CompatibilityScoreMark]]
+        return unpack_compatibility(
+            self.get_code_by_ordinal(self.require_ordinal(villager_a, 0), self.require_ordinal(villager_b, 1))
+        )
+
+    def get_verdict(self, villager_a, villager_b):
+        # type: (str, str) -> Optional[Compatibility]
+        return unpack_verdict(
+            self.get_code_by_ordinal(self.require_ordinal(villager_a, 0), self.require_ordinal(villager_b, 1))
+        )
+
+    def sub_matrix(self, villagers_list):
+        # type: (List[str]) -> List[List[Optional[Dict[str, CompatibilityScoreMark]]]]
+        return list(self.iter_sub_matrix(villagers_list))
+
+    def iter_sub_matrix(self, villagers_list):
+        # type: (List[str]) -> Iterator[List[Optional[Dict[str, CompatibilityScoreMark]]]]
+        """The rows of sub_matrix() one at a time, every villager is checked before the first one"""
+        ordinals = self.get_ordinals(villagers_list)
+        if self._storage == "triangular":
+            for oi in ordinals:
+                yield [unpack_compatibility(self.get_code_by_ordinal(oi, oj)) for oj in ordinals]
+            return
+        cells = self._cells
+        n = self._size
+        for oi in ordinals:
+            row_base = oi * n
+            yield [unpack_compatibility(cells[row_base + oj]) for oj in ordinals]
+
+    def iter_unique_pairs(self, villagers_list=None, include_diagonal=False):
+        # type: (Optional[List[str]], bool) -> Iterator[Tuple[str, str, int]]
+        """
+        (villager a, villager b, code) of every unordered pair of villagers_list (the whole roster by default) once,
+        a coming before b in the list. With include_diagonal, each villager is also paired with itself.
+        """
+        if villagers_list is None:
+            villagers_list = self._villager_ids
+        ordinals = self.get_ordinals(villagers_list)
+        first = 0 if include_diagonal else 1
+        for i, oi in enumerate(ordinals):
+            for j in range(i + first, len(ordinals)):
+                yield villagers_list[i], villagers_list[j], self.get_code_by_ordinal(oi, ordinals[j])
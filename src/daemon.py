@@ -0,0 +1,104 @@
+from typing import (
+    List, Optional, Tuple
+)
+
+import contextlib
+import io
+import os
+import socketserver
+import threading
+
+from src.compatibility_caculator import compatibility_calculator
+from src.compatibility_matrix import RosterCompatibilityMatrix
+from src.daemon_client import daemon_supported, default_socket_path, send_request
+from src.data_model import set_console_escape_support
+from src.data_reader import AcListerVillagerDataReader, VillagerDataReader
+from src.profiling import enable_profiling, get_active_profiler
+
+
+class _DaemonRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline().decode("utf-8").rstrip("\n")
+        fields = line.split("\t")
+        error, output = self.server.run_command(fields[0], fields[1:])
+        status = "OK" if error is None else "ERR " + error.replace("\n", " ")
+        self.wfile.write((status + "\n" + output).encode("utf-8"))
+
+
+class CompatibilityDaemon(socketserver.UnixStreamServer):
+    """
+    Keeps the roster, the rule tables and the roster compatibility matrix loaded and answers the line protocol
+    described in src.daemon_client on a Unix socket. Requests are served one at a time, as rendering switches the
+    process wide console color setting and redirects stdout.
+    """
+
+    def __init__(self, socket_path=None, data_src=None):
+        # type: (Optional[str], Optional[VillagerDataReader]) -> None
+        if socket_path is None:
+            socket_path = default_socket_path()
+        if os.path.exists(socket_path):
+            if send_request("ping", socket_path=socket_path) is not None:
+                raise ValueError("A daemon is already listening on {}".format(socket_path))
+            os.unlink(socket_path)
+        if data_src is None:
+            data_src = AcListerVillagerDataReader()
+        self.data_src = data_src
+        self.roster_matrix = RosterCompatibilityMatrix(data_src)
+        # The renderer imports tabulate on first use, import it now so the first request doesn't pay for it
+        import tabulate  # noqa: F401
+        self.socket_path = socket_path
+        super().__init__(socket_path, _DaemonRequestHandler)
+
+    def run_command(self, command, args):
+        # type: (str, List[str]) -> Tuple[Optional[str], str]
+        if command == "ping":
+            return None, "pong\n"
+        elif command == "metrics":
+            profiler = get_active_profiler()
+            return (None, profiler.to_prometheus()) if profiler is not None else ("Profiling is disabled", "")
+        elif command == "stop":
+            # shutdown() waits for serve_forever() to return, which can't happen while this request is handled
+            threading.Thread(target=self.shutdown).start()
+            return None, ""
+        elif command == "render" and len(args) >= 1:
+            output = io.StringIO()
+            set_console_escape_support(args[0] == "1")
+            try:
+                with contextlib.redirect_stdout(output):
+                    compatibility_calculator(args[1:], self.data_src, self.roster_matrix)
+            except ValueError as ve:
+                return str(ve), output.getvalue()
+            finally:
+                set_console_escape_support(None)
+            return None, output.getvalue()
+        return "Unknown daemon command {}".format(command), ""
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+
+def run_daemon(socket_path=None, metrics=False):
+    # type: (Optional[str], bool) -> None
+    """With metrics, the stages are timed for the metrics command, at the cost of a lock around every timed call"""
+    if not daemon_supported():
+        raise ValueError("The daemon needs Unix domain sockets, which this platform lacks")
+    if metrics:
+        enable_profiling()
+    daemon = CompatibilityDaemon(socket_path)
+    print("Listening on {}".format(daemon.socket_path))
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server_close()
+
+
+def stop_daemon(socket_path=None):
+    # type: (Optional[str]) -> bool
+    """Ask the daemon to exit, False when none is running"""
+    return send_request("stop", socket_path=socket_path) is not None
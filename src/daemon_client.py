@@ -0,0 +1,111 @@
+import os
+import socket
+import sys
+
+# Forwarding a call to a running daemon must not pay for importing the rest, not even typing
+MYPY = False
+if MYPY:
+    from typing import List, Optional, Tuple
+
+# Line protocol, one request per connection, everything UTF-8:
+#   request   the command and its arguments separated by tabs, ended by a newline:
+#               render <TAB> 0|1 (colored output) <TAB> villager id <TAB> ...
+#               metrics   (the stage counters, in the Prometheus text format)
+#               ping
+#               stop
+#   response  "OK" or "ERR <message>" on the first line, then the output of the command until the daemon closes
+#             the connection
+SOCKET_ENV_VAR = "AC_COMPAT_SOCKET"
+
+
+def daemon_supported():
+    # type: () -> bool
+    """Whether the platform has the Unix domain sockets the daemon listens on, Windows doesn't"""
+    return hasattr(socket, "AF_UNIX") and hasattr(os, "getuid")
+
+
+def default_socket_path():
+    # type: () -> str
+    if os.environ.get(SOCKET_ENV_VAR):
+        return os.environ[SOCKET_ENV_VAR]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    user_suffix = "-{}".format(os.getuid()) if hasattr(os, "getuid") else ""
+    return os.path.join(runtime_dir, "ac-villager-compatibility{}.sock".format(user_suffix))
+
+
+def encode_request(command, args):
+    # type: (str, List[str]) -> bytes
+    fields = [command] + list(args)
+    if any("\t" in f or "\n" in f for f in fields):
+        raise ValueError("Request fields can't contain tabs or newlines")
+    return ("\t".join(fields) + "\n").encode("utf-8")
+
+
+def send_request(command, args=(), socket_path=None, timeout=30.0):
+    # type: (str, List[str], Optional[str], float) -> Optional[Tuple[Optional[str], str]]
+    """
+    Send a request to the daemon and return its (error message or None, output), or None when no daemon listens on
+    the socket.
+    """
+    if not daemon_supported():
+        return None
+    if socket_path is None:
+        socket_path = default_socket_path()
+    if not os.path.exists(socket_path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # A stale socket file left by a daemon that didn't exit cleanly
+            return None
+        sock.sendall(encode_request(command, args))
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        sock.close()
+
+    status, _, output = b"".join(chunks).decode("utf-8").partition("\n")
+    if status == "OK":
+        return None, output
+    return status[len("ERR "):] if status.startswith("ERR ") else "Malformed daemon response", output
+
+
+def _console_escape_support():
+    # type: () -> bool
+    # Same decision as src.data_model.check_console_escape_support(), without importing it
+    for handle in [sys.stdout, sys.stderr]:
+        ansi_term = os.environ.get("TERM") == "ANSI"
+        if not ((hasattr(handle, "isatty") and handle.isatty()) or ansi_term):
+            return False
+        if os.name == "nt" and not ansi_term:
+            return False
+    return True
+
+
+def forward_compatibility_calculator(villager, socket_path=None):
+    # type: (List[str], Optional[str]) -> bool
+    """
+    Have the daemon render compatibility_calculator(villager) and print it as if it ran here, ValueErrors going to
+    stderr like in main.py. False when no daemon is running or the platform can't run one, nothing is printed then.
+    """
+    if not daemon_supported():
+        return False
+    try:
+        response = send_request("render", ["1" if _console_escape_support() else "0"] + list(villager), socket_path)
+    except (OSError, ValueError):
+        return False
+    if response is None:
+        return False
+    error, output = response
+    sys.stdout.write(output)
+    sys.stdout.flush()
+    if error is not None:
+        print(error, file=sys.stderr)
+    return True
@@ -30,7 +30,30 @@ def check_console_escape_support():
     return out_pipe_support[0] and out_pipe_support[1]
 
 
-CONSOLE_ESCAPE_SUPPORT = check_console_escape_support()
+_console_escape_support = None
+
+
+def console_escape_support():
+    # type: () -> bool
+    """Whether both stdout and stderr accept ANSI escapes, the terminals are only probed on the first call"""
+    global _console_escape_support
+    if _console_escape_support is None:
+        _console_escape_support = check_console_escape_support()
+    return _console_escape_support
+
+
+def set_console_escape_support(supported):
+    # type: (Optional[bool]) -> None
+    """Force whether the marks and verdicts are colored, None to probe the terminals again on the next use"""
+    global _console_escape_support
+    _console_escape_support = supported
+
+
+def __getattr__(name):
+    # CONSOLE_ESCAPE_SUPPORT is resolved on first access rather than at import time
+    if name == "CONSOLE_ESCAPE_SUPPORT":
+        return console_escape_support()
+    raise AttributeError("module {} has no attribute {}".format(__name__, name))
 
 
 class Personality(Enum):
@@ -104,11 +127,16 @@ class CompatibilityScoreMark(Enum):
     CROSS = -1
 
     def __str__(self):
-        if CONSOLE_ESCAPE_SUPPORT:
+        if console_escape_support():
             return self._get_color_text()
         else:
             return self._get_plain_text()
 
+    def get_text(self, colored=False):
+        # type: (bool) -> str
+        """The sign, with the console color escapes when colored whatever the console supports"""
+        return self._get_color_text() if colored else self._get_plain_text()
+
     def _get_plain_text(self):
         if self.value == CompatibilityScoreMark.HEART.value:
             return "♥"
@@ -144,11 +172,16 @@ class Compatibility(Enum):
     BAD = -1
 
     def __str__(self):
-        if CONSOLE_ESCAPE_SUPPORT:
+        if console_escape_support():
             return self._get_color_text()
         else:
             return self._get_plain_text()
 
+    def get_text(self, colored=False):
+        # type: (bool) -> str
+        """The verdict, with the console color escapes when colored whatever the console supports"""
+        return self._get_color_text() if colored else self._get_plain_text()
+
     def _get_plain_text(self):
         if self.value == Compatibility.GOOD.value:
             return "Good"
@@ -171,7 +204,14 @@ class Compatibility(Enum):
 
 
 class VillagerData:
+    """
+    A villager record. Readers hand the same instance to every caller, so it becomes read-only once freeze() is
+    called: setting any attribute afterwards raises AttributeError.
+    """
+    __slots__ = ("_name", "_villager_id", "_species", "_personality", "_coffee", "_birthday", "_wiki", "_frozen")
+
     def __init__(self):
+        self._frozen = False
         self._name = ""
         self._villager_id = ""
         self._species = None
@@ -180,6 +220,22 @@ class VillagerData:
         self._birthday = (0, 0)
         self._wiki = ""
 
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError("Villager {} is read-only".format(self._villager_id))
+        object.__setattr__(self, name, value)
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in VillagerData.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(VillagerData.__slots__, state):
+            object.__setattr__(self, name, value)
+
+    def freeze(self):
+        # type: () -> None
+        self._frozen = True
+
     @property
     def name(self):
         # type: () -> str
@@ -1,20 +1,74 @@
 from typing import (
-    List, Optional, Dict, Any
+    List, Optional, Dict, Any, Tuple, Iterable
 )
-import datetime
 
-from src.utils import get_data_dir_path
+from src.roster_snapshot import RosterSnapshot, SnapshotRecord, open_fresh_snapshot
+from src.utils import get_villager_data_path, get_personality_compatibility_data_path
+from src.cache import BoundedCache
+from src.profiling import stage, timed_stage
 from src.data_model import VillagerData, Personality, Species
 
+_MONTH_CONVERT_TBL = {
+    "January": 1,
+    "February": 2,
+    "March": 3,
+    "April": 4,
+    "May": 5,
+    "June": 6,
+    "July": 7,
+    "August": 8,
+    "September": 9,
+    "October": 10,
+    "November": 11,
+    "December": 12
+}
+_DAYS_IN_MONTH_TBL = [0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+
+def parse_birthday(birthday):
+    # type: (str) -> Optional[Tuple[int, int]]
+    """
+    The (month, day) of an AC-Lister birthday like "March 7", None when it has no day or a day the month doesn't have.
+    Raise a ValueError for an unknown month or a day that isn't a number.
+    """
+    split_result = birthday.split(' ')
+    if len(split_result) == 1:
+        return None
+    month_str, day_str = split_result[0], split_result[1]
+    if month_str not in _MONTH_CONVERT_TBL:
+        raise ValueError("Unknown birthday month {}".format(month_str))
+    month_int = _MONTH_CONVERT_TBL[month_str]
+    day_int = int(day_str)
+    # Validated against a leap year, like datetime(2000, m, d) would
+    if 1 <= day_int <= _DAYS_IN_MONTH_TBL[month_int]:
+        return month_int, day_int
+    return None
+
 
 class VillagerDataReader:
     def get_data_by_villager_id(self, villager_id):
         # type: (str) -> Optional[VillagerData]
         raise NotImplementedError
 
+    def get_all_villager_ids(self):
+        # type: () -> List[str]
+        raise NotImplementedError
+
+    def get_many(self, villager_ids):
+        # type: (Iterable[str]) -> List[Optional[VillagerData]]
+        return [self.get_data_by_villager_id(villager_id) for villager_id in villager_ids]
+
+    @property
+    def data_files(self):
+        # type: () -> List[str]
+        """The files the villagers are read from, empty when they aren't known"""
+        return []
+
 
 class AcListerVillagerDataReader(VillagerDataReader):
     class AcListerVillagerData(VillagerData):
+        __slots__ = ()
+
         def parse_name(self, name):
             # type: (str) -> None
             self._name = name
@@ -37,63 +91,103 @@ class AcListerVillagerDataReader(VillagerDataReader):
 
         def parse_birthday(self, birthday):
             # type: (str) -> None
-            def validate_date(y, m, d):
-                # type: (int, int, int) -> bool
-                is_valid = False
-                try:
-                    datetime.datetime(int(y), int(m), int(d))
-                    is_valid = True
-                except ValueError:
-                    pass
-                return is_valid
-
-            month_convert_tbl = {
-                "January": 1,
-                "February": 2,
-                "March": 3,
-                "April": 4,
-                "May": 5,
-                "June": 6,
-                "July": 7,
-                "August": 8,
-                "September": 9,
-                "October": 10,
-                "November": 11,
-                "December": 12
-            }
-            split_result = birthday.split(' ')
-            if len(split_result) == 1:
-                self._birthday = None
-            else:
-                month_str, day_str = split_result[0], split_result[1]
-                assert month_str in month_convert_tbl.keys()
-                month_int = month_convert_tbl[month_str]
-                day_int = int(day_str)
-                if validate_date(2000, month_int, day_int):
-                    self._birthday = (month_int, day_int)
-                else:
-                    self._birthday = None
+            self._birthday = parse_birthday(birthday)
 
         def parse_wiki(self, wiki):
             # type: (str) -> None
             self._wiki = wiki
 
-    def __init__(self, aclister_loc=None):
+        def parse_snapshot_record(self, record):
+            # type: (SnapshotRecord) -> None
+            self._villager_id, self._name, self._species, self._personality, self._coffee, self._birthday, \
+                self._wiki = record
+
+    def __init__(self, aclister_loc=None, snapshot_loc=None, use_snapshot=True, cache_size=1024, cache_policy="lru",
+                 raw_data=None):
+        """
+        With use_snapshot, the villagers are served from the binary snapshot (see src.roster_snapshot) when it was
+        compiled from the current data files, the JSON database is then only parsed if the raw data is asked for.
+        With raw_data, villager records already loaded in the villager.json layout, no file is read at all.
+
+        Every villager is parsed once and the same read-only VillagerData instance is handed out while it stays in a
+        BoundedCache of cache_size entries (see src.cache for the policies).
+        """
+        self._villager_cache = BoundedCache(cache_size, cache_policy)
+        self._raw_data = None  # type: Optional[List[Dict[str, Any]]]
+        self._villager_id_to_idx_tbl = None  # type: Optional[Dict[str, int]]
+        self._snapshot = None  # type: Optional[RosterSnapshot]
+        if raw_data is not None:
+            self._aclister_loc = None  # type: Optional[str]
+            self._index_raw_data(raw_data)
+            return
+
         if not aclister_loc:
-            import os
-            data_dir_path = get_data_dir_path()
-            aclister_loc = os.path.join(data_dir_path, "villager.json")
-        with open(aclister_loc, "r") as fp_data:
+            aclister_loc = get_villager_data_path()
+        self._aclister_loc = aclister_loc
+        if use_snapshot:
+            with stage("load"):
+                self._snapshot = open_fresh_snapshot(aclister_loc, get_personality_compatibility_data_path(),
+                                                     snapshot_loc)
+        if self._snapshot is None:
+            self._load_raw_data()
+
+    @timed_stage("load")
+    def _load_raw_data(self):
+        with open(self._aclister_loc, "r") as fp_data:
             import json
-            self.raw_data = json.load(fp_data)  # type: List[Dict[str,str]]
+            self._index_raw_data(json.load(fp_data))
 
+    def _index_raw_data(self, raw_data):
+        # type: (List[Dict[str, Any]]) -> None
+        self._raw_data = raw_data
         self._villager_id_to_idx_tbl = dict()
 
-        for idx, villager_data in enumerate(self.raw_data):
+        for idx, villager_data in enumerate(self._raw_data):
             assert villager_data['id'] not in self._villager_id_to_idx_tbl.keys()
             self._villager_id_to_idx_tbl[villager_data['id']] = idx
 
+    @property
+    def raw_data(self):
+        # type: () -> List[Dict[str, Any]]
+        if self._raw_data is None:
+            self._load_raw_data()
+        return self._raw_data
+
+    @property
+    def data_files(self):
+        # type: () -> List[str]
+        return [self._aclister_loc] if self._aclister_loc else []
+
+    @property
+    def from_snapshot(self):
+        # type: () -> bool
+        return self._snapshot is not None
+
+    @property
+    def villager_cache(self):
+        # type: () -> BoundedCache
+        return self._villager_cache
+
+    @timed_stage("lookup")
     def get_data_by_villager_id(self, villager_id):
+        villager_dat = self._villager_cache.get(villager_id)
+        if villager_dat is None:
+            villager_dat = self._parse_villager(villager_id)
+            if villager_dat is not None:
+                self._villager_cache.put(villager_id, villager_dat)
+        return villager_dat
+
+    def _parse_villager(self, villager_id):
+        # type: (str) -> Optional[AcListerVillagerData]
+        if self._snapshot is not None:
+            ordinal = self._snapshot.find_ordinal(villager_id)
+            if ordinal is None:
+                return None
+            villager_dat = AcListerVillagerDataReader.AcListerVillagerData()
+            villager_dat.parse_snapshot_record(self._snapshot.get_record(ordinal))
+            villager_dat.freeze()
+            return villager_dat
+
         if villager_id not in self._villager_id_to_idx_tbl.keys():
             return None
         villager_raw_dat = self.raw_data[self._villager_id_to_idx_tbl[villager_id]]
@@ -107,11 +201,20 @@ class AcListerVillagerDataReader(VillagerDataReader):
         villager_dat.parse_coffee(villager_raw_dat['coffee'])
         villager_dat.parse_birthday(villager_raw_dat['birthday'])
         villager_dat.parse_wiki(villager_raw_dat['wiki'])
+        villager_dat.freeze()
 
         return villager_dat
 
+    def get_all_villager_ids(self):
+        # type: () -> List[str]
+        if self._snapshot is not None:
+            return self._snapshot.get_villager_ids()
+        return [villager_data['id'] for villager_data in self.raw_data]
+
     def get_raw_data_by_villager_id(self, villager_id):
         # type: (str) -> Optional[Dict[str, Any]]
+        if self._raw_data is None:
+            self._load_raw_data()
         if villager_id not in self._villager_id_to_idx_tbl.keys():
             return None
 
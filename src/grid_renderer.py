@@ -0,0 +1,146 @@
+from typing import (
+    IO, Iterable, Iterator, List, Optional
+)
+
+import sys
+
+from src.compatibility_matrix import RosterCompatibilityMatrix, pack_compatibility, unpack_marks, NO_DATA_CODE
+from src.data_model import Compatibility, console_escape_support
+from src.data_reader import VillagerDataReader
+from src.profiling import stage
+from src.utils import calc_villager_compatibility
+
+NO_DATA_TEXT = "N/A"
+# The widest cell, "♣♣♣ | Average"
+CELL_WIDTH = 3 + len(" | ") + max(len(c.get_text()) for c in Compatibility)
+
+# The box drawing of tabulate's fancy_grid format
+_TOP = ("╒", "═", "╤", "╕")
+_HEADER_SEPARATOR = ("╞", "═", "╪", "╡")
+_ROW_SEPARATOR = ("├", "─", "┼", "┤")
+_BOTTOM = ("╘", "═", "╧", "╛")
+_VERTICAL = "│"
+
+_cell_tables = dict()
+
+
+def _get_cell_table(colored):
+    # type: (bool) -> List[str]
+    """The cell text of every roster matrix code, padded to CELL_WIDTH visible characters"""
+    cell_table = _cell_tables.get(colored)
+    if cell_table is None:
+        cell_table = [NO_DATA_TEXT + " " * (CELL_WIDTH - len(NO_DATA_TEXT))] * 256
+        for code in range(256):
+            if code == NO_DATA_CODE:
+                continue
+            try:
+                marks = unpack_marks(code)
+                verdict = Compatibility((code & 0x3) - 1)
+            except ValueError:
+                continue
+            plain = "".join(m.get_text() for m in marks) + " | " + verdict.get_text()
+            text = "".join(m.get_text(colored) for m in marks) + " | " + verdict.get_text(colored)
+            cell_table[code] = text + " " * (CELL_WIDTH - len(plain))
+        _cell_tables[colored] = cell_table
+    return cell_table
+
+
+def iter_compatibility_codes(villagers_list, data_src, roster_matrix=None):
+    # type: (List[str], VillagerDataReader, Optional[RosterCompatibilityMatrix]) -> Iterator[List[int]]
+    """
+    The roster matrix codes of the island, one row at a time and computed only when asked for, each row being a
+    "matrix" stage. Every villager is looked up (and the ValueError of calculate_compatibility_matrix() raised)
+    before the first row.
+    """
+    if roster_matrix is not None:
+        ordinals = roster_matrix.get_ordinals(villagers_list)
+        for oa in ordinals:
+            with stage("matrix"):
+                row = [roster_matrix.get_code_by_ordinal(oa, ob) for ob in ordinals]
+            yield row
+        return
+
+    villagers_data = []
+    for idx, villager_id in enumerate(villagers_list):
+        villager_dat = data_src.get_data_by_villager_id(villager_id)
+        if not villager_dat:
+            raise ValueError(
+                "Failed to query the information for the {}th villager: no villager with id {} in the database".format(
+                    idx + 1, villager_id
+                )
+            )
+        villagers_data.append(villager_dat)
+    for va in villagers_data:
+        with stage("matrix"):
+            row = [pack_compatibility(calc_villager_compatibility(va, vb)) for vb in villagers_data]
+        yield row
+
+
+def render_compatibility_grid(villagers_list, code_rows, colored=None):
+    # type: (List[str], Iterable[List[int]], Optional[bool]) -> Iterator[str]
+    """
+    The lines of the fancy_grid table of an island, yielded as soon as each row of codes comes in. Every column is
+    as wide as the widest of its header and CELL_WIDTH, so no cell has to be seen before the first line is out.
+    """
+    if colored is None:
+        colored = console_escape_support()
+    cell_table = _get_cell_table(colored)
+    id_width = max([len(v) for v in villagers_list] + [0])
+    widths = [id_width] + [max(len(v), CELL_WIDTH) for v in villagers_list]
+    # What to append to a CELL_WIDTH cell for it to fill its column
+    cell_padding = [" " * (w - CELL_WIDTH) for w in widths[1:]]
+
+    def rule(chars):
+        left, fill, cross, right = chars
+        return left + cross.join(fill * (w + 2) for w in widths) + right
+
+    def line(cells):
+        return _VERTICAL + " " + (" " + _VERTICAL + " ").join(cells) + " " + _VERTICAL
+
+    yield rule(_TOP)
+    yield line([" " * id_width] + [v + " " * (w - len(v)) for v, w in zip(villagers_list, widths[1:])])
+    yield rule(_HEADER_SEPARATOR)
+    row_separator = rule(_ROW_SEPARATOR)
+    for idx, codes in enumerate(code_rows):
+        if idx:
+            yield row_separator
+        villager_id = villagers_list[idx]
+        yield line([villager_id + " " * (id_width - len(villager_id))] +
+                   [cell_table[code] + padding for code, padding in zip(codes, cell_padding)])
+    yield rule(_BOTTOM)
+
+
+def print_compatibility_grid(villagers_list,  # type: List[str]
+                             data_src,  # type: VillagerDataReader
+                             roster_matrix=None,  # type: Optional[RosterCompatibilityMatrix]
+                             colored=None,  # type: Optional[bool]
+                             out=None,  # type: Optional[IO[str]]
+                             report_cache=None,  # type: Optional[IslandReportCache]
+                             ):
+    # type: (...) -> None
+    """
+    Compute and print the compatibility grid of an island row by row, to stdout by default. With a report_cache, the
+    island is read from it, or computed whole and stored in it. The report_cache must be bound to the data files of
+    data_src.
+    """
+    if out is None:
+        out = sys.stdout
+    if report_cache is not None:
+        report_cache.check_data_src(data_src)
+        cached_rows = report_cache.get_codes(villagers_list)
+        if cached_rows is None:
+            cached_rows = list(iter_compatibility_codes(villagers_list, data_src, roster_matrix))
+            report_cache.put_codes(villagers_list, cached_rows)
+        code_rows = iter(cached_rows)  # type: Iterator[List[int]]
+    else:
+        code_rows = iter_compatibility_codes(villagers_list, data_src, roster_matrix)
+    first_row = next(code_rows, None)
+
+    def rows():
+        if first_row is not None:
+            yield first_row
+            yield from code_rows
+
+    for text in render_compatibility_grid(villagers_list, rows(), colored):
+        out.write(text)
+        out.write("\n")
@@ -0,0 +1,265 @@
+from typing import (
+    List, Optional, Dict, Tuple, Any
+)
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+import json
+
+from src.cache import BoundedCache
+from src.compatibility_index import CompatibilityIndex
+from src.compatibility_matrix import RosterCompatibilityMatrix
+from src.data_reader import AcListerVillagerDataReader, VillagerDataReader
+from src.island_report import villager_record, compatibility_record, island_report
+from src.profiling import enable_profiling, get_active_profiler
+from src.recommendations import DEFAULT_TOP_K, recommend
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+# Islands longer than this are refused, the response grows with the square of the island size
+MAX_ISLAND_SIZE = 64
+# Partners listed per page when the request has no limit
+DEFAULT_PAGE_SIZE = 100
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        # type: (int, str) -> None
+        super().__init__(message)
+        self.status = status
+
+
+class CompatibilityApi:
+    """
+    The request handling of the HTTP API, independent from the server so it can be called directly:
+
+        GET /villagers                         the ids of every villager
+        GET /villagers/<id>                    one villager
+        GET /compatibility/<id a>/<id b>       the marks and verdict of a pair, null when they can't be calculated
+        GET /island?villagers=<id>,<id>,...    the island_report() of an island plus its compatibility "matrix"
+        POST /island                           the same, the body being the JSON list of villager ids
+        GET /partners?villagers=<id>,...&verdict=good|average|bad&offset=<n>&limit=<n>
+                                               a page of the villagers in that compatibility with every one of the
+                                               villagers, in id order
+        GET /recommendations?villagers=<id>,...&k=<n>
+                                               the villagers best to move onto the island and its best single swap
+        GET /metrics                           the stage counters of the active profiler, as Prometheus text
+
+    Island responses are kept in an LRU cache keyed by the sorted villager ids, so the same island asked for in
+    another order is a cache hit and only gets its rows and columns reordered.
+    """
+
+    def __init__(self, data_src=None, cache_size=1024):
+        # type: (Optional[VillagerDataReader], int) -> None
+        if data_src is None:
+            data_src = AcListerVillagerDataReader()
+        self._data_src = data_src
+        self._roster_matrix = RosterCompatibilityMatrix(data_src)
+        self._island_cache = BoundedCache(cache_size, "lru")
+        self._compatibility_index = None  # type: Optional[CompatibilityIndex]
+
+    @property
+    def island_cache(self):
+        # type: () -> BoundedCache
+        return self._island_cache
+
+    def _require_villager(self, villager_id):
+        # type: (str) -> int
+        ordinal = self._roster_matrix.get_ordinal(villager_id)
+        if ordinal is None:
+            raise ApiError(404, "No villager with id {} in the database".format(villager_id))
+        return ordinal
+
+    def get_villager_ids(self):
+        # type: () -> List[str]
+        return self._roster_matrix.villager_ids
+
+    def get_villager(self, villager_id):
+        # type: (str) -> Dict[str, Any]
+        self._require_villager(villager_id)
+        return villager_record(self._data_src.get_data_by_villager_id(villager_id))
+
+    def get_compatibility(self, villager_a, villager_b):
+        # type: (str, str) -> Dict[str, Any]
+        code = self._roster_matrix.get_code_by_ordinal(self._require_villager(villager_a),
+                                                       self._require_villager(villager_b))
+        return {"villagers": [villager_a, villager_b], "compatibility": compatibility_record(code)}
+
+    def get_island(self, villagers):
+        # type: (List[str]) -> Dict[str, Any]
+        if not villagers:
+            raise ApiError(400, "An island needs at least one villager")
+        if len(villagers) > MAX_ISLAND_SIZE:
+            raise ApiError(400, "An island can't have more than {} villagers".format(MAX_ISLAND_SIZE))
+        for villager_id in villagers:
+            self._require_villager(villager_id)
+
+        key = tuple(sorted(villagers))
+        canonical = self._island_cache.get(key)
+        if canonical is None:
+            canonical = island_report(self._roster_matrix, list(key))
+            ordinals = [self._roster_matrix.get_ordinal(v) for v in key]
+            canonical["matrix"] = [
+                [compatibility_record(self._roster_matrix.get_code_by_ordinal(oa, ob)) for ob in ordinals]
+                for oa in ordinals
+            ]
+            self._island_cache.put(key, canonical)
+
+        # Position of every requested villager in the canonical order, duplicates map to successive positions
+        positions = dict()  # type: Dict[str, List[int]]
+        for idx, villager_id in enumerate(key):
+            positions.setdefault(villager_id, []).append(idx)
+        order = [positions[villager_id].pop(0) for villager_id in villagers]
+
+        response = dict(canonical)
+        response["villagers"] = list(villagers)
+        response["matrix"] = [[canonical["matrix"][i][j] for j in order] for i in order]
+        return response
+
+    def get_partners(self, villagers, verdict, offset=0, limit=DEFAULT_PAGE_SIZE):
+        # type: (List[str], str, int, Optional[int]) -> Dict[str, Any]
+        if not villagers:
+            raise ApiError(400, "Partners of at least one villager must be asked for")
+        for villager_id in villagers:
+            self._require_villager(villager_id)
+        if self._compatibility_index is None:
+            # Built on the first query, from the roster matrix. Concurrent first queries may each build one, the
+            # last one built is kept.
+            self._compatibility_index = CompatibilityIndex(self._data_src, self._roster_matrix)
+        try:
+            page = self._compatibility_index.query(villagers, verdict, offset, limit)
+        except ValueError as ve:
+            raise ApiError(400, str(ve))
+        return {
+            "villagers": list(villagers),
+            "verdict": verdict.upper(),
+            "total": page.total,
+            "offset": page.offset,
+            "limit": page.limit,
+            "next_offset": page.next_offset,
+            "partners": page.villagers,
+        }
+
+    def get_recommendations(self, villagers, k=DEFAULT_TOP_K):
+        # type: (List[str], int) -> Dict[str, Any]
+        if len(villagers) > MAX_ISLAND_SIZE:
+            raise ApiError(400, "An island can't have more than {} villagers".format(MAX_ISLAND_SIZE))
+        for villager_id in villagers:
+            self._require_villager(villager_id)
+        try:
+            return recommend(self._roster_matrix, villagers, k)
+        except ValueError as ve:
+            raise ApiError(400, str(ve))
+
+    def handle(self, method, path, body=b""):
+        # type: (str, str, bytes) -> Tuple[int, Any]
+        """The (HTTP status, JSON serializable payload) answering a request"""
+        url = urlsplit(path)
+        parts = [unquote(p) for p in url.path.split("/") if p]
+        try:
+            if method == "GET" and parts == ["villagers"]:
+                return 200, self.get_villager_ids()
+            elif method == "GET" and len(parts) == 2 and parts[0] == "villagers":
+                return 200, self.get_villager(parts[1])
+            elif method == "GET" and len(parts) == 3 and parts[0] == "compatibility":
+                return 200, self.get_compatibility(parts[1], parts[2])
+            elif parts == ["island"] and method == "GET":
+                query = parse_qs(url.query)
+                villagers = [v for value in query.get("villagers", []) for v in value.split(",") if v]
+                return 200, self.get_island(villagers)
+            elif parts == ["island"] and method == "POST":
+                try:
+                    villagers = json.loads(body.decode("utf-8"))
+                except ValueError:
+                    raise ApiError(400, "The body must be a JSON list of villager ids")
+                if not isinstance(villagers, list) or not all(isinstance(v, str) for v in villagers):
+                    raise ApiError(400, "The body must be a JSON list of villager ids")
+                return 200, self.get_island(villagers)
+            elif method == "GET" and parts == ["partners"]:
+                query = parse_qs(url.query)
+                villagers = [v for value in query.get("villagers", []) for v in value.split(",") if v]
+                try:
+                    offset = int(query.get("offset", ["0"])[0])
+                    limit = int(query.get("limit", [str(DEFAULT_PAGE_SIZE)])[0])
+                except ValueError:
+                    raise ApiError(400, "The offset and the limit must be integers")
+                return 200, self.get_partners(villagers, query.get("verdict", ["good"])[0], offset, limit)
+            elif method == "GET" and parts == ["recommendations"]:
+                query = parse_qs(url.query)
+                villagers = [v for value in query.get("villagers", []) for v in value.split(",") if v]
+                try:
+                    k = int(query.get("k", [str(DEFAULT_TOP_K)])[0])
+                except ValueError:
+                    raise ApiError(400, "k must be an integer")
+                return 200, self.get_recommendations(villagers, k)
+            elif method == "GET" and parts == ["metrics"] and get_active_profiler() is not None:
+                return 200, get_active_profiler().to_prometheus()
+            raise ApiError(404, "No such endpoint: {} {}".format(method, url.path))
+        except ApiError as ae:
+            return ae.status, {"error": str(ae)}
+
+
+class _ApiRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps the connection alive between requests, every response carries a Content-Length for that
+    protocol_version = "HTTP/1.1"
+    server_version = "VillagerCompatibility/1.0"
+
+    def _respond(self, method):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length < 0:
+                raise ValueError
+        except ValueError:
+            # The body can't be told apart from the next request, the connection is closed after the reply
+            self.close_connection = True
+            status, payload = 400, {"error": "Invalid Content-Length"}
+        else:
+            body = self.rfile.read(length) if length else b""
+            status, payload = self.server.api.handle(method, self.path, body)
+        if isinstance(payload, str):
+            encoded = payload.encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            encoded = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def do_GET(self):
+        self._respond("GET")
+
+    def do_POST(self):
+        self._respond("POST")
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class CompatibilityApiServer(ThreadingHTTPServer):
+    """A ThreadingHTTPServer answering every request with the shared CompatibilityApi"""
+    daemon_threads = True
+
+    def __init__(self, api, host=DEFAULT_HOST, port=DEFAULT_PORT, quiet=False):
+        # type: (CompatibilityApi, str, int, bool) -> None
+        self.api = api
+        self.quiet = quiet
+        super().__init__((host, port), _ApiRequestHandler)
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, cache_size=1024, quiet=False, metrics=False):
+    # type: (str, int, int, bool, bool) -> None
+    """With metrics, the stages are timed for GET /metrics, at the cost of a lock around every timed call"""
+    if metrics:
+        enable_profiling()
+    server = CompatibilityApiServer(CompatibilityApi(cache_size=cache_size), host, port, quiet)
+    print("Serving on http://{}:{}/".format(*server.server_address[:2]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,443 @@
+from typing import (
+    Iterable, List, Optional, Dict, Tuple, Any
+)
+
+import heapq
+import time
+
+from src.data_model import Compatibility
+from src.data_reader import VillagerDataReader
+from src.compatibility_matrix import RosterCompatibilityMatrix, unpack_verdict, NO_DATA_CODE
+
+ISLAND_SIZE = 10
+
+# How many search nodes are visited between two deadline / shared incumbent checks
+_CHECK_INTERVAL = 1024
+
+
+class IslandOptimizationResult:
+    def __init__(self, villagers, good_pairs, bad_pairs, optimal, explored_nodes):
+        # type: (List[str], int, int, bool, int) -> None
+        self._villagers = villagers
+        self._good_pairs = good_pairs
+        self._bad_pairs = bad_pairs
+        self._optimal = optimal
+        self._explored_nodes = explored_nodes
+
+    @property
+    def villagers(self):
+        # type: () -> List[str]
+        return self._villagers
+
+    @property
+    def good_pairs(self):
+        # type: () -> int
+        return self._good_pairs
+
+    @property
+    def bad_pairs(self):
+        # type: () -> int
+        return self._bad_pairs
+
+    @property
+    def optimal(self):
+        # type: () -> bool
+        """False when the search was stopped by the timeout, the island is then the best one found so far"""
+        return self._optimal
+
+    @property
+    def explored_nodes(self):
+        # type: () -> int
+        return self._explored_nodes
+
+    def __repr__(self):
+        return "IslandOptimizationResult(villagers={}, good_pairs={}, bad_pairs={}, optimal={})".format(
+            self._villagers, self._good_pairs, self._bad_pairs, self._optimal
+        )
+
+
+class IslandObjective:
+    """
+    Turns the roster matrix into integer pair weights. Without minimize_bad a pair is worth 1 when it is GOOD. With
+    minimize_bad a GOOD pair is worth more than all the BAD pairs an island can hold and each BAD pair costs 1, so the
+    island with the most GOOD pairs wins and ties are broken by the fewest BAD pairs.
+    """
+
+    def __init__(self, roster_matrix, island_size=ISLAND_SIZE, minimize_bad=False):
+        # type: (RosterCompatibilityMatrix, int, bool) -> None
+        self.roster_matrix = roster_matrix
+        self.island_size = island_size
+        self.minimize_bad = minimize_bad
+        self.max_pairs = island_size * (island_size - 1) // 2
+        self.good_weight = self.max_pairs + 1 if minimize_bad else 1
+        self.bad_weight = -1 if minimize_bad else 0
+
+        self.code_weights = [0] * 256
+        for code in range(256):
+            verdict = unpack_verdict(code)
+            if verdict == Compatibility.GOOD:
+                self.code_weights[code] = self.good_weight
+            elif verdict == Compatibility.BAD:
+                self.code_weights[code] = self.bad_weight
+
+    def weight_by_ordinal(self, ordinal_a, ordinal_b):
+        # type: (int, int) -> int
+        return self.code_weights[self.roster_matrix.get_code_by_ordinal(ordinal_a, ordinal_b)]
+
+    def weight_matrix(self, ordinals):
+        # type: (List[int]) -> List[List[int]]
+        """The pair weights among the given roster ordinals, indexed by position in `ordinals`"""
+        code_weights = self.code_weights
+        get_code = self.roster_matrix.get_code_by_ordinal
+        return [[code_weights[get_code(oa, ob)] for ob in ordinals] for oa in ordinals]
+
+    def count_pairs(self, villagers):
+        # type: (List[str]) -> Tuple[int, int]
+        """Number of (GOOD, BAD) pairs on the island"""
+        good = bad = 0
+        for i in range(len(villagers)):
+            for j in range(i + 1, len(villagers)):
+                verdict = self.roster_matrix.get_verdict(villagers[i], villagers[j])
+                if verdict == Compatibility.GOOD:
+                    good += 1
+                elif verdict == Compatibility.BAD:
+                    bad += 1
+        return good, bad
+
+
+class _SearchProblem:
+    """
+    The island search reduced to picking `slots` of the candidates 0..M-1, plain lists only so it pickles cheaply to
+    the worker processes.
+    """
+
+    def __init__(self, weights, base_gains, base_score, potentials, class_ids, colors, good_weight, slots, max_score):
+        # type: (List[List[int]], List[int], int, List[int], List[int], List[int], int, int, int) -> None
+        self.weights = weights  # pair weights among the candidates
+        self.base_gains = base_gains  # weight of each candidate towards the required villagers
+        self.base_score = base_score  # weight among the required villagers
+        self.potentials = potentials  # bound on a candidate's weight towards the other new picks
+        self.class_ids = class_ids  # candidates with equal class ids are interchangeable, they are adjacent
+        self.colors = colors  # candidates of the same color are never GOOD with each other
+        self.good_weight = good_weight
+        self.slots = slots
+        self.max_score = max_score
+
+
+class _BranchAndBound:
+    def __init__(self, problem, incumbent_score, deadline=None, shared_best=None):
+        # type: (_SearchProblem, int, Optional[float], Optional[Any]) -> None
+        self._problem = problem
+        self._deadline = deadline
+        self._shared_best = shared_best
+        self.best_score = incumbent_score
+        self.best_picks = None  # type: Optional[List[int]]
+        self.nodes = 0
+        self.timed_out = False
+
+    def run(self, first_pick=None):
+        # type: (Optional[int]) -> None
+        problem = self._problem
+        self._check()
+        gains = list(problem.base_gains)
+        if first_pick is None:
+            self._dfs(0, gains, [], problem.base_score)
+        else:
+            w = problem.weights[first_pick]
+            for c in range(first_pick + 1, len(gains)):
+                gains[c] += w[c]
+            self._dfs(first_pick + 1, gains, [first_pick], problem.base_score + gains[first_pick])
+
+    def _check(self):
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            self.timed_out = True
+        if self._shared_best is not None:
+            self.best_score = max(self.best_score, self._shared_best.value)
+
+    def _found(self, score, picks):
+        # type: (int, List[int]) -> None
+        self.best_score = score
+        self.best_picks = list(picks)
+        if self._shared_best is not None:
+            with self._shared_best.get_lock():
+                if score > self._shared_best.value:
+                    self._shared_best.value = score
+
+    def _upper_bound(self, start, gains, remaining, score):
+        # type: (int, List[int], int, int) -> int
+        problem = self._problem
+        m = len(gains)
+
+        # Degree bound: the exact gain towards the villagers already picked, plus half of each candidate's potential
+        # towards the other new picks (every pair among the new picks is counted from both ends).
+        potentials = problem.potentials
+        degree_bound = sum(heapq.nlargest(remaining, [2 * gains[c] + potentials[c] for c in range(start, m)])) // 2
+
+        # Coloring bound: all the pairs among the new picks may be GOOD, except the ones sharing a color. Taking the
+        # t-th best candidate of a color costs t GOOD pairs, and as these marginal values only fall within a color
+        # the best `remaining` of them bound any pick.
+        colors = problem.colors
+        good_weight = problem.good_weight
+        taken_per_color = dict()  # type: Dict[int, int]
+        marginals = []
+        for c in sorted(range(start, m), key=gains.__getitem__, reverse=True):
+            taken = taken_per_color.get(colors[c], 0)
+            taken_per_color[colors[c]] = taken + 1
+            marginals.append(gains[c] - taken * good_weight)
+        color_bound = remaining * (remaining - 1) // 2 * good_weight + sum(heapq.nlargest(remaining, marginals))
+
+        return score + min(degree_bound, color_bound)
+
+    def _dfs(self, start, gains, picks, score):
+        # type: (int, List[int], List[int], int) -> None
+        self.nodes += 1
+        if self.nodes % _CHECK_INTERVAL == 0:
+            self._check()
+        if self.timed_out:
+            return
+
+        problem = self._problem
+        remaining = problem.slots - len(picks)
+        if remaining == 0:
+            if score > self.best_score:
+                self._found(score, picks)
+            return
+
+        m = len(gains)
+        if m - start < remaining or self.best_score >= problem.max_score:
+            return
+
+        if self._upper_bound(start, gains, remaining, score) <= self.best_score:
+            return
+
+        weights = problem.weights
+        class_ids = problem.class_ids
+        for k in range(start, m - remaining + 1):
+            # Symmetry breaking: of interchangeable candidates only prefixes are picked, picking k while skipping its
+            # twin k - 1 would just repeat the branch that picked k - 1
+            if k > start and class_ids[k] == class_ids[k - 1]:
+                continue
+            w = weights[k]
+            for c in range(k + 1, m):
+                gains[c] += w[c]
+            picks.append(k)
+            self._dfs(k + 1, gains, picks, score + gains[k])
+            picks.pop()
+            for c in range(k + 1, m):
+                gains[c] -= w[c]
+            if self.timed_out or self.best_score >= problem.max_score:
+                return
+
+
+# The search problem of the worker processes, installed once by _init_worker() instead of being pickled per task
+_worker_problem = None  # type: Optional[_SearchProblem]
+_worker_shared_best = None
+
+
+def _init_worker(problem, shared_best):
+    global _worker_problem, _worker_shared_best
+    _worker_problem = problem
+    _worker_shared_best = shared_best
+
+
+def _solve_branch(args):
+    # type: (Tuple[int, int, Optional[float]]) -> Tuple[int, Optional[List[int]], int, bool]
+    first_pick, incumbent_score, deadline = args
+    bnb = _BranchAndBound(_worker_problem, incumbent_score, deadline, _worker_shared_best)
+    bnb.run(first_pick)
+    return bnb.best_score, bnb.best_picks, bnb.nodes, bnb.timed_out
+
+
+def _greedy_coloring(ordinals, objective):
+    # type: (List[int], IslandObjective) -> List[int]
+    """Color the GOOD graph among the ordinals greedily in the given order, using bitsets over their positions"""
+    color_members = []  # type: List[int]
+    colors = []
+    for i, oa in enumerate(ordinals):
+        good_neighbors = 0
+        for j, ob in enumerate(ordinals[:i]):
+            if objective.weight_by_ordinal(oa, ob) == objective.good_weight:
+                good_neighbors |= 1 << j
+        for color, members in enumerate(color_members):
+            if not members & good_neighbors:
+                color_members[color] |= 1 << i
+                colors.append(color)
+                break
+        else:
+            colors.append(len(color_members))
+            color_members.append(1 << i)
+    return colors
+
+
+def _greedy_picks(problem):
+    # type: (_SearchProblem) -> Tuple[int, List[int]]
+    """A quick incumbent: add the best candidate one at a time, then improve with single swaps"""
+    m = len(problem.base_gains)
+    gains = list(problem.base_gains)
+    picks = []  # type: List[int]
+    for _ in range(problem.slots):
+        best = max(
+            (c for c in range(m) if c not in picks),
+            key=lambda c: (gains[c], problem.potentials[c])
+        )
+        picks.append(best)
+        for c in range(m):
+            gains[c] += problem.weights[best][c]
+
+    def score_of(_picks):
+        s = problem.base_score
+        for i, a in enumerate(_picks):
+            s += problem.base_gains[a]
+            for b in _picks[i + 1:]:
+                s += problem.weights[a][b]
+        return s
+
+    score = score_of(picks)
+    improved = True
+    while improved and score < problem.max_score:
+        improved = False
+        for i in range(len(picks)):
+            others = picks[:i] + picks[i + 1:]
+            for c in range(m):
+                if c in picks:
+                    continue
+                candidate_score = score_of(others + [c])
+                if candidate_score > score:
+                    picks = others + [c]
+                    score = candidate_score
+                    improved = True
+                    break
+            if improved:
+                break
+    return score, sorted(picks)
+
+
+def resolve_island_constraints(roster_matrix, island_size, required, excluded):
+    # type: (RosterCompatibilityMatrix, int, Iterable[str], Iterable[str]) -> Tuple[List[int], List[int]]
+    """
+    Validate the required / excluded villagers and return the ordinals of the required villagers and of the
+    candidates for the remaining slots. Villagers lacking data are never GOOD nor BAD with anyone, they are left out
+    of the candidates.
+    """
+    required = list(dict.fromkeys(required))
+    excluded = set(excluded)
+    for villager_id in list(required) + list(excluded):
+        if villager_id not in roster_matrix:
+            raise ValueError("No villager with id {} in the database".format(villager_id))
+    if excluded.intersection(required):
+        raise ValueError("Villager {} is both required and excluded".format(sorted(excluded.intersection(required))[0]))
+    if len(required) > island_size:
+        raise ValueError("{} villagers are required but an island only holds {}".format(len(required), island_size))
+
+    required_ordinals = [roster_matrix.get_ordinal(v) for v in required]
+    candidate_ordinals = []
+    for villager_id in roster_matrix.villager_ids:
+        if villager_id in excluded or villager_id in required:
+            continue
+        ordinal = roster_matrix.get_ordinal(villager_id)
+        if roster_matrix.get_code_by_ordinal(ordinal, ordinal) == NO_DATA_CODE:
+            continue
+        candidate_ordinals.append(ordinal)
+
+    if len(candidate_ordinals) < island_size - len(required):
+        raise ValueError("Not enough candidate villagers to fill an island of {}".format(island_size))
+    return required_ordinals, candidate_ordinals
+
+
+def find_best_island(data_src,  # type: VillagerDataReader
+                     island_size=ISLAND_SIZE,  # type: int
+                     required=(),  # type: Iterable[str]
+                     excluded=(),  # type: Iterable[str]
+                     minimize_bad=False,  # type: bool
+                     workers=1,  # type: int
+                     timeout=None,  # type: Optional[float]
+                     roster_matrix=None,  # type: Optional[RosterCompatibilityMatrix]
+                     ):
+    # type: (...) -> IslandOptimizationResult
+    """
+    Find the island with the most GOOD pairs (and with minimize_bad, the fewest BAD pairs among those) by branch and
+    bound. `required` villagers are always on the island, `excluded` ones never. With workers > 1 the first-level
+    branches are spread over a process pool sharing the incumbent score. When `timeout` seconds pass the best island
+    found so far is returned with optimal=False.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    if roster_matrix is None:
+        roster_matrix = RosterCompatibilityMatrix(data_src)
+    objective = IslandObjective(roster_matrix, island_size, minimize_bad)
+
+    required_ordinals, candidate_ordinals = resolve_island_constraints(roster_matrix, island_size, required, excluded)
+    villager_ids = roster_matrix.villager_ids
+    required = [villager_ids[o] for o in required_ordinals]
+
+    slots = island_size - len(required)
+    # Only pairs between villagers with data can be GOOD, which caps the best possible score
+    valid_members = slots + sum(1 for o in required_ordinals if roster_matrix.get_code_by_ordinal(o, o) != NO_DATA_CODE)
+
+    # Villagers with identical matrix rows are interchangeable, group them and try the promising ones first
+    class_key_to_id = dict()  # type: Dict[bytes, int]
+    class_of = dict()  # type: Dict[int, int]
+    for ordinal in candidate_ordinals:
+        row = bytes(roster_matrix.get_row_codes(villager_ids[ordinal]))
+        class_of[ordinal] = class_key_to_id.setdefault(row, len(class_key_to_id))
+
+    def static_gain(_ordinal):
+        return sum(objective.weight_by_ordinal(_ordinal, r) for r in required_ordinals)
+
+    good_degree = dict()
+    for ordinal in candidate_ordinals:
+        good_degree[ordinal] = sum(
+            1 for other in candidate_ordinals
+            if other != ordinal and objective.weight_by_ordinal(ordinal, other) == objective.good_weight
+        )
+
+    def potential(_ordinal):
+        return min(slots - 1, good_degree[_ordinal]) * objective.good_weight
+
+    candidate_ordinals.sort(key=lambda o: (-(2 * static_gain(o) + potential(o)), class_of[o], o))
+
+    problem = _SearchProblem(
+        weights=objective.weight_matrix(candidate_ordinals),
+        base_gains=[static_gain(o) for o in candidate_ordinals],
+        base_score=sum(
+            objective.weight_by_ordinal(a, b)
+            for i, a in enumerate(required_ordinals) for b in required_ordinals[i + 1:]
+        ),
+        potentials=[potential(o) for o in candidate_ordinals],
+        class_ids=[class_of[o] for o in candidate_ordinals],
+        colors=_greedy_coloring(candidate_ordinals, objective),
+        good_weight=objective.good_weight,
+        slots=slots,
+        max_score=valid_members * (valid_members - 1) // 2 * objective.good_weight,
+    )
+
+    best_score, best_picks = _greedy_picks(problem)
+    nodes = 0
+    timed_out = False
+    if workers <= 1 or slots == 0:
+        bnb = _BranchAndBound(problem, best_score, deadline)
+        bnb.run()
+        nodes, timed_out = bnb.nodes, bnb.timed_out
+        if bnb.best_picks is not None:
+            best_score, best_picks = bnb.best_score, bnb.best_picks
+    else:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        shared_best = multiprocessing.Value('q', best_score)
+        first_picks = [
+            k for k in range(len(candidate_ordinals) - slots + 1)
+            if k == 0 or problem.class_ids[k] != problem.class_ids[k - 1]
+        ]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(problem, shared_best)) as executor:
+            for branch_score, branch_picks, branch_nodes, branch_timed_out in executor.map(
+                    _solve_branch, [(k, best_score, deadline) for k in first_picks]
+            ):
+                nodes += branch_nodes
+                timed_out = timed_out or branch_timed_out
+                if branch_picks is not None and branch_score > best_score:
+                    best_score, best_picks = branch_score, branch_picks
+
+    villagers = required + [villager_ids[candidate_ordinals[k]] for k in sorted(best_picks)]
+    good_pairs, bad_pairs = objective.count_pairs(villagers)
+    return IslandOptimizationResult(villagers, good_pairs, bad_pairs, not timed_out, nodes)
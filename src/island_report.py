@@ -0,0 +1,89 @@
+from typing import (
+    List, Dict, Any, Optional, Tuple
+)
+
+from src.compatibility_matrix import RosterCompatibilityMatrix, unpack_compatibility, unpack_verdict
+from src.data_model import VillagerData
+from src.profiling import timed_stage
+from src.utils import get_star_sign_by_birthday
+
+# The report keys counting the pairs of each verdict, the last one being the pairs that can't be calculated
+COUNT_KEYS = ("bad_pairs", "average_pairs", "good_pairs", "no_data_pairs")
+# Index into COUNT_KEYS of every roster matrix code
+COUNT_SLOT_BY_CODE = tuple(
+    unpack_verdict(code).value + 1 if unpack_verdict(code) is not None else 3 for code in range(256)
+)  # type: Tuple[int, ...]
+
+
+def count_slot(code):
+    # type: (int) -> int
+    """The index into COUNT_KEYS of the pairs a roster matrix code is counted with"""
+    return COUNT_SLOT_BY_CODE[code]
+
+
+def villager_record(villager):
+    # type: (VillagerData) -> Dict[str, Any]
+    """A JSON serializable copy of a villager, enums by name and the birthday as [month, day]"""
+    return {
+        "id": villager.villager_id,
+        "name": villager.name,
+        "species": villager.species.name if villager.species else None,
+        "personality": villager.personality.name if villager.personality else None,
+        "coffee": villager.coffee,
+        "birthday": list(villager.birthday) if villager.birthday else None,
+        "star_sign": get_star_sign_by_birthday(villager.birthday).name if villager.birthday else None,
+        "wiki": villager.wiki,
+    }
+
+
+def compatibility_record(code):
+    # type: (int) -> Optional[Dict[str, str]]
+    """The marks and verdict of a roster matrix code by name, None when the compatibility can't be calculated"""
+    comp = unpack_compatibility(code)
+    if comp is None:
+        return None
+    return {
+        "species": comp["species"].name,
+        "personality": comp["personality"].name,
+        "star_sign": comp["star_sign"].name,
+        "verdict": unpack_verdict(code).name,
+    }
+
+
+def pair_record(code):
+    # type: (int) -> Dict[str, Optional[str]]
+    """compatibility_record(), with every field None when the compatibility can't be calculated"""
+    return compatibility_record(code) or {"species": None, "personality": None, "star_sign": None, "verdict": None}
+
+
+@timed_stage("matrix")
+def island_report(roster_matrix, villagers, with_pairs=False):
+    # type: (RosterCompatibilityMatrix, List[str], bool) -> Dict[str, Any]
+    """
+    A JSON serializable summary of an island: its villagers and how many of their pairs are in good, average, bad
+    compatibility or can't be calculated. With with_pairs, "pairs" also lists every pair (in island order) with its
+    marks and verdict, as names of the CompatibilityScoreMark and Compatibility enums.
+    """
+    ordinals = roster_matrix.get_ordinals(villagers)
+    counts = [0, 0, 0, 0]
+    pairs = []
+    for i in range(len(ordinals)):
+        row = roster_matrix.get_row_codes(villagers[i])
+        for j in range(i + 1, len(ordinals)):
+            code = row[ordinals[j]]
+            counts[COUNT_SLOT_BY_CODE[code]] += 1
+            if with_pairs:
+                pair = {"villagers": [villagers[i], villagers[j]]}  # type: Dict[str, Any]
+                pair.update(pair_record(code))
+                pairs.append(pair)
+
+    report = {
+        "villagers": list(villagers),
+        "good_pairs": counts[2],
+        "average_pairs": counts[1],
+        "bad_pairs": counts[0],
+        "no_data_pairs": counts[3],
+    }  # type: Dict[str, Any]
+    if with_pairs:
+        report["pairs"] = pairs
+    return report
@@ -0,0 +1,248 @@
+from typing import (
+    Iterable, List, Optional, Tuple, Callable
+)
+
+import math
+import random
+import time
+
+from src.data_reader import VillagerDataReader
+from src.compatibility_matrix import RosterCompatibilityMatrix
+from src.island_optimizer import ISLAND_SIZE, IslandObjective, resolve_island_constraints
+
+# How many moves are made between two clock readings
+_CLOCK_INTERVAL = 256
+
+
+class IslandSearchProgress:
+    def __init__(self, chain, iterations, good_pairs, bad_pairs, elapsed):
+        # type: (int, int, int, int, float) -> None
+        self.chain = chain
+        self.iterations = iterations
+        self.good_pairs = good_pairs
+        self.bad_pairs = bad_pairs
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return "IslandSearchProgress(chain={}, iterations={}, good_pairs={}, bad_pairs={}, elapsed={:.3f})".format(
+            self.chain, self.iterations, self.good_pairs, self.bad_pairs, self.elapsed
+        )
+
+
+class IslandSearchResult:
+    def __init__(self, villagers, good_pairs, bad_pairs, iterations, seed):
+        # type: (List[str], int, int, int, int) -> None
+        self._villagers = villagers
+        self._good_pairs = good_pairs
+        self._bad_pairs = bad_pairs
+        self._iterations = iterations
+        self._seed = seed
+
+    @property
+    def villagers(self):
+        # type: () -> List[str]
+        return self._villagers
+
+    @property
+    def good_pairs(self):
+        # type: () -> int
+        return self._good_pairs
+
+    @property
+    def bad_pairs(self):
+        # type: () -> int
+        return self._bad_pairs
+
+    @property
+    def iterations(self):
+        # type: () -> int
+        """Total number of annealing moves made by all the chains"""
+        return self._iterations
+
+    @property
+    def seed(self):
+        # type: () -> int
+        """The base seed, chain i is seeded with seed + i"""
+        return self._seed
+
+    def __repr__(self):
+        return "IslandSearchResult(villagers={}, good_pairs={}, bad_pairs={}, iterations={}, seed={})".format(
+            self._villagers, self._good_pairs, self._bad_pairs, self._iterations, self._seed
+        )
+
+
+class _AnnealingChain:
+    """
+    One simulated annealing chain over the candidates 0..M-1 plus the required villagers M..M+P-1. Every move swaps an
+    islander for an outsider, scored in O(1) from the per-villager gains (the weight towards the current islanders),
+    which are updated in O(M) when the move is accepted.
+    """
+
+    def __init__(self, weights, n_candidates, slots, good_weight, seed):
+        # type: (List[List[int]], int, int, int, int) -> None
+        self._weights = weights
+        self._m = n_candidates
+        self._slots = slots
+        self._good_weight = good_weight
+        self._rng = random.Random(seed)
+
+    def run(self,
+            deadline=None,  # type: Optional[float]
+            max_iterations=None,  # type: Optional[int]
+            on_improvement=None,  # type: Optional[Callable[[int, int, List[int]], None]]
+            ):
+        # type: (...) -> Tuple[int, List[int], int]
+        weights = self._weights
+        m = self._m
+        n = len(weights)
+        rng = self._rng
+
+        picks = rng.sample(range(m), self._slots)
+        in_island = [False] * m
+        for c in picks:
+            in_island[c] = True
+        members = picks + list(range(m, n))
+        gains = [sum(weights[x][y] for y in members if y != x) for x in range(m)]
+        score = sum(weights[a][b] for i, a in enumerate(members) for b in members[i + 1:])
+        best_score, best_picks = score, list(picks)
+        if on_improvement is not None:
+            on_improvement(0, best_score, best_picks)
+
+        if self._slots == 0 or self._slots == m:
+            return best_score, best_picks, 0
+
+        # Temperature falls geometrically from about two GOOD pairs to a twentieth of one over the run
+        t_start, t_end = 2.0 * self._good_weight, 0.05 * self._good_weight
+        started = time.monotonic()
+        temperature = t_start
+        iteration = 0
+        while True:
+            if iteration % _CLOCK_INTERVAL == 0:
+                if max_iterations is not None:
+                    fraction = iteration / max_iterations
+                else:
+                    fraction = (time.monotonic() - started) / (deadline - started) if deadline > started else 1.0
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                temperature = t_start * (t_end / t_start) ** min(fraction, 1.0)
+            if max_iterations is not None and iteration >= max_iterations:
+                break
+            iteration += 1
+
+            slot = rng.randrange(self._slots)
+            out_c = picks[slot]
+            in_c = rng.randrange(m)
+            if in_island[in_c]:
+                continue
+            delta = gains[in_c] - weights[in_c][out_c] - gains[out_c]
+            if delta < 0 and rng.random() >= math.exp(delta / temperature):
+                continue
+
+            picks[slot] = in_c
+            in_island[out_c] = False
+            in_island[in_c] = True
+            w_in = weights[in_c]
+            w_out = weights[out_c]
+            for x in range(m):
+                gains[x] += w_in[x] - w_out[x]
+            # A villager's gain never includes itself
+            gains[out_c] += w_out[out_c]
+            gains[in_c] -= w_in[in_c]
+            score += delta
+            if score > best_score:
+                best_score, best_picks = score, list(picks)
+                if on_improvement is not None:
+                    on_improvement(iteration, best_score, best_picks)
+        return best_score, best_picks, iteration
+
+
+# The pair weights of the worker processes, installed once by _init_worker() instead of being pickled per chain
+_worker_weights = None  # type: Optional[List[List[int]]]
+
+
+def _init_worker(weights):
+    global _worker_weights
+    _worker_weights = weights
+
+
+def _run_chain(args):
+    # type: (Tuple[int, int, int, int, Optional[float], Optional[int]]) -> Tuple[int, List[int], int]
+    n_candidates, slots, good_weight, seed, deadline, max_iterations = args
+    return _AnnealingChain(_worker_weights, n_candidates, slots, good_weight, seed).run(deadline, max_iterations)
+
+
+def search_island(data_src,  # type: VillagerDataReader
+                  island_size=ISLAND_SIZE,  # type: int
+                  required=(),  # type: Iterable[str]
+                  excluded=(),  # type: Iterable[str]
+                  minimize_bad=False,  # type: bool
+                  time_budget=0.2,  # type: Optional[float]
+                  max_iterations=None,  # type: Optional[int]
+                  chains=1,  # type: int
+                  workers=1,  # type: int
+                  seed=0,  # type: int
+                  progress=None,  # type: Optional[Callable[[IslandSearchProgress], None]]
+                  roster_matrix=None,  # type: Optional[RosterCompatibilityMatrix]
+                  ):
+    # type: (...) -> IslandSearchResult
+    """
+    Anytime counterpart of find_best_island(): run `chains` independent simulated annealing chains and return the
+    best island any of them found when `time_budget` seconds run out, or after `max_iterations` moves per chain.
+    Chain i is seeded with seed + i, so with max_iterations (and no time budget) the result is reproducible. The
+    budget starts once the roster matrix is available.
+
+    With workers > 1 the chains run in a process pool and each one gets the whole budget, otherwise they run one
+    after another and share it. `progress` is called in the calling process with an IslandSearchProgress each time a
+    chain improves its best island, or in the pool case each time a chain finishes.
+    """
+    if time_budget is None and max_iterations is None:
+        raise ValueError("Either a time budget or a maximum number of iterations is required")
+    if roster_matrix is None:
+        roster_matrix = RosterCompatibilityMatrix(data_src)
+    started = time.monotonic()
+    objective = IslandObjective(roster_matrix, island_size, minimize_bad)
+    required_ordinals, candidate_ordinals = resolve_island_constraints(roster_matrix, island_size, required, excluded)
+    weights = objective.weight_matrix(candidate_ordinals + required_ordinals)
+    m = len(candidate_ordinals)
+    slots = island_size - len(required_ordinals)
+
+    villager_ids = roster_matrix.villager_ids
+
+    def to_villagers(_picks):
+        # type: (List[int]) -> List[str]
+        return [villager_ids[o] for o in required_ordinals] + \
+               [villager_ids[candidate_ordinals[c]] for c in sorted(_picks)]
+
+    def report(chain, iterations, picks):
+        if progress is not None:
+            good, bad = objective.count_pairs(to_villagers(picks))
+            progress(IslandSearchProgress(chain, iterations, good, bad, time.monotonic() - started))
+
+    best_score, best_picks, total_iterations = None, None, 0
+    if workers <= 1 or chains <= 1:
+        for chain in range(chains):
+            deadline = None
+            if time_budget is not None:
+                deadline = started + time_budget * (chain + 1) / chains
+            chain_score, chain_picks, iterations = _AnnealingChain(
+                weights, m, slots, objective.good_weight, seed + chain
+            ).run(deadline, max_iterations, lambda it, _, picks, _chain=chain: report(_chain, it, picks))
+            total_iterations += iterations
+            if best_score is None or chain_score > best_score:
+                best_score, best_picks = chain_score, chain_picks
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        deadline = started + time_budget if time_budget is not None else None
+        with ProcessPoolExecutor(max_workers=min(workers, chains), initializer=_init_worker,
+                                 initargs=(weights,)) as executor:
+            jobs = [(m, slots, objective.good_weight, seed + c, deadline, max_iterations) for c in range(chains)]
+            for chain, (chain_score, chain_picks, iterations) in enumerate(executor.map(_run_chain, jobs)):
+                total_iterations += iterations
+                report(chain, iterations, chain_picks)
+                if best_score is None or chain_score > best_score:
+                    best_score, best_picks = chain_score, chain_picks
+
+    villagers = to_villagers(best_picks)
+    good_pairs, bad_pairs = objective.count_pairs(villagers)
+    return IslandSearchResult(villagers, good_pairs, bad_pairs, total_iterations, seed)
@@ -0,0 +1,204 @@
+from typing import (
+    Iterable, List, Dict, Any, Optional
+)
+
+from src.compatibility_matrix import (
+    RosterCompatibilityMatrix, pack_compatibility, unpack_compatibility, unpack_verdict
+)
+from src.data_model import Compatibility, CompatibilityScoreMark, VillagerData
+from src.data_reader import VillagerDataReader
+from src.island_report import COUNT_KEYS, COUNT_SLOT_BY_CODE, pair_record
+from src.utils import calc_villager_compatibility
+
+
+class IslandSession:
+    """
+    An island being edited. The compatibility of every pair of its villagers is kept (as roster matrix codes, see
+    src.compatibility_matrix) along with how many pairs are in good, average, bad compatibility or can't be
+    calculated, overall and for each villager. Adding, removing or swapping a villager only calculates or forgets the
+    pairs of that villager, O(N) instead of the O(N^2) of a whole matrix.
+
+    The pairs are calculated with calc_villager_compatibility(), or read from roster_matrix when one is given.
+    """
+
+    def __init__(self, data_src, villagers=(), roster_matrix=None, max_size=None):
+        # type: (VillagerDataReader, Iterable[str], Optional[RosterCompatibilityMatrix], Optional[int]) -> None
+        self._data_src = data_src
+        self._roster_matrix = roster_matrix
+        self._max_size = max_size
+        self._villagers = []  # type: List[str]
+        self._villager_data = dict()  # type: Dict[str, VillagerData]
+        # The code of every pair, under both of its villagers
+        self._codes = dict()  # type: Dict[str, Dict[str, int]]
+        # Pairs by COUNT_KEYS slot, overall and by villager
+        self._counts = [0, 0, 0, 0]
+        self._tallies = dict()  # type: Dict[str, List[int]]
+        for villager_id in villagers:
+            self.add(villager_id)
+
+    def __len__(self):
+        return len(self._villagers)
+
+    def __contains__(self, villager_id):
+        return villager_id in self._codes
+
+    @property
+    def villagers(self):
+        # type: () -> List[str]
+        return list(self._villagers)
+
+    @property
+    def good_pairs(self):
+        # type: () -> int
+        return self._counts[2]
+
+    @property
+    def average_pairs(self):
+        # type: () -> int
+        return self._counts[1]
+
+    @property
+    def bad_pairs(self):
+        # type: () -> int
+        return self._counts[0]
+
+    @property
+    def no_data_pairs(self):
+        # type: () -> int
+        return self._counts[3]
+
+    def _require_villager(self, villager_id):
+        # type: (str) -> None
+        if villager_id not in self._codes:
+            raise ValueError("Villager {} is not on the island".format(villager_id))
+
+    def _calc_code(self, villager_id, other_id):
+        # type: (str, str) -> int
+        if self._roster_matrix is not None:
+            return self._roster_matrix.get_code_by_ordinal(
+                self._roster_matrix.get_ordinal(villager_id), self._roster_matrix.get_ordinal(other_id)
+            )
+        return pack_compatibility(
+            calc_villager_compatibility(self._villager_data[villager_id], self._villager_data[other_id])
+        )
+
+    def _insert(self, position, villager_id):
+        # type: (int, str) -> None
+        if villager_id in self._codes:
+            raise ValueError("Villager {} is already on the island".format(villager_id))
+        if self._roster_matrix is not None:
+            if villager_id not in self._roster_matrix:
+                raise ValueError("No villager with id {} in the roster matrix".format(villager_id))
+        else:
+            villager_dat = self._data_src.get_data_by_villager_id(villager_id)
+            if not villager_dat:
+                raise ValueError("No villager with id {} in the database".format(villager_id))
+            self._villager_data[villager_id] = villager_dat
+
+        codes = dict()  # type: Dict[str, int]
+        tally = [0, 0, 0, 0]
+        for other_id in self._villagers:
+            code = self._calc_code(villager_id, other_id)
+            slot = COUNT_SLOT_BY_CODE[code]
+            codes[other_id] = code
+            self._codes[other_id][villager_id] = code
+            self._tallies[other_id][slot] += 1
+            self._counts[slot] += 1
+            tally[slot] += 1
+        self._codes[villager_id] = codes
+        self._tallies[villager_id] = tally
+        self._villagers.insert(position, villager_id)
+
+    def _delete(self, villager_id):
+        # type: (str) -> int
+        """Forget the pairs of the villager and return where it was on the island"""
+        for other_id, code in self._codes.pop(villager_id).items():
+            slot = COUNT_SLOT_BY_CODE[code]
+            del self._codes[other_id][villager_id]
+            self._tallies[other_id][slot] -= 1
+            self._counts[slot] -= 1
+        del self._tallies[villager_id]
+        self._villager_data.pop(villager_id, None)
+        position = self._villagers.index(villager_id)
+        del self._villagers[position]
+        return position
+
+    def add(self, villager_id):
+        # type: (str) -> None
+        """Move the villager in, at the end of the island"""
+        if self._max_size is not None and len(self._villagers) >= self._max_size:
+            raise ValueError("The island is full, it can't have more than {} villagers".format(self._max_size))
+        self._insert(len(self._villagers), villager_id)
+
+    def remove(self, villager_id):
+        # type: (str) -> None
+        self._require_villager(villager_id)
+        self._delete(villager_id)
+
+    def swap(self, villager_out, villager_in):
+        # type: (str, str) -> None
+        """Replace villager_out by villager_in, at the same place on the island"""
+        self._require_villager(villager_out)
+        if villager_in == villager_out:
+            return
+        if villager_in in self._codes:
+            raise ValueError("Villager {} is already on the island".format(villager_in))
+        villager_out_data = self._villager_data.get(villager_out)
+        position = self._delete(villager_out)
+        try:
+            self._insert(position, villager_in)
+        except ValueError:
+            # Leave the island as it was
+            if villager_out_data is not None:
+                self._villager_data[villager_out] = villager_out_data
+            self._insert(position, villager_out)
+            raise
+
+    def get_code(self, villager_a, villager_b):
+        # type: (str, str) -> int
+        self._require_villager(villager_a)
+        self._require_villager(villager_b)
+        if villager_a == villager_b:
+            return self._calc_code(villager_a, villager_b)
+        return self._codes[villager_a][villager_b]
+
+    def get_compatibility(self, villager_a, villager_b):
+        # type: (str, str) -> Optional[Dict[str, CompatibilityScoreMark]]
+        return unpack_compatibility(self.get_code(villager_a, villager_b))
+
+    def get_verdict(self, villager_a, villager_b):
+        # type: (str, str) -> Optional[Compatibility]
+        return unpack_verdict(self.get_code(villager_a, villager_b))
+
+    def villager_tally(self, villager_id):
+        # type: (str) -> Dict[str, int]
+        """How many of the pairs of the villager are in good, average, bad compatibility or can't be calculated"""
+        self._require_villager(villager_id)
+        return dict(zip(COUNT_KEYS, self._tallies[villager_id]))
+
+    def report(self, with_pairs=False):
+        # type: (bool) -> Dict[str, Any]
+        """The island as src.island_report.island_report() summarizes it, plus the tally of each villager"""
+        report = {
+            "villagers": list(self._villagers),
+            "good_pairs": self._counts[2],
+            "average_pairs": self._counts[1],
+            "bad_pairs": self._counts[0],
+            "no_data_pairs": self._counts[3],
+            "villager_tallies": {v: self.villager_tally(v) for v in self._villagers},
+        }  # type: Dict[str, Any]
+        if with_pairs:
+            pairs = []
+            for i, villager_a in enumerate(self._villagers):
+                codes = self._codes[villager_a]
+                for villager_b in self._villagers[i + 1:]:
+                    pair = {"villagers": [villager_a, villager_b]}  # type: Dict[str, Any]
+                    pair.update(pair_record(codes[villager_b]))
+                    pairs.append(pair)
+            report["pairs"] = pairs
+        return report
+
+    def __repr__(self):
+        return "IslandSession(villagers={}, good_pairs={}, bad_pairs={})".format(
+            self._villagers, self._counts[2], self._counts[0]
+        )
@@ -0,0 +1,96 @@
+from typing import (
+    BinaryIO, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+)
+
+import csv
+import json
+import struct
+
+from src.compatibility_matrix import pack_compatibility, unpack_compatibility
+from src.data_model import CompatibilityScoreMark
+from src.utils import evaluate_compatibility
+
+# "table" is the human readable output of compatibility_calculator(), the others are written pair by pair from
+# iter_compatibility_pairs() (or iter_unique_pairs(), each unordered pair once) and never hold the matrix
+OUTPUT_FORMATS = ("table", "ndjson", "csv", "binary")
+CSV_HEADER = ["villager_a", "villager_b", "species", "personality", "star_sign", "verdict"]
+
+# Binary edge format, all little endian:
+#   header   EDGE_MAGIC, version, villager count
+#   ids      per villager, the utf-8 length then the utf-8 bytes of its id
+#   edges    per pair, in row order (only a <= b for unique pairs), the ordinals of the two villagers then the
+#            packed roster matrix code (see src.compatibility_matrix, NO_DATA_CODE when it can't be calculated)
+EDGE_MAGIC = b"ACVEDGE\0"
+EDGE_VERSION = 1
+_EDGE_HEADER = struct.Struct("<8sHI")
+_EDGE_ID_LENGTH = struct.Struct("<H")
+_EDGE = struct.Struct("<IIB")
+
+
+def _pair_fields(comp):
+    # type: (Optional[Dict[str, CompatibilityScoreMark]]) -> List[Optional[str]]
+    if comp is None:
+        return [None, None, None, None]
+    return [comp["species"].name, comp["personality"].name, comp["star_sign"].name,
+            evaluate_compatibility(list(comp.values())).name]
+
+
+def write_ndjson(villagers_list, pairs, out):
+    # type: (List[str], Iterable[Tuple[str, str, Optional[Dict[str, CompatibilityScoreMark]]]], IO[str]) -> int
+    """One JSON object per pair, with the fields of CSV_HEADER (null when it can't be calculated)"""
+    count = 0
+    for villager_a, villager_b, comp in pairs:
+        out.write(json.dumps(dict(zip(CSV_HEADER, [villager_a, villager_b] + _pair_fields(comp))), ensure_ascii=False))
+        out.write("\n")
+        count += 1
+    return count
+
+
+def write_csv(villagers_list, pairs, out):
+    # type: (List[str], Iterable[Tuple[str, str, Optional[Dict[str, CompatibilityScoreMark]]]], IO[str]) -> int
+    """A CSV_HEADER line then one line per pair, the fields left empty when it can't be calculated"""
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(CSV_HEADER)
+    count = 0
+    for villager_a, villager_b, comp in pairs:
+        writer.writerow([villager_a, villager_b] + _pair_fields(comp))
+        count += 1
+    return count
+
+
+def write_binary_edges(villagers_list, pairs, out):
+    # type: (List[str], Iterable[Tuple[str, str, Optional[Dict[str, CompatibilityScoreMark]]]], BinaryIO) -> int
+    out.write(_EDGE_HEADER.pack(EDGE_MAGIC, EDGE_VERSION, len(villagers_list)))
+    ordinals = dict()  # type: Dict[str, int]
+    for ordinal, villager_id in enumerate(villagers_list):
+        ordinals.setdefault(villager_id, ordinal)
+        encoded = villager_id.encode("utf-8")
+        out.write(_EDGE_ID_LENGTH.pack(len(encoded)))
+        out.write(encoded)
+    count = 0
+    for villager_a, villager_b, comp in pairs:
+        out.write(_EDGE.pack(ordinals[villager_a], ordinals[villager_b], pack_compatibility(comp)))
+        count += 1
+    return count
+
+
+def read_binary_edges(fp_in):
+    # type: (BinaryIO) -> Tuple[List[str], Iterator[Tuple[str, str, Optional[Dict[str, CompatibilityScoreMark]]]]]
+    """The villager ids of a binary edge stream, and a lazy iterator over its (villager a, villager b, compatibility)"""
+    magic, version, count = _EDGE_HEADER.unpack(fp_in.read(_EDGE_HEADER.size))
+    if magic != EDGE_MAGIC or version != EDGE_VERSION:
+        raise ValueError("Not a binary edge stream of version {}".format(EDGE_VERSION))
+    villagers_list = []
+    for _ in range(count):
+        length, = _EDGE_ID_LENGTH.unpack(fp_in.read(_EDGE_ID_LENGTH.size))
+        villagers_list.append(fp_in.read(length).decode("utf-8"))
+
+    def edges():
+        while True:
+            record = fp_in.read(_EDGE.size)
+            if len(record) < _EDGE.size:
+                return
+            ordinal_a, ordinal_b, code = _EDGE.unpack(record)
+            yield villagers_list[ordinal_a], villagers_list[ordinal_b], unpack_compatibility(code)
+
+    return villagers_list, edges()
@@ -0,0 +1,173 @@
+from typing import (
+    Callable, Dict, List, Optional, Tuple
+)
+
+import functools
+import threading
+import time
+
+# The stages reported by the instrumented code, a stage's time includes the stages run inside it (the verdicts are
+# evaluated while rendering, the lookups while computing the matrix)
+STAGES = ("load", "lookup", "matrix", "verdict", "render")
+METRIC_PREFIX = "villager_compatibility"
+
+
+class Profiler:
+    """
+    Counts the calls and the wall time of each stage. Hooks added with add_hook() are called with the stage name and
+    its duration in seconds every time a stage completes, in the thread that ran it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = dict()  # type: Dict[str, int]
+        self._seconds = dict()  # type: Dict[str, float]
+        self._hooks = []  # type: List[Callable[[str, float], None]]
+
+    def add_hook(self, hook):
+        # type: (Callable[[str, float], None]) -> None
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        # type: (Callable[[str, float], None]) -> None
+        self._hooks.remove(hook)
+
+    def record(self, stage, seconds):
+        # type: (str, float) -> None
+        with self._lock:
+            self._calls[stage] = self._calls.get(stage, 0) + 1
+            self._seconds[stage] = self._seconds.get(stage, 0.0) + seconds
+        for hook in self._hooks:
+            hook(stage, seconds)
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+            self._seconds.clear()
+
+    def stats(self):
+        # type: () -> Dict[str, Tuple[int, float]]
+        """(calls, total seconds) by stage, the known stages first"""
+        with self._lock:
+            names = [s for s in STAGES if s in self._calls] + sorted(s for s in self._calls if s not in STAGES)
+            return {s: (self._calls[s], self._seconds[s]) for s in names}
+
+    def format_table(self):
+        # type: () -> str
+        lines = ["{:<10} {:>10} {:>14} {:>14}".format("stage", "calls", "total ms", "mean us")]
+        for stage, (calls, seconds) in self.stats().items():
+            lines.append("{:<10} {:>10} {:>14.3f} {:>14.3f}".format(stage, calls, seconds * 1e3, seconds / calls * 1e6))
+        return "\n".join(lines)
+
+    def to_prometheus(self):
+        # type: () -> str
+        """The counters in the Prometheus text exposition format"""
+        stats = self.stats()
+        lines = [
+            "# HELP {}_stage_calls_total Number of times a stage ran.".format(METRIC_PREFIX),
+            "# TYPE {}_stage_calls_total counter".format(METRIC_PREFIX),
+        ]
+        for stage, (calls, _) in stats.items():
+            lines.append('{}_stage_calls_total{{stage="{}"}} {}'.format(METRIC_PREFIX, stage, calls))
+        lines.extend([
+            "# HELP {}_stage_seconds_total Wall time spent in a stage.".format(METRIC_PREFIX),
+            "# TYPE {}_stage_seconds_total counter".format(METRIC_PREFIX),
+        ])
+        for stage, (_, seconds) in stats.items():
+            lines.append('{}_stage_seconds_total{{stage="{}"}} {!r}'.format(METRIC_PREFIX, stage, seconds))
+        return "\n".join(lines) + "\n"
+
+
+class _Stage:
+    __slots__ = ("_profiler", "_name", "_started")
+
+    def __init__(self, profiler, name):
+        # type: (Profiler, str) -> None
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profiler.record(self._name, time.perf_counter() - self._started)
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_STAGE = _NoStage()
+_active_profiler = None  # type: Optional[Profiler]
+
+
+def stage(name):
+    """Context manager timing a stage for the active profiler, a shared no-op when profiling is off"""
+    if _active_profiler is None:
+        return _NO_STAGE
+    return _Stage(_active_profiler, name)
+
+
+def timed_stage(name):
+    """Decorator timing every call of the function as a stage for the active profiler"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active_profiler is None:
+                return func(*args, **kwargs)
+            with _Stage(_active_profiler, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_active_profiler():
+    # type: () -> Optional[Profiler]
+    return _active_profiler
+
+
+def enable_profiling(profiler=None):
+    # type: (Optional[Profiler]) -> Profiler
+    """Make profiler (a new one by default) the one the stages are reported to, process wide, and return it"""
+    global _active_profiler
+    if profiler is None:
+        profiler = Profiler()
+    _active_profiler = profiler
+    return profiler
+
+
+def disable_profiling():
+    global _active_profiler
+    _active_profiler = None
+
+
+class profiling:
+    """
+    with profiling() as profiler: ... reports the stages run in the block to profiler, then restores the previously
+    active one
+    """
+
+    def __init__(self, profiler=None):
+        # type: (Optional[Profiler]) -> None
+        self._profiler = profiler if profiler is not None else Profiler()
+        self._previous = None  # type: Optional[Profiler]
+
+    def __enter__(self):
+        # type: () -> Profiler
+        global _active_profiler
+        self._previous = _active_profiler
+        _active_profiler = self._profiler
+        return self._profiler
+
+    def __exit__(self, *exc_info):
+        global _active_profiler
+        _active_profiler = self._previous
+        return False
@@ -0,0 +1,110 @@
+from typing import (
+    List, Optional, Dict, Tuple, Any
+)
+
+import heapq
+
+from src.compatibility_matrix import RosterCompatibilityMatrix, NO_DATA_CODE
+from src.island_report import count_slot
+from src.profiling import timed_stage
+
+DEFAULT_TOP_K = 10
+
+# bytes.translate() tables turning a row of roster matrix codes into 1 for every GOOD (BAD) pair, 0 otherwise
+_GOOD_LANES = bytes(1 if count_slot(code) == 2 else 0 for code in range(256))
+_BAD_LANES = bytes(1 if count_slot(code) == 0 else 0 for code in range(256))
+
+
+def _lane_counts(rows, lanes, size):
+    # type: (List[bytes], bytes, int) -> bytes
+    """
+    For every villager, how many of the rows are GOOD (BAD) with it. The 0 / 1 rows are summed as big integers, one
+    byte lane per villager: an island of less than 256 villagers never carries into the next lane.
+    """
+    total = sum(int.from_bytes(row.translate(lanes), "little") for row in rows)
+    return total.to_bytes(size, "little")
+
+
+@timed_stage("matrix")
+def recommend(roster_matrix, island, k=DEFAULT_TOP_K):
+    # type: (RosterCompatibilityMatrix, List[str], int) -> Dict[str, Any]
+    """
+    Rank every villager not on the island by how many good pairs moving it in would add, then how few bad pairs,
+    and return the top k with the best single swap (one islander moved out, one villager moved in) as a JSON
+    serializable dict. Every candidate is scored at once from the rows of the islanders; the villagers whose
+    compatibility can't be calculated aren't candidates.
+    """
+    if k < 0:
+        raise ValueError("k can't be negative")
+    if len(set(island)) != len(island):
+        raise ValueError("A villager can't be on the island twice")
+    if len(island) >= 256:
+        raise ValueError("An island can't have more than 255 villagers")
+    ordinals = roster_matrix.get_ordinals(island)
+    villager_ids = roster_matrix.villager_ids
+    n = len(villager_ids)
+
+    rows = [bytes(roster_matrix.get_row_codes(v)) for v in island]
+    good_counts = _lane_counts(rows, _GOOD_LANES, n)
+    bad_counts = _lane_counts(rows, _BAD_LANES, n)
+    on_island = set(ordinals)
+    candidates = [
+        c for c in range(n) if c not in on_island and roster_matrix.get_code_by_ordinal(c, c) != NO_DATA_CODE
+    ]
+
+    # How many good (bad) pairs each islander is in, its own cell (the diagonal) left out
+    good_tallies = [good_counts[o] - _GOOD_LANES[row[o]] for o, row in zip(ordinals, rows)]
+    bad_tallies = [bad_counts[o] - _BAD_LANES[row[o]] for o, row in zip(ordinals, rows)]
+    # Every pair of the island is in the tallies of both its villagers
+    good_pairs = sum(good_tallies) // 2
+    bad_pairs = sum(bad_tallies) // 2
+
+    top = heapq.nlargest(k, candidates, key=lambda c: (good_counts[c], -bad_counts[c], -c))
+    report = {
+        "villagers": list(island),
+        "good_pairs": good_pairs,
+        "bad_pairs": bad_pairs,
+        "candidates": [
+            {"villager": villager_ids[c], "good_pairs_added": good_counts[c], "bad_pairs_added": bad_counts[c]}
+            for c in top
+        ],
+        "best_swap": _best_swap(roster_matrix, island, rows, good_counts, bad_counts, good_tallies, bad_tallies,
+                                candidates, good_pairs, bad_pairs),
+    }  # type: Dict[str, Any]
+    return report
+
+
+def _best_swap(roster_matrix,  # type: RosterCompatibilityMatrix
+               island,  # type: List[str]
+               rows,  # type: List[bytes]
+               good_counts,  # type: bytes
+               bad_counts,  # type: bytes
+               good_tallies,  # type: List[int]
+               bad_tallies,  # type: List[int]
+               candidates,  # type: List[int]
+               good_pairs,  # type: int
+               bad_pairs,  # type: int
+               ):
+    # type: (...) -> Optional[Dict[str, Any]]
+    best = None  # type: Optional[Tuple[Tuple[int, int], int, int]]
+    for idx, row_out in enumerate(rows):
+        # Moving the villager out loses its own pairs, and its pair with the incoming one isn't made
+        good_lost = good_tallies[idx]
+        bad_lost = bad_tallies[idx]
+        for c in candidates:
+            code = row_out[c]
+            good_delta = good_counts[c] - _GOOD_LANES[code] - good_lost
+            bad_delta = bad_counts[c] - _BAD_LANES[code] - bad_lost
+            if best is None or (good_delta, -bad_delta) > best[0]:
+                best = ((good_delta, -bad_delta), idx, c)
+    if best is None:
+        return None
+    (good_delta, neg_bad_delta), idx, c = best
+    return {
+        "villager_out": island[idx],
+        "villager_in": roster_matrix.villager_ids[c],
+        "good_pairs": good_pairs + good_delta,
+        "bad_pairs": bad_pairs - neg_bad_delta,
+        "good_pairs_delta": good_delta,
+        "bad_pairs_delta": -neg_bad_delta,
+    }
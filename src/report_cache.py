@@ -0,0 +1,177 @@
+from typing import (
+    Iterable, List, Optional, Dict, Tuple
+)
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from src.data_reader import VillagerDataReader
+from src.utils import (
+    get_data_dir_path, get_villager_data_path, get_personality_compatibility_data_path,
+    get_species_compatibility_data_path
+)
+
+# Bump when the meaning of the codes changes, the islands cached before are then dropped
+SCHEMA_VERSION = 1
+DEFAULT_MAX_ENTRIES = 10000
+
+
+def default_report_cache_path():
+    # type: () -> str
+    return os.path.join(get_data_dir_path(), "island_reports.sqlite")
+
+
+def default_data_files(data_src=None):
+    # type: (Optional[VillagerDataReader]) -> List[str]
+    """The files the compatibility of an island depends on, the default villager DB when data_src isn't given"""
+    villager_files = data_src.data_files if data_src is not None else [get_villager_data_path()]
+    return villager_files + [get_personality_compatibility_data_path(), get_species_compatibility_data_path()]
+
+
+def data_files_hash(paths):
+    # type: (Iterable[str]) -> str
+    digest = hashlib.sha256("{}\n".format(SCHEMA_VERSION).encode("utf-8"))
+    for path in paths:
+        with open(path, "rb") as fp_data:
+            digest.update(hashlib.sha256(fp_data.read()).hexdigest().encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _canonical_order(villagers):
+    # type: (List[str]) -> Tuple[List[str], List[int]]
+    """The sorted villagers, and the position in it of every villager of the list (duplicates in turn)"""
+    key = sorted(villagers)
+    positions = dict()  # type: Dict[str, List[int]]
+    for idx, villager_id in enumerate(key):
+        positions.setdefault(villager_id, []).append(idx)
+    return key, [positions[villager_id].pop(0) for villager_id in villagers]
+
+
+class IslandReportCache:
+    """
+    Roster matrix codes (see src.compatibility_matrix) of whole islands, kept in an SQLite file so they survive
+    restarts. An island is stored once under its sorted villager ids and served in any order. Every entry is stored
+    along with a hash of the data files (villager DB and rule tables) it was computed from, and only the entries of
+    the current hash are served: a process still running on older data files never feeds the others stale islands.
+    The entries of other hashes are dropped on open. The data files are those of data_src when it is given, and only
+    a villager data source reading one of them may be served, see check_data_src(). Beyond max_entries, the least
+    recently used islands are evicted.
+
+    Safe to share between threads, and between processes through SQLite's locking.
+    """
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES, data_files=None, data_src=None):
+        # type: (Optional[str], int, Optional[List[str]], Optional[VillagerDataReader]) -> None
+        if max_entries < 1:
+            raise ValueError("The report cache must hold at least one island")
+        if path is None:
+            path = default_report_cache_path()
+        self._path = path
+        self._max_entries = max_entries
+        if data_files is None:
+            data_files = default_data_files(data_src)
+        self._data_files = [os.path.abspath(data_file) for data_file in data_files]
+        self._data_hash = data_files_hash(self._data_files)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS islands (data_hash TEXT NOT NULL, villagers TEXT NOT NULL, "
+                "codes BLOB NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (data_hash, villagers))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS islands_last_used ON islands (last_used)")
+            self._conn.execute("DELETE FROM islands WHERE data_hash != ?", (self._data_hash,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM islands WHERE data_hash = ?",
+                                      (self._data_hash,)).fetchone()[0]
+
+    @property
+    def path(self):
+        # type: () -> str
+        return self._path
+
+    @property
+    def data_hash(self):
+        # type: () -> str
+        return self._data_hash
+
+    @property
+    def hits(self):
+        # type: () -> int
+        return self._hits
+
+    @property
+    def misses(self):
+        # type: () -> int
+        return self._misses
+
+    def check_data_src(self, data_src):
+        # type: (VillagerDataReader) -> None
+        """Raise a ValueError unless the villagers of data_src are read from the data files the cache is bound to"""
+        villager_files = data_src.data_files
+        if not villager_files or any(os.path.abspath(path) not in self._data_files for path in villager_files):
+            raise ValueError("The report cache was not built from the villager data being used")
+
+    def get_codes(self, villagers):
+        # type: (List[str]) -> Optional[List[List[int]]]
+        """The code rows of the island in the order of villagers, None when it isn't cached"""
+        key, order = _canonical_order(villagers)
+        encoded_key = json.dumps(key, ensure_ascii=False)
+        with self._lock:
+            row = self._conn.execute("SELECT codes FROM islands WHERE data_hash = ? AND villagers = ?",
+                                     (self._data_hash, encoded_key)).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._conn.execute("UPDATE islands SET last_used = ? WHERE data_hash = ? AND villagers = ?",
+                               (time.time(), self._data_hash, encoded_key))
+        codes = bytes(row[0])
+        n = len(key)
+        return [[codes[i * n + j] for j in order] for i in order]
+
+    def put_codes(self, villagers, code_rows):
+        # type: (List[str], List[List[int]]) -> None
+        key, order = _canonical_order(villagers)
+        n = len(key)
+        codes = bytearray(n * n)
+        for i, row in zip(order, code_rows):
+            for j, code in zip(order, row):
+                codes[i * n + j] = code
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("INSERT OR REPLACE INTO islands VALUES (?, ?, ?, ?)",
+                                   (self._data_hash, json.dumps(key, ensure_ascii=False), bytes(codes), time.time()))
+                self._conn.execute(
+                    "DELETE FROM islands WHERE rowid IN (SELECT rowid FROM islands ORDER BY last_used "
+                    "LIMIT MAX(0, (SELECT COUNT(*) FROM islands) - ?))", (self._max_entries,)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM islands")
@@ -0,0 +1,263 @@
+from typing import (
+    List, Optional, Dict, Tuple, Any
+)
+
+import mmap
+import os
+import struct
+
+from src.data_model import Personality, Species
+
+# Snapshot layout, all little endian:
+#   header       MAGIC, version, record count, then the (size, mtime_ns) fingerprint of every source file: the
+#                villager database, the personality rules and the species rules
+#   personality  len(Personality) ** 2 bytes, the mark value + 2 of each (p1, p2) pair in enum order, 0 if undefined
+#   species      len(Species) ** 2 bytes, the same for each (s1, s2) pair
+#   records      one fixed width _RECORD per villager, in the order of villager.json
+#   index        the record ordinals sorted by villager id (as utf-8 bytes), for binary search
+#   strings      the utf-8 text referenced by (offset, length) from the records
+MAGIC = b"ACVSNAP\0"
+VERSION = 2
+
+_HEADER = struct.Struct("<8sHI")
+_FINGERPRINT = struct.Struct("<Qq")
+# id, name, coffee, wiki as (offset, length), then species, personality, birth month, birth day (0 when missing)
+_RECORD = struct.Struct("<IHIHIHIHBBBB")
+_INDEX_ENTRY = struct.Struct("<I")
+
+_SPECIES_BY_CODE = [None] + list(Species)
+_PERSONALITY_BY_CODE = [None] + list(Personality)
+_MONTHS = {
+    "January": 1, "February": 2, "March": 3, "April": 4, "May": 5, "June": 6,
+    "July": 7, "August": 8, "September": 9, "October": 10, "November": 11, "December": 12
+}
+_DAYS_IN_MONTH = [0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+# (villager id, name, species, personality, coffee, birthday, wiki) of one villager
+SnapshotRecord = Tuple[str, str, Optional[Species], Optional[Personality], str, Optional[Tuple[int, int]], str]
+
+
+def default_snapshot_path(aclister_loc):
+    # type: (str) -> str
+    return os.path.splitext(aclister_loc)[0] + ".snapshot"
+
+
+def file_fingerprint(path):
+    # type: (str) -> Tuple[int, int]
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _parse_birthday(birthday):
+    # type: (str) -> Tuple[int, int]
+    split_result = birthday.split(' ')
+    if len(split_result) == 1:
+        return 0, 0
+    month, day = _MONTHS[split_result[0]], int(split_result[1])
+    if not 1 <= day <= _DAYS_IN_MONTH[month]:
+        return 0, 0
+    return month, day
+
+
+def _compile_rule_table(rule_comp_loc, enum_cls):
+    # type: (str, Any) -> bytearray
+    """A nested {a: {b: sign}} rule file as len(enum_cls) ** 2 bytes, the mark value + 2 of each (a, b) pair"""
+    import json
+
+    with open(rule_comp_loc, "r", encoding="utf-8") as fp_data:
+        rule_comp = json.load(fp_data)  # type: Dict[str, Dict[str, str]]
+    sign_values = {"♥": 2, "♦": 1, "♣": 0, "×": -1}
+    members = list(enum_cls)
+    tbl = bytearray(len(members) ** 2)
+    for a, b_comp in rule_comp.items():
+        for b, comp in b_comp.items():
+            idx = members.index(getattr(enum_cls, a)) * len(members) + members.index(getattr(enum_cls, b))
+            tbl[idx] = sign_values[comp] + 2
+    return tbl
+
+
+def _read_rule_table(buf, offset, enum_cls):
+    # type: (mmap.mmap, int, Any) -> Dict[Tuple[Any, Any], int]
+    members = list(enum_cls)
+    marks = dict()
+    for i, a in enumerate(members):
+        for j, b in enumerate(members):
+            code = buf[offset + i * len(members) + j]
+            if code:
+                marks[(a, b)] = code - 2
+    return marks
+
+
+def _source_locs(aclister_loc, personality_comp_loc, species_comp_loc):
+    # type: (str, str, Optional[str]) -> List[str]
+    if species_comp_loc is None:
+        from src.utils import get_species_compatibility_data_path
+        species_comp_loc = get_species_compatibility_data_path()
+    return [aclister_loc, personality_comp_loc, species_comp_loc]
+
+
+def compile_snapshot(aclister_loc, personality_comp_loc, snapshot_loc=None, species_comp_loc=None):
+    # type: (str, str, Optional[str], Optional[str]) -> str
+    """
+    Compile the villager database and the personality and species rule tables (the species rules next to the
+    personality ones by default) into a binary snapshot, return its path
+    """
+    import json
+
+    if snapshot_loc is None:
+        snapshot_loc = default_snapshot_path(aclister_loc)
+    source_locs = _source_locs(aclister_loc, personality_comp_loc, species_comp_loc)
+    fingerprints = [file_fingerprint(loc) for loc in source_locs]
+    with open(aclister_loc, "r") as fp_data:
+        villagers = json.load(fp_data)  # type: List[Dict[str, str]]
+    personality_tbl = _compile_rule_table(source_locs[1], Personality)
+    species_tbl = _compile_rule_table(source_locs[2], Species)
+
+    strings = bytearray()
+    string_offsets = dict()  # type: Dict[bytes, int]
+
+    def add_string(text):
+        # type: (str) -> Tuple[int, int]
+        encoded = text.encode("utf-8")
+        if encoded not in string_offsets:
+            string_offsets[encoded] = len(strings)
+            strings.extend(encoded)
+        return string_offsets[encoded], len(encoded)
+
+    records = bytearray()
+    for villager in villagers:
+        species = getattr(Species, villager['species'], None)
+        personality = getattr(Personality, villager['personality'], None)
+        month, day = _parse_birthday(villager['birthday'])
+        records.extend(_RECORD.pack(
+            *add_string(villager['id']), *add_string(villager['name']),
+            *add_string(villager['coffee']), *add_string(villager['wiki']),
+            _SPECIES_BY_CODE.index(species), _PERSONALITY_BY_CODE.index(personality), month, day
+        ))
+
+    index = bytearray()
+    for ordinal in sorted(range(len(villagers)), key=lambda o: villagers[o]['id'].encode("utf-8")):
+        index.extend(_INDEX_ENTRY.pack(ordinal))
+
+    tmp_loc = snapshot_loc + ".tmp"
+    with open(tmp_loc, "wb") as fp_out:
+        fp_out.write(_HEADER.pack(MAGIC, VERSION, len(villagers)))
+        for fingerprint in fingerprints:
+            fp_out.write(_FINGERPRINT.pack(*fingerprint))
+        fp_out.write(personality_tbl)
+        fp_out.write(species_tbl)
+        fp_out.write(records)
+        fp_out.write(index)
+        fp_out.write(strings)
+    os.replace(tmp_loc, snapshot_loc)
+    return snapshot_loc
+
+
+class RosterSnapshot:
+    """A compiled snapshot mapped into memory, records are decoded on access"""
+
+    def __init__(self, snapshot_loc):
+        # type: (str) -> None
+        with open(snapshot_loc, "rb") as fp_snapshot:
+            self._buf = mmap.mmap(fp_snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._count = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self._buf.close()
+            raise ValueError("{} is not a villager snapshot of version {}".format(snapshot_loc, VERSION))
+
+        offset = _HEADER.size
+        self._fingerprints = []
+        for _ in range(3):
+            self._fingerprints.append(_FINGERPRINT.unpack_from(self._buf, offset))
+            offset += _FINGERPRINT.size
+        self._personality_offset = offset
+        self._species_offset = self._personality_offset + len(Personality) ** 2
+        self._records_offset = self._species_offset + len(Species) ** 2
+        self._index_offset = self._records_offset + self._count * _RECORD.size
+        self._strings_offset = self._index_offset + self._count * _INDEX_ENTRY.size
+
+    def close(self):
+        self._buf.close()
+
+    def __len__(self):
+        return self._count
+
+    def is_fresh(self, aclister_loc, personality_comp_loc, species_comp_loc=None):
+        # type: (str, str, Optional[str]) -> bool
+        try:
+            return self._fingerprints == [
+                file_fingerprint(loc) for loc in _source_locs(aclister_loc, personality_comp_loc, species_comp_loc)
+            ]
+        except OSError:
+            return False
+
+    def _get_string(self, offset, length):
+        # type: (int, int) -> str
+        start = self._strings_offset + offset
+        return self._buf[start:start + length].decode("utf-8")
+
+    def _get_id_bytes(self, ordinal):
+        # type: (int) -> bytes
+        id_offset, id_len = struct.unpack_from("<IH", self._buf, self._records_offset + ordinal * _RECORD.size)
+        start = self._strings_offset + id_offset
+        return self._buf[start:start + id_len]
+
+    def find_ordinal(self, villager_id):
+        # type: (str) -> Optional[int]
+        target = villager_id.encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            ordinal = _INDEX_ENTRY.unpack_from(self._buf, self._index_offset + mid * _INDEX_ENTRY.size)[0]
+            mid_id = self._get_id_bytes(ordinal)
+            if mid_id == target:
+                return ordinal
+            elif mid_id < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def get_villager_ids(self):
+        # type: () -> List[str]
+        return [self._get_id_bytes(ordinal).decode("utf-8") for ordinal in range(self._count)]
+
+    def get_record(self, ordinal):
+        # type: (int) -> SnapshotRecord
+        """(villager id, name, species, personality, coffee, birthday, wiki) of the villager"""
+        id_off, id_len, name_off, name_len, coffee_off, coffee_len, wiki_off, wiki_len, species, personality, \
+            month, day = _RECORD.unpack_from(self._buf, self._records_offset + ordinal * _RECORD.size)
+        return (
+            self._get_string(id_off, id_len),
+            self._get_string(name_off, name_len),
+            _SPECIES_BY_CODE[species],
+            _PERSONALITY_BY_CODE[personality],
+            self._get_string(coffee_off, coffee_len),
+            (month, day) if month else None,
+            self._get_string(wiki_off, wiki_len),
+        )
+
+    def get_personality_marks(self):
+        # type: () -> Dict[Tuple[Personality, Personality], int]
+        """The personality rule table as mark values, keyed by (p1, p2)"""
+        return _read_rule_table(self._buf, self._personality_offset, Personality)
+
+    def get_species_marks(self):
+        # type: () -> Dict[Tuple[Species, Species], int]
+        """The species rule table as mark values, keyed by (s1, s2)"""
+        return _read_rule_table(self._buf, self._species_offset, Species)
+
+
+def open_fresh_snapshot(aclister_loc, personality_comp_loc, snapshot_loc=None, species_comp_loc=None):
+    # type: (str, str, Optional[str], Optional[str]) -> Optional[RosterSnapshot]
+    """The snapshot if there's one compiled from the current source files, None otherwise"""
+    if snapshot_loc is None:
+        snapshot_loc = default_snapshot_path(aclister_loc)
+    try:
+        snapshot = RosterSnapshot(snapshot_loc)
+    except (OSError, ValueError, struct.error):
+        return None
+    if not snapshot.is_fresh(aclister_loc, personality_comp_loc, species_comp_loc):
+        snapshot.close()
+        return None
+    return snapshot
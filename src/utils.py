@@ -1,46 +1,59 @@
-from collections import defaultdict
+from collections import Counter, defaultdict
 from typing import (
-    FrozenSet, Iterable, List, Optional, Set, Text, Tuple, Union, Any, Dict, Callable
+    FrozenSet, Iterable, Iterator, List, Optional, Set, Text, Tuple, Union, Any, Dict, Callable
 )
 
+import itertools
 import json
 import os
 from src.data_model import StarSigns, CompatibilityScoreMark, Personality, Species, VillagerData, Compatibility
-
-_personality_comp_score_matrix = defaultdict(dict)
+from src.profiling import timed_stage
+
+# The personality rule table, loaded on first use. It is only ever replaced as a whole, so a thread never sees it half
+# filled while another one loads it.
+_personality_comp_score_matrix = dict()  # type: Dict[Personality, Dict[Personality, CompatibilityScoreMark]]
+# The species rule table, compiled on first use: the mark of (s1, s2) at (s1.value - 1) * _SPECIES_COUNT + s2.value - 1.
+# Like the personality table, it is only ever replaced as a whole.
+_species_comp_score_tbl = []  # type: List[CompatibilityScoreMark]
+_SPECIES_COUNT = len(Species)
+# Bumped every time a rule table is loaded, the tables other modules derive from the rules are rebuilt when it moved
+_rules_version = 0
+
+
+# The last day (month, day) of every star sign, in calendar order
+_STAR_SIGN_ENDS = [
+    ((1, 19), StarSigns.Capricorn),
+    ((2, 18), StarSigns.Aquarius),
+    ((3, 20), StarSigns.Pisces),
+    ((4, 19), StarSigns.Aries),
+    ((5, 20), StarSigns.Taurus),
+    ((6, 20), StarSigns.Gemini),
+    ((7, 22), StarSigns.Cancer),
+    ((8, 22), StarSigns.Leo),
+    ((9, 22), StarSigns.Virgo),
+    ((10, 22), StarSigns.Libra),
+    ((11, 21), StarSigns.Scorpio),
+    ((12, 21), StarSigns.Sagittarius),
+    ((12, 31), StarSigns.Capricorn),
+]
+# Day counts of a leap year, so February 29 has a star sign
+_DAYS_IN_MONTH = [0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+# Day of the year (0-based) of the first day of every month
+_MONTH_FIRST_DAY = [0] * 13
+for _month in range(2, 13):
+    _MONTH_FIRST_DAY[_month] = _MONTH_FIRST_DAY[_month - 1] + _DAYS_IN_MONTH[_month - 1]
+
+_star_sign_by_day = []  # type: List[StarSigns]
+for (_end_month, _end_day), _star_sign in _STAR_SIGN_ENDS:
+    _star_sign_by_day.extend([_star_sign] * (_MONTH_FIRST_DAY[_end_month] + _end_day - len(_star_sign_by_day)))
 
 
 def get_star_sign_by_birthday(birth):
     # type: (Tuple[int, int]) -> StarSigns
-    def birth_to_int(m, d):
-        return (m << 8) | d
-
-    star_sign_def = [
-        (((1, 1), (1, 19)), StarSigns.Capricorn),
-        (((1, 20), (2, 18)), StarSigns.Aquarius),
-        (((2, 19), (3, 20)), StarSigns.Pisces),
-        (((3, 21), (4, 19)), StarSigns.Aries),
-        (((4, 20), (5, 20)), StarSigns.Taurus),
-        (((5, 21), (6, 20)), StarSigns.Gemini),
-        (((6, 21), (7, 22)), StarSigns.Cancer),
-        (((7, 23), (8, 22)), StarSigns.Leo),
-        (((8, 23), (9, 22)), StarSigns.Virgo),
-        (((9, 23), (10, 22)), StarSigns.Libra),
-        (((10, 23), (11, 21)), StarSigns.Scorpio),
-        (((11, 22), (12, 21)), StarSigns.Sagittarius),
-        (((12, 22), (12, 31)), StarSigns.Capricorn),
-    ]
-
-    convert_list = map(
-        lambda ss_def: (range(birth_to_int(*ss_def[0][0]), birth_to_int(*ss_def[0][1]) + 1), ss_def[1]),
-        star_sign_def
-    )
-    birth_int = birth_to_int(*birth)
-
-    for tuple_range_ss in convert_list:
-        if birth_int in tuple_range_ss[0]:
-            return tuple_range_ss[1]
-    raise ValueError("Invalid birthday")
+    month, day = birth
+    if not 1 <= month <= 12 or not 1 <= day <= _DAYS_IN_MONTH[month]:
+        raise ValueError("Invalid birthday")
+    return _star_sign_by_day[_MONTH_FIRST_DAY[month] + day - 1]
 
 
 def get_compatibility_score_by_unicode_sign(sign):
@@ -59,35 +72,16 @@ def get_compatibility_score_by_unicode_sign(sign):
 
 def calculate_compatibility_score_by_personality(p1, p2):
     # type: (Personality, Personality) -> CompatibilityScoreMark
+    if not _personality_comp_score_matrix:
+        load_personality_compatibility_data()
     return _personality_comp_score_matrix[p1][p2]
 
 
 def calculate_compatibility_score_by_species(s1, s2):
     # type: (Species, Species) -> CompatibilityScoreMark
-    def check_species(chk1, chk2):
-        return (s1 == chk1 and s2 == chk2) or (s2 == chk1 and s1 == chk2)
-
-    if check_species(Species.Bear, Species.Cub) or \
-            check_species(Species.Bull, Species.Cow) or \
-            check_species(Species.Cat, Species.Tiger) or \
-            check_species(Species.Dog, Species.Wolf) or \
-            check_species(Species.Goat, Species.Sheep) or \
-            check_species(Species.Kangaroo, Species.Koala):
-        return CompatibilityScoreMark.HEART
-    elif s1 == s2 or \
-            check_species(Species.Deer, Species.Horse) or \
-            check_species(Species.Hamster, Species.Squirrel) or \
-            check_species(Species.Hamster, Species.Mouse) or \
-            check_species(Species.Mouse, Species.Squirrel):
-        return CompatibilityScoreMark.DIAMOND
-    elif check_species(Species.Cat, Species.Mouse) or \
-            check_species(Species.Cat, Species.Hamster) or \
-            check_species(Species.Dog, Species.Gorilla) or \
-            check_species(Species.Dog, Species.Monkey) or \
-            check_species(Species.Sheep, Species.Wolf):
-        return CompatibilityScoreMark.CROSS
-    else:
-        return CompatibilityScoreMark.CLOVER
+    if not _species_comp_score_tbl:
+        load_species_compatibility_data()
+    return _species_comp_score_tbl[(s1.value - 1) * _SPECIES_COUNT + s2.value - 1]
 
 
 _star_sign_group_idx = {
@@ -109,19 +103,31 @@ _star_sign_group_idx = {
 }
 
 
+# The star sign rule by element group, rows and columns in group order: fire, earth, air, water
+_star_sign_group_marks = [
+    CompatibilityScoreMark.HEART, CompatibilityScoreMark.DIAMOND, CompatibilityScoreMark.DIAMOND,
+    CompatibilityScoreMark.CROSS,
+
+    CompatibilityScoreMark.DIAMOND, CompatibilityScoreMark.HEART, CompatibilityScoreMark.CROSS,
+    CompatibilityScoreMark.DIAMOND,
+
+    CompatibilityScoreMark.DIAMOND, CompatibilityScoreMark.CROSS, CompatibilityScoreMark.HEART,
+    CompatibilityScoreMark.DIAMOND,
+
+    CompatibilityScoreMark.CROSS, CompatibilityScoreMark.DIAMOND, CompatibilityScoreMark.DIAMOND,
+    CompatibilityScoreMark.HEART,
+]
+
+
+def get_star_sign_group(star_sign):
+    # type: (StarSigns) -> int
+    """The element group of a star sign, 1 to 4: fire, earth, air, water"""
+    return _star_sign_group_idx[star_sign]
+
+
 def calculate_compatibility_score_by_star_signs(ss1, ss2):
     # type: (StarSigns, StarSigns) -> CompatibilityScoreMark
-    ss1_gid = _star_sign_group_idx[ss1]
-    ss2_gid = _star_sign_group_idx[ss2]
-    if ss1_gid == ss2_gid:
-        return CompatibilityScoreMark.HEART
-    elif (ss1_gid == 1 and ss2_gid == 4) or \
-            (ss1_gid == 4 and ss2_gid == 1) or \
-            (ss1_gid == 2 and ss2_gid == 3) or \
-            (ss1_gid == 3 and ss2_gid == 2):
-        return CompatibilityScoreMark.CROSS
-    else:
-        return CompatibilityScoreMark.DIAMOND
+    return _star_sign_group_marks[(_star_sign_group_idx[ss1] - 1) * 4 + _star_sign_group_idx[ss2] - 1]
 
 
 def calc_villager_compatibility(villager_a, villager_b):
@@ -145,11 +151,44 @@ def calc_villager_compatibility(villager_a, villager_b):
     }
 
 
-def calculate_compatibility_matrix(villagers_list, data_src):
-    # type: (List[str], AcListerVillagerDataReader) -> List[List[Dict]]
+@timed_stage("matrix")
+def calculate_compatibility_matrix(villagers_list,  # type: List[str]
+                                   data_src,  # type: AcListerVillagerDataReader
+                                   roster_matrix=None,  # type: Optional[RosterCompatibilityMatrix]
+                                   engine="python",  # type: str
+                                   report_cache=None,  # type: Optional[IslandReportCache]
+                                   ):
+    # type: (...) -> List[List[Dict]]
+    if report_cache is not None:
+        from src.compatibility_matrix import pack_compatibility, unpack_compatibility
+        report_cache.check_data_src(data_src)
+        code_rows = report_cache.get_codes(villagers_list)
+        if code_rows is not None:
+            return [[unpack_compatibility(code) for code in row] for row in code_rows]
+        comp_matrix = calculate_compatibility_matrix(villagers_list, data_src, roster_matrix, engine)
+        report_cache.put_codes(villagers_list, [[pack_compatibility(comp) for comp in row] for row in comp_matrix])
+        return comp_matrix
+    if roster_matrix is not None:
+        return roster_matrix.sub_matrix(villagers_list)
+    if engine == "numpy":
+        from src import vectorized_engine
+        return vectorized_engine.calculate_compatibility_matrix(villagers_list, data_src)
+    elif engine != "python":
+        raise ValueError("Unknown compatibility engine {}, must be either python or numpy".format(engine))
+
+    # Compatibility is symmetric: every unordered pair is calculated once, the mirrored cell gets a copy of the result
+    villagers_data = _query_villagers_data(villagers_list, data_src)
+    comp_matrix = [[None] * len(villagers_data) for _ in villagers_data]  # type: List[List[Optional[Dict]]]
+    for i, va in enumerate(villagers_data):
+        comp_matrix[i][i] = calc_villager_compatibility(va, va)
+        for j in range(i + 1, len(villagers_data)):
+            comp = comp_matrix[i][j] = calc_villager_compatibility(va, villagers_data[j])
+            comp_matrix[j][i] = dict(comp) if comp is not None else None
+    return comp_matrix
 
-    comp_matrix = []
 
+def _query_villagers_data(villagers_list, data_src):
+    # type: (List[str], AcListerVillagerDataReader) -> List[VillagerData]
     def query_nth_villager_data(idx):
         dat = data_src.get_data_by_villager_id(villagers_list[idx])
         if not dat:
@@ -161,21 +200,66 @@ def calculate_compatibility_matrix(villagers_list, data_src):
 
         return dat
 
-    for i in range(len(villagers_list)):
-        va = query_nth_villager_data(i)
-        curr_row = []
-        for j in range(len(villagers_list)):
-            vb = query_nth_villager_data(j)
-            curr_row.append(calc_villager_compatibility(va, vb))
-        comp_matrix.append(curr_row)
+    return [query_nth_villager_data(i) for i in range(len(villagers_list))]
 
-    return comp_matrix
 
+def iter_compatibility_matrix(villagers_list,  # type: List[str]
+                              data_src,  # type: AcListerVillagerDataReader
+                              roster_matrix=None,  # type: Optional[RosterCompatibilityMatrix]
+                              ):
+    # type: (...) -> Iterator[List[Optional[Dict]]]
+    """
+    Lazy calculate_compatibility_matrix(): the rows are computed one at a time as they are asked for, so only one
+    row is held in memory. Every villager is looked up (and the ValueError raised) before the first row comes out.
+    """
+    if roster_matrix is not None:
+        yield from roster_matrix.iter_sub_matrix(villagers_list)
+        return
 
-def evaluate_compatibility(comp_mark):
+    villagers_data = _query_villagers_data(villagers_list, data_src)
+    for va in villagers_data:
+        curr_row = []
+        for vb in villagers_data:
+            curr_row.append(calc_villager_compatibility(va, vb))
+        yield curr_row
+
+
+def iter_compatibility_pairs(villagers_list,  # type: List[str]
+                             data_src,  # type: AcListerVillagerDataReader
+                             roster_matrix=None,  # type: Optional[RosterCompatibilityMatrix]
+                             ):
+    # type: (...) -> Iterator[Tuple[str, str, Optional[Dict]]]
+    """(villager a, villager b, compatibility) of every cell of iter_compatibility_matrix(), in row order"""
+    for villager_a, row in zip(villagers_list, iter_compatibility_matrix(villagers_list, data_src, roster_matrix)):
+        yield from zip(itertools.repeat(villager_a), villagers_list, row)
+
+
+def iter_unique_pairs(villagers_list,  # type: List[str]
+                      data_src,  # type: AcListerVillagerDataReader
+                      roster_matrix=None,  # type: Optional[RosterCompatibilityMatrix]
+                      include_diagonal=False,  # type: bool
+                      ):
+    # type: (...) -> Iterator[Tuple[str, str, Optional[Dict]]]
+    """
+    (villager a, villager b, compatibility) of every unordered pair once, a coming before b in villagers_list: the
+    upper triangle of the matrix, N*(N-1)/2 pairs, plus each villager against itself with include_diagonal.
+    Every villager is looked up (and the ValueError raised) before the first pair comes out.
+    """
+    if roster_matrix is not None:
+        from src.compatibility_matrix import unpack_compatibility
+        for villager_a, villager_b, code in roster_matrix.iter_unique_pairs(villagers_list, include_diagonal):
+            yield villager_a, villager_b, unpack_compatibility(code)
+        return
+
+    villagers_data = _query_villagers_data(villagers_list, data_src)
+    first = 0 if include_diagonal else 1
+    for i, va in enumerate(villagers_data):
+        for j in range(i + first, len(villagers_data)):
+            yield villagers_list[i], villagers_list[j], calc_villager_compatibility(va, villagers_data[j])
+
+
+def _evaluate_marks(comp_mark):
     # type: (List[CompatibilityScoreMark]) -> Compatibility
-    from collections import Counter
-    assert len(comp_mark) == 3
     counts = Counter(comp_mark)
 
     def test_good_compatibility():
@@ -203,21 +287,115 @@ def evaluate_compatibility(comp_mark):
         return Compatibility.AVERAGE
 
 
+# The verdict of every three marks, indexed by (mark a + 1) << 4 | (mark b + 1) << 2 | (mark c + 1). The verdict only
+# counts the marks, so their order doesn't matter.
+_verdict_tbl = [
+    _evaluate_marks([CompatibilityScoreMark((idx >> shift & 0x3) - 1) for shift in (4, 2, 0)]) for idx in range(64)
+]  # type: List[Compatibility]
+
+
+def get_verdict_by_marks_index(marks_index):
+    # type: (int) -> Compatibility
+    """The verdict of three marks packed as (mark a + 1) << 4 | (mark b + 1) << 2 | (mark c + 1), 0 to 63"""
+    return _verdict_tbl[marks_index]
+
+
+@timed_stage("verdict")
+def evaluate_compatibility(comp_mark):
+    # type: (List[CompatibilityScoreMark]) -> Compatibility
+    assert len(comp_mark) == 3
+    return _verdict_tbl[
+        ((comp_mark[0].value + 1) << 4) | ((comp_mark[1].value + 1) << 2) | (comp_mark[2].value + 1)
+    ]
+
+
 def get_data_dir_path():
     return os.path.join(os.path.dirname(__file__), os.path.pardir, "data")
 
 
+def get_villager_data_path():
+    return os.path.join(get_data_dir_path(), "villager.json")
+
+
+def get_personality_compatibility_data_path():
+    return os.path.join(get_data_dir_path(), "personality_compatibility.json")
+
+
+def get_species_compatibility_data_path():
+    return os.path.join(get_data_dir_path(), "species_compatibility.json")
+
+
+def get_rules_version():
+    # type: () -> int
+    """How many times the rule tables were (re)loaded"""
+    return _rules_version
+
+
+@timed_stage("load")
 def load_personality_compatibility_data():
-    data_dir_path = get_data_dir_path()
-    with open(os.path.join(data_dir_path, "personality_compatibility.json"), "r") as _fp:
-        data = json.load(_fp)  # type: Dict[str,Dict[str,str]]
-        for p1, p2_comp in data.items():
-            p1_enum = getattr(Personality, p1)
-            assert p1_enum
-            for p2, comp in p2_comp.items():
-                p2_enum = getattr(Personality, p2)
-                assert p2_enum
-                _personality_comp_score_matrix[p1_enum][p2_enum] = get_compatibility_score_by_unicode_sign(comp)
-
-
-load_personality_compatibility_data()
+    global _personality_comp_score_matrix, _rules_version
+    from src.roster_snapshot import open_fresh_snapshot
+    matrix = defaultdict(dict)  # type: Dict[Personality, Dict[Personality, CompatibilityScoreMark]]
+    snapshot = open_fresh_snapshot(get_villager_data_path(), get_personality_compatibility_data_path())
+    if snapshot:
+        for (p1_enum, p2_enum), mark_value in snapshot.get_personality_marks().items():
+            matrix[p1_enum][p2_enum] = CompatibilityScoreMark(mark_value)
+        snapshot.close()
+    else:
+        with open(get_personality_compatibility_data_path(), "r") as _fp:
+            data = json.load(_fp)  # type: Dict[str,Dict[str,str]]
+            for p1, p2_comp in data.items():
+                p1_enum = getattr(Personality, p1)
+                assert p1_enum
+                for p2, comp in p2_comp.items():
+                    p2_enum = getattr(Personality, p2)
+                    assert p2_enum
+                    matrix[p1_enum][p2_enum] = get_compatibility_score_by_unicode_sign(comp)
+    _personality_comp_score_matrix = dict(matrix)
+    _rules_version += 1
+
+
+@timed_stage("load")
+def load_species_compatibility_data(species_comp_loc=None):
+    # type: (Optional[str]) -> None
+    """
+    Compile the species rules (data/species_compatibility.json, or the species_comp_loc file of the same layout)
+    into the table calculate_compatibility_score_by_species() reads. Every species pair must be defined, and in the
+    same way both ways round: the roster matrix only calculates one of the two.
+    """
+    global _species_comp_score_tbl, _rules_version
+    from src.roster_snapshot import open_fresh_snapshot
+    tbl = [None] * (_SPECIES_COUNT * _SPECIES_COUNT)  # type: List[Optional[CompatibilityScoreMark]]
+    snapshot = None
+    if species_comp_loc is None:
+        species_comp_loc = get_species_compatibility_data_path()
+        snapshot = open_fresh_snapshot(get_villager_data_path(), get_personality_compatibility_data_path())
+    if snapshot:
+        for (s1_enum, s2_enum), mark_value in snapshot.get_species_marks().items():
+            tbl[(s1_enum.value - 1) * _SPECIES_COUNT + s2_enum.value - 1] = CompatibilityScoreMark(mark_value)
+        snapshot.close()
+    else:
+        with open(species_comp_loc, "r", encoding="utf-8") as _fp:
+            data = json.load(_fp)  # type: Dict[str,Dict[str,str]]
+        for s1, s2_comp in data.items():
+            s1_enum = getattr(Species, s1, None)
+            if s1_enum is None:
+                raise ValueError("Unknown species {} in the species rules".format(s1))
+            for s2, comp in s2_comp.items():
+                s2_enum = getattr(Species, s2, None)
+                if s2_enum is None:
+                    raise ValueError("Unknown species {} in the species rules".format(s2))
+                tbl[(s1_enum.value - 1) * _SPECIES_COUNT + s2_enum.value - 1] = \
+                    get_compatibility_score_by_unicode_sign(comp)
+    for idx, mark in enumerate(tbl):
+        if mark is None:
+            raise ValueError("The species rules lack {} / {}".format(
+                Species(idx // _SPECIES_COUNT + 1).name, Species(idx % _SPECIES_COUNT + 1).name
+            ))
+        mirror = tbl[(idx % _SPECIES_COUNT) * _SPECIES_COUNT + idx // _SPECIES_COUNT]
+        if mirror is not None and mark != mirror:
+            raise ValueError("The species rules give {} / {} and its reverse different marks".format(
+                Species(idx // _SPECIES_COUNT + 1).name, Species(idx % _SPECIES_COUNT + 1).name
+            ))
+    _species_comp_score_tbl = tbl
+    _rules_version += 1
@@ -0,0 +1,165 @@
+from typing import (
+    List, Optional, Dict, Tuple, Callable, Any
+)
+
+try:
+    import numpy as np
+except ImportError:  # the vectorized engine is optional, see the "vectorized" extra in pyproject.toml
+    np = None
+
+from src.data_model import StarSigns, CompatibilityScoreMark, Personality, Species, VillagerData
+from src.utils import (
+    get_star_sign_by_birthday, calculate_compatibility_score_by_personality, calculate_compatibility_score_by_species,
+    calculate_compatibility_score_by_star_signs, get_rules_version, get_star_sign_group,
+    get_verdict_by_marks_index
+)
+
+# A villager without species, personality or birthday gets this code in every column
+INVALID_CODE = -1
+
+
+def is_available():
+    # type: () -> bool
+    return np is not None
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("The vectorized compatibility engine requires numpy, install it with `pip install numpy`")
+
+
+def _build_mark_lookup_table(operands, rule):
+    # type: (List[Any], Callable[[Any, Any], CompatibilityScoreMark]) -> np.ndarray
+    return np.array([[rule(a, b).value for b in operands] for a in operands], dtype=np.int8)
+
+
+def _star_sign_group_representatives():
+    # type: () -> List[StarSigns]
+    representatives = dict()
+    for ss in StarSigns:
+        representatives.setdefault(get_star_sign_group(ss), ss)
+    return [representatives[gid] for gid in sorted(representatives.keys())]
+
+
+def _build_verdict_lookup_table():
+    # type: () -> np.ndarray
+    # Indexed by (species mark + 1) << 4 | (personality mark + 1) << 2 | (star sign mark + 1)
+    # The verdict doesn't depend on the order of the marks, the compiled verdict table fits as is
+    return np.array([get_verdict_by_marks_index(idx).value for idx in range(64)], dtype=np.int8)
+
+
+_lookup_tables = None  # type: Optional[Dict[str, np.ndarray]]
+# The src.utils.get_rules_version() the lookup tables were built from, they are rebuilt once the rules are reloaded
+_lookup_tables_version = -1
+
+
+def get_lookup_tables():
+    # type: () -> Dict[str, np.ndarray]
+    global _lookup_tables, _lookup_tables_version
+    _require_numpy()
+    rules_version = get_rules_version()
+    if _lookup_tables is None or _lookup_tables_version != rules_version:
+        _lookup_tables = {
+            "species": _build_mark_lookup_table(list(Species), calculate_compatibility_score_by_species),
+            "personality": _build_mark_lookup_table(list(Personality), calculate_compatibility_score_by_personality),
+            "star_sign": _build_mark_lookup_table(
+                _star_sign_group_representatives(), calculate_compatibility_score_by_star_signs
+            ),
+            "verdict": _build_verdict_lookup_table(),
+        }
+        _lookup_tables_version = rules_version
+    return _lookup_tables
+
+
+def encode_villagers(villagers):
+    # type: (List[Optional[VillagerData]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]
+    """
+    Encode the villagers into (species, personality, star sign group) code arrays. The codes are the 0-based
+    positions inside the enum (or star sign group), villagers lacking any of the fields are coded INVALID_CODE.
+    """
+    _require_numpy()
+    species_order = {s: idx for idx, s in enumerate(Species)}
+    personality_order = {p: idx for idx, p in enumerate(Personality)}
+    group_order = {ss: get_star_sign_group(ss) - 1 for ss in StarSigns}
+
+    n = len(villagers)
+    species_codes = np.full(n, INVALID_CODE, dtype=np.int16)
+    personality_codes = np.full(n, INVALID_CODE, dtype=np.int16)
+    group_codes = np.full(n, INVALID_CODE, dtype=np.int16)
+    for idx, v in enumerate(villagers):
+        if not v or not v.birthday or not v.personality or not v.species:
+            continue
+        species_codes[idx] = species_order[v.species]
+        personality_codes[idx] = personality_order[v.personality]
+        group_codes[idx] = group_order[get_star_sign_by_birthday(v.birthday)]
+    return species_codes, personality_codes, group_codes
+
+
+def calculate_compatibility_arrays(codes_a,  # type: Tuple[np.ndarray, np.ndarray, np.ndarray]
+                                   codes_b,  # type: Tuple[np.ndarray, np.ndarray, np.ndarray]
+                                   ):
+    # type: (...) -> Dict[str, np.ndarray]
+    """
+    Calculate the marks and the verdict of every (a, b) pair between two encoded villager lists. Returns len(a) *
+    len(b) int8 arrays keyed "species", "personality", "star_sign", "verdict" and a boolean array "valid" that is False
+    wherever calc_villager_compatibility() would return None (the other arrays are meaningless there).
+    """
+    tbl = get_lookup_tables()
+    valid_a = codes_a[0] != INVALID_CODE
+    valid_b = codes_b[0] != INVALID_CODE
+    # Invalid codes are redirected to index 0 so the fancy indexing stays in range, they are masked by "valid"
+    sa, pa, ga = (np.where(valid_a, c, 0) for c in codes_a)
+    sb, pb, gb = (np.where(valid_b, c, 0) for c in codes_b)
+
+    species = tbl["species"][sa[:, None], sb[None, :]]
+    personality = tbl["personality"][pa[:, None], pb[None, :]]
+    star_sign = tbl["star_sign"][ga[:, None], gb[None, :]]
+    verdict = tbl["verdict"][
+        ((species.astype(np.int16) + 1) << 4) | ((personality.astype(np.int16) + 1) << 2) | (star_sign + 1)
+    ]
+    return {
+        "species": species,
+        "personality": personality,
+        "star_sign": star_sign,
+        "verdict": verdict,
+        "valid": valid_a[:, None] & valid_b[None, :],
+    }
+
+
+def calc_villager_compatibility_batch(villagers_a, villagers_b):
+    # type: (List[VillagerData], List[VillagerData]) -> Dict[str, np.ndarray]
+    return calculate_compatibility_arrays(encode_villagers(villagers_a), encode_villagers(villagers_b))
+
+
+def compatibility_arrays_to_matrix(arrays):
+    # type: (Dict[str, np.ndarray]) -> List[List[Optional[Dict[str, CompatibilityScoreMark]]]]
+    marks = {m.value: m for m in CompatibilityScoreMark}
+    comp_matrix = []
+    for p_row, s_row, ss_row, valid_row in zip(
+            arrays["personality"].tolist(), arrays["species"].tolist(), arrays["star_sign"].tolist(),
+            arrays["valid"].tolist()
+    ):
+        comp_matrix.append([
+            {"personality": marks[p], "species": marks[s], "star_sign": marks[ss]} if valid else None
+            for p, s, ss, valid in zip(p_row, s_row, ss_row, valid_row)
+        ])
+    return comp_matrix
+
+
+def calculate_compatibility_matrix(villagers, data_src):
+    # type: (List[str], AcListerVillagerDataReader) -> List[List[Dict]]
+    """
+    The numpy counterpart of src.utils.calculate_compatibility_matrix(), with identical results.
+    """
+    villagers_data = []
+    for idx, villager_id in enumerate(villagers):
+        dat = data_src.get_data_by_villager_id(villager_id)
+        if not dat:
+            raise ValueError(
+                "Failed to query the information for the {}th villager: no villager with id {} in the database".format(
+                    idx + 1, villager_id
+                )
+            )
+        villagers_data.append(dat)
+    codes = encode_villagers(villagers_data)
+    return compatibility_arrays_to_matrix(calculate_compatibility_arrays(codes, codes))
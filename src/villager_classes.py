@@ -0,0 +1,180 @@
+from typing import (
+    Iterable, List, Optional, Dict, Tuple, Union, Any
+)
+
+from src.compatibility_index import parse_verdict
+from src.compatibility_matrix import marks_to_code, unpack_compatibility, unpack_verdict, NO_DATA_CODE
+from src.data_model import Compatibility, CompatibilityScoreMark, Personality, Species, StarSigns
+from src.data_reader import VillagerDataReader
+from src.utils import (
+    calculate_compatibility_score_by_personality, calculate_compatibility_score_by_species,
+    calculate_compatibility_score_by_star_signs, get_star_sign_by_birthday, get_star_sign_group
+)
+
+# One star sign of each element group, the star sign rule only looks at the groups
+_GROUP_STAR_SIGNS = dict()  # type: Dict[int, StarSigns]
+for _star_sign in StarSigns:
+    _GROUP_STAR_SIGNS.setdefault(get_star_sign_group(_star_sign), _star_sign)
+
+
+class _MarkTable:
+    """
+    Memoized results of one scoring rule, addressed by the small integer ids handed out by add_operand(). Each cell
+    holds the mark value + 1. All operands must be added before the first get_row().
+    """
+
+    def __init__(self, rule):
+        self._rule = rule
+        self._operands = []
+        self._operand_to_id = dict()
+        self._rows = []
+
+    def add_operand(self, operand):
+        # type: (Any) -> int
+        operand_id = self._operand_to_id.get(operand)
+        if operand_id is None:
+            operand_id = self._operand_to_id[operand] = len(self._operands)
+            self._operands.append(operand)
+        return operand_id
+
+    def get_row(self, operand_id):
+        # type: (int) -> List[int]
+        while len(self._rows) < len(self._operands):
+            a = self._operands[len(self._rows)]
+            self._rows.append([self._rule(a, b).value + 1 for b in self._operands])
+        return self._rows[operand_id]
+
+
+class VillagerClasses:
+    """
+    The villagers of a roster bucketed by what their compatibility depends on: (species, personality, star sign
+    element group). Villagers of a class are in the same compatibility with everybody, so the compatibility of every
+    class pair is calculated once into a class x class table of roster matrix codes (see src.compatibility_matrix),
+    and villager queries go through the class ids. There are at most 35 * 8 * 4 classes whatever the roster size.
+
+    The villagers whose compatibility can't be calculated (missing birthday, species or personality) are in no class.
+    """
+
+    def __init__(self, data_src, villager_ids=None):
+        # type: (VillagerDataReader, Optional[Iterable[str]]) -> None
+        if villager_ids is None:
+            villager_ids = data_src.get_all_villager_ids()
+        species_marks = _MarkTable(calculate_compatibility_score_by_species)
+        personality_marks = _MarkTable(calculate_compatibility_score_by_personality)
+        group_marks = _MarkTable(calculate_compatibility_score_by_star_signs)
+
+        self._keys = []  # type: List[Tuple[Species, Personality, int]]
+        self._members = []  # type: List[List[str]]
+        self._class_by_villager = dict()  # type: Dict[str, Optional[int]]
+        key_to_class = dict()  # type: Dict[Tuple[Species, Personality, int], int]
+        operand_ids = []  # type: List[Tuple[int, int, int]]
+        for villager_id in villager_ids:
+            v = data_src.get_data_by_villager_id(villager_id)
+            if not v or not v.birthday or not v.personality or not v.species:
+                self._class_by_villager[villager_id] = None
+                continue
+            key = (v.species, v.personality, get_star_sign_group(get_star_sign_by_birthday(v.birthday)))
+            class_id = key_to_class.get(key)
+            if class_id is None:
+                class_id = key_to_class[key] = len(self._keys)
+                self._keys.append(key)
+                self._members.append([])
+                operand_ids.append((
+                    species_marks.add_operand(key[0]),
+                    personality_marks.add_operand(key[1]),
+                    group_marks.add_operand(_GROUP_STAR_SIGNS[key[2]])
+                ))
+            self._members[class_id].append(villager_id)
+            self._class_by_villager[villager_id] = class_id
+
+        self._size = c = len(self._keys)
+        self._codes = bytearray(c * c)
+        for a, key_a in enumerate(operand_ids):
+            rows = (species_marks.get_row(key_a[0]), personality_marks.get_row(key_a[1]),
+                    group_marks.get_row(key_a[2]))
+            for b in range(a, c):
+                key_b = operand_ids[b]
+                self._codes[a * c + b] = self._codes[b * c + a] = marks_to_code(
+                    (rows[0][key_b[0]] << 6) | (rows[1][key_b[1]] << 4) | (rows[2][key_b[2]] << 2)
+                )
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, villager_id):
+        return villager_id in self._class_by_villager
+
+    @property
+    def villager_ids(self):
+        # type: () -> List[str]
+        return list(self._class_by_villager)
+
+    def get_class(self, villager_id):
+        # type: (str) -> Optional[int]
+        """The class id of the villager, None when its compatibility can't be calculated"""
+        try:
+            return self._class_by_villager[villager_id]
+        except KeyError:
+            raise ValueError("No villager with id {} in the roster".format(villager_id))
+
+    def get_class_key(self, class_id):
+        # type: (int) -> Tuple[Species, Personality, int]
+        """The (species, personality, star sign element group) of the class"""
+        return self._keys[class_id]
+
+    def get_members(self, class_id):
+        # type: (int) -> List[str]
+        """The villagers of the class, in roster order"""
+        return list(self._members[class_id])
+
+    def get_class_code(self, class_a, class_b):
+        # type: (int, int) -> int
+        return self._codes[class_a * self._size + class_b]
+
+    def get_class_row(self, class_id):
+        # type: (int) -> memoryview
+        """The codes of the class against every class, by class id"""
+        return memoryview(self._codes)[class_id * self._size:(class_id + 1) * self._size]
+
+    def get_code(self, villager_a, villager_b):
+        # type: (str, str) -> int
+        class_a = self.get_class(villager_a)
+        class_b = self.get_class(villager_b)
+        if class_a is None or class_b is None:
+            return NO_DATA_CODE
+        return self._codes[class_a * self._size + class_b]
+
+    def get_compatibility(self, villager_a, villager_b):
+        # type: (str, str) -> Optional[Dict[str, CompatibilityScoreMark]]
+        return unpack_compatibility(self.get_code(villager_a, villager_b))
+
+    def get_verdict(self, villager_a, villager_b):
+        # type: (str, str) -> Optional[Compatibility]
+        return unpack_verdict(self.get_code(villager_a, villager_b))
+
+    def get_partner_classes(self, class_id, verdict):
+        # type: (int, Compatibility) -> List[int]
+        """The ids of the classes in `verdict` compatibility with the class"""
+        verdict_bits = verdict.value + 1
+        return [
+            other for other, code in enumerate(self.get_class_row(class_id))
+            if code != NO_DATA_CODE and code & 0x3 == verdict_bits
+        ]
+
+    def expand(self, class_ids):
+        # type: (Iterable[int]) -> List[str]
+        """The villagers of the classes, in roster order"""
+        selected = set(class_ids)
+        return [v for v, class_id in self._class_by_villager.items() if class_id in selected]
+
+    def get_partners(self, villager_id, verdict):
+        # type: (str, Union[Compatibility, str]) -> List[str]
+        """
+        The villagers in `verdict` (a Compatibility or its name) compatibility with the villager, in roster order,
+        the villager itself left out
+        """
+        verdict = parse_verdict(verdict)
+        class_id = self.get_class(villager_id)
+        if class_id is None:
+            return []
+        return [v for v in self.expand(self.get_partner_classes(class_id, verdict)) if v != villager_id]
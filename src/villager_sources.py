@@ -0,0 +1,219 @@
+from typing import (
+    Callable, List, Optional, Dict, Any, Iterable, Tuple, Union
+)
+
+import hashlib
+import json
+import os
+
+from src.data_model import Personality, Species
+from src.data_reader import AcListerVillagerDataReader, parse_birthday
+from src.profiling import stage
+
+# Every source is parsed into records of the AC-Lister villager.json layout (id, name, species, personality, coffee,
+# birthday, wiki), None standing for a field the source doesn't know. Merged records never hold None, a field no
+# source knows is "" as in villager.json.
+RECORD_FIELDS = ("id", "name", "species", "personality", "coffee", "birthday", "wiki")
+# Bump when the merge or the parsing changes, merged caches of an other version are ignored
+CACHE_VERSION = 1
+
+_source_formats = dict()  # type: Dict[str, Tuple[Callable[[str], List[Dict[str, Optional[str]]]], Tuple[str, ...]]]
+
+
+def register_source_format(name, parser, extensions=()):
+    # type: (str, Callable[[str], List[Dict[str, Optional[str]]]], Iterable[str]) -> None
+    """
+    Make a source format available by name. parser(path) returns the records of the file, extensions (".json", ""
+    for no extension...) are the file extensions guess_source_format() recognizes it by.
+    """
+    _source_formats[name] = (parser, tuple(extensions))
+
+
+def get_source_formats():
+    # type: () -> List[str]
+    return list(_source_formats)
+
+
+def guess_source_format(path):
+    # type: (str) -> str
+    extension = os.path.splitext(path)[1].lower()
+    for name, (_, extensions) in _source_formats.items():
+        if extension in extensions:
+            return name
+    raise ValueError("Can't tell the format of {}, must be one of {}".format(path, ", ".join(_source_formats)))
+
+
+def parse_aclister_source(path):
+    # type: (str) -> List[Dict[str, Optional[str]]]
+    """The AC-Lister villager.json"""
+    with open(path, "r") as fp_data:
+        villagers = json.load(fp_data)  # type: List[Dict[str, Any]]
+    return [{field: villager.get(field) for field in RECORD_FIELDS} for villager in villagers]
+
+
+def _is_valid_birthday(birthday):
+    # type: (str) -> bool
+    try:
+        return parse_birthday(birthday) is not None
+    except ValueError:
+        return False
+
+
+def parse_name_species_source(path):
+    # type: (str) -> List[Dict[str, Optional[str]]]
+    """
+    One "Name/Species" line per villager, like data/test/acnh_villager, the name being the id. A line may go on with
+    "/Personality" and "/Month Day" for the villagers the other sources lack. Blank lines and lines starting with #
+    are skipped.
+    """
+    records = []
+    with open(path, "r", encoding="utf-8") as fp_data:
+        for line_number, line in enumerate(fp_data, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = [f.strip() for f in line.split("/")]
+            if len(fields) < 2 or len(fields) > 4 or not fields[0]:
+                raise ValueError("{}:{}: expected Name/Species[/Personality[/Month Day]]".format(path, line_number))
+            if getattr(Species, fields[1], None) is None:
+                raise ValueError("{}:{}: unknown species {}".format(path, line_number, fields[1]))
+            if len(fields) > 2 and getattr(Personality, fields[2], None) is None:
+                raise ValueError("{}:{}: unknown personality {}".format(path, line_number, fields[2]))
+            if len(fields) > 3 and not _is_valid_birthday(fields[3]):
+                raise ValueError("{}:{}: invalid birthday {}".format(path, line_number, fields[3]))
+            record = dict.fromkeys(RECORD_FIELDS)  # type: Dict[str, Optional[str]]
+            record["id"] = record["name"] = fields[0]
+            record["species"] = fields[1]
+            if len(fields) > 2:
+                record["personality"] = fields[2]
+            if len(fields) > 3:
+                record["birthday"] = fields[3]
+            records.append(record)
+    return records
+
+
+register_source_format("aclister", parse_aclister_source, [".json"])
+register_source_format("name-species", parse_name_species_source, ["", ".txt"])
+
+
+def _resolve_sources(sources):
+    # type: (Iterable[Union[str, Tuple[str, str]]]) -> List[Tuple[str, str]]
+    resolved = []
+    for source in sources:
+        if isinstance(source, str):
+            source = (source, guess_source_format(source))
+        path, source_format = source
+        if source_format not in _source_formats:
+            raise ValueError("Unknown source format {}, must be one of {}".format(
+                source_format, ", ".join(_source_formats)
+            ))
+        resolved.append((path, source_format))
+    if not resolved:
+        raise ValueError("At least one villager source is needed")
+    return resolved
+
+
+def merge_sources(sources):
+    # type: (Iterable[Union[str, Tuple[str, str]]]) -> List[Dict[str, str]]
+    """
+    Parse and merge the sources (paths, or (path, format name) pairs), a later source taking precedence over the
+    earlier ones: every field it knows replaces the one of the same villager id, and its new villagers are appended.
+    A villager id appearing twice in one source is an error.
+    """
+    merged = []  # type: List[Dict[str, Optional[str]]]
+    index = dict()  # type: Dict[str, int]
+    for path, source_format in _resolve_sources(sources):
+        seen = set()
+        for record in _source_formats[source_format][0](path):
+            villager_id = record.get("id")
+            if not villager_id:
+                raise ValueError("A villager of {} has no id".format(path))
+            if villager_id in seen:
+                raise ValueError("Villager {} appears twice in {}".format(villager_id, path))
+            seen.add(villager_id)
+            idx = index.get(villager_id)
+            if idx is None:
+                index[villager_id] = len(merged)
+                merged.append(dict(record))
+            else:
+                merged[idx].update((k, v) for k, v in record.items() if v is not None)
+    return [{field: record.get(field) or "" for field in RECORD_FIELDS} for record in merged]
+
+
+def sources_cache_key(sources):
+    # type: (Iterable[Union[str, Tuple[str, str]]]) -> str
+    """The digest of the cache version and of the format and content of every source, in order"""
+    digest = hashlib.sha256("{}\n".format(CACHE_VERSION).encode("utf-8"))
+    for path, source_format in _resolve_sources(sources):
+        with open(path, "rb") as fp_data:
+            content_digest = hashlib.sha256(fp_data.read()).hexdigest()
+        digest.update("{}:{}\n".format(source_format, content_digest).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def default_merged_cache_path(sources):
+    # type: (List[Tuple[str, str]]) -> str
+    return os.path.splitext(sources[0][0])[0] + ".merged.json"
+
+
+def load_merged_sources(sources, cache_loc=None, use_cache=True):
+    # type: (Iterable[Union[str, Tuple[str, str]]], Optional[str], bool) -> Tuple[List[Dict[str, str]], bool]
+    """
+    merge_sources(), served from the cache file (next to the first source by default) when it was written from
+    sources of the same content, and written there otherwise. Returns the records and whether the cache served them.
+    """
+    sources = _resolve_sources(sources)
+    if cache_loc is None:
+        cache_loc = default_merged_cache_path(sources)
+    key = sources_cache_key(sources)
+    if use_cache:
+        try:
+            with open(cache_loc, "r", encoding="utf-8") as fp_cache:
+                cached = json.load(fp_cache)
+            if cached.get("key") == key:
+                return cached["villagers"], True
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    records = merge_sources(sources)
+    if use_cache:
+        tmp_loc = cache_loc + ".tmp"
+        try:
+            with open(tmp_loc, "w", encoding="utf-8") as fp_cache:
+                json.dump({"key": key, "villagers": records}, fp_cache, ensure_ascii=False)
+            os.replace(tmp_loc, cache_loc)
+        except OSError:
+            # A read-only data directory only costs the next start a merge
+            pass
+    return records, False
+
+
+class MergedVillagerDataReader(AcListerVillagerDataReader):
+    """
+    The villagers of several sources merged with load_merged_sources(), later sources taking precedence, served like
+    the AC-Lister database through one id index
+    """
+
+    def __init__(self, sources, cache_loc=None, use_cache=True, cache_size=1024, cache_policy="lru"):
+        # type: (Iterable[Union[str, Tuple[str, str]]], Optional[str], bool, int, str) -> None
+        self._sources = _resolve_sources(sources)
+        with stage("load"):
+            raw_data, self._from_cache = load_merged_sources(self._sources, cache_loc, use_cache)
+        super().__init__(cache_size=cache_size, cache_policy=cache_policy, raw_data=raw_data)
+
+    @property
+    def sources(self):
+        # type: () -> List[Tuple[str, str]]
+        """The (path, format name) of every source, by increasing precedence"""
+        return list(self._sources)
+
+    @property
+    def data_files(self):
+        # type: () -> List[str]
+        return [path for path, _ in self._sources]
+
+    @property
+    def from_cache(self):
+        # type: () -> bool
+        """Whether the merged villagers were read from the cache instead of merged"""
+        return self._from_cache
@@ -0,0 +1,170 @@
+from typing import (
+    Iterable, List, Optional, Dict, Tuple
+)
+
+from array import array
+import sys
+
+from src.data_model import Personality, Species, StarSigns, VillagerData
+from src.data_reader import VillagerDataReader
+from src.utils import get_star_sign_by_birthday
+
+# Enum columns store the enum value (auto() values start at 1), 0 stands for a missing field
+_SPECIES_BY_CODE = [None] * (max(s.value for s in Species) + 1)  # type: List[Optional[Species]]
+for _s in Species:
+    _SPECIES_BY_CODE[_s.value] = _s
+_PERSONALITY_BY_CODE = [None] * (max(p.value for p in Personality) + 1)  # type: List[Optional[Personality]]
+for _p in Personality:
+    _PERSONALITY_BY_CODE[_p.value] = _p
+_STAR_SIGN_BY_CODE = [None] * (max(ss.value for ss in StarSigns) + 1)  # type: List[Optional[StarSigns]]
+for _ss in StarSigns:
+    _STAR_SIGN_BY_CODE[_ss.value] = _ss
+
+
+class VillagerRow:
+    """A lightweight view on one row of a VillagerTable, with the same properties as VillagerData"""
+    __slots__ = ("_table", "_ordinal")
+
+    def __init__(self, table, ordinal):
+        # type: (VillagerTable, int) -> None
+        self._table = table
+        self._ordinal = ordinal
+
+    @property
+    def ordinal(self):
+        # type: () -> int
+        return self._ordinal
+
+    @property
+    def name(self):
+        # type: () -> str
+        return self._table._names[self._ordinal]
+
+    @property
+    def villager_id(self):
+        # type: () -> str
+        return self._table._villager_ids[self._ordinal]
+
+    @property
+    def species(self):
+        # type: () -> Optional[Species]
+        return _SPECIES_BY_CODE[self._table._species_codes[self._ordinal]]
+
+    @property
+    def personality(self):
+        # type: () -> Optional[Personality]
+        return _PERSONALITY_BY_CODE[self._table._personality_codes[self._ordinal]]
+
+    @property
+    def coffee(self):
+        # type: () -> str
+        return self._table._coffees[self._ordinal]
+
+    @property
+    def birthday(self):
+        # type: () -> Optional[Tuple[int, int]]
+        month = self._table._birth_months[self._ordinal]
+        if not month:
+            return None
+        return month, self._table._birth_days[self._ordinal]
+
+    @property
+    def star_sign(self):
+        # type: () -> Optional[StarSigns]
+        return _STAR_SIGN_BY_CODE[self._table._star_sign_codes[self._ordinal]]
+
+    @property
+    def wiki(self):
+        # type: () -> str
+        return self._table._wikis[self._ordinal]
+
+    def __eq__(self, other):
+        return self.name == other.name and \
+               self.villager_id == other.villager_id and \
+               self.species == other.species and \
+               self.personality == other.personality and \
+               self.coffee == other.coffee and \
+               self.birthday == other.birthday and \
+               self.wiki == other.wiki
+
+
+class VillagerTable(VillagerDataReader):
+    """
+    A column oriented copy of a roster: the enum fields and the birthday are kept in byte arrays and the text
+    fields in lists of interned strings, rows are handed out as VillagerRow views. Once built, the reader it came
+    from (and its raw JSON) can be dropped.
+    """
+
+    def __init__(self, villagers):
+        # type: (Iterable[VillagerData]) -> None
+        self._villager_ids = []  # type: List[str]
+        self._names = []  # type: List[str]
+        self._coffees = []  # type: List[str]
+        self._wikis = []  # type: List[str]
+        self._species_codes = array('B')
+        self._personality_codes = array('B')
+        self._birth_months = array('B')
+        self._birth_days = array('B')
+        self._star_sign_codes = array('B')
+        self._villager_id_to_ordinal = dict()  # type: Dict[str, int]
+
+        for v in villagers:
+            assert v.villager_id not in self._villager_id_to_ordinal
+            self._villager_id_to_ordinal[sys.intern(v.villager_id)] = len(self._villager_ids)
+            self._villager_ids.append(sys.intern(v.villager_id))
+            self._names.append(sys.intern(v.name))
+            self._coffees.append(sys.intern(v.coffee))
+            self._wikis.append(sys.intern(v.wiki))
+            self._species_codes.append(v.species.value if v.species else 0)
+            self._personality_codes.append(v.personality.value if v.personality else 0)
+            month, day = v.birthday if v.birthday else (0, 0)
+            self._birth_months.append(month)
+            self._birth_days.append(day)
+            self._star_sign_codes.append(get_star_sign_by_birthday(v.birthday).value if v.birthday else 0)
+
+    @classmethod
+    def from_reader(cls, data_src):
+        # type: (VillagerDataReader) -> VillagerTable
+        return cls(data_src.get_many(data_src.get_all_villager_ids()))
+
+    def __len__(self):
+        return len(self._villager_ids)
+
+    def __getitem__(self, ordinal):
+        # type: (int) -> VillagerRow
+        if not 0 <= ordinal < len(self._villager_ids):
+            raise IndexError("Villager ordinal {} out of range".format(ordinal))
+        return VillagerRow(self, ordinal)
+
+    def __iter__(self):
+        return (VillagerRow(self, ordinal) for ordinal in range(len(self._villager_ids)))
+
+    def get_ordinal(self, villager_id):
+        # type: (str) -> Optional[int]
+        return self._villager_id_to_ordinal.get(villager_id)
+
+    def get_data_by_villager_id(self, villager_id):
+        # type: (str) -> Optional[VillagerRow]
+        ordinal = self._villager_id_to_ordinal.get(villager_id)
+        if ordinal is None:
+            return None
+        return VillagerRow(self, ordinal)
+
+    def get_all_villager_ids(self):
+        # type: () -> List[str]
+        return list(self._villager_ids)
+
+    @property
+    def species_codes(self):
+        # type: () -> array
+        return self._species_codes
+
+    @property
+    def personality_codes(self):
+        # type: () -> array
+        return self._personality_codes
+
+    @property
+    def star_sign_codes(self):
+        # type: () -> array
+        return self._star_sign_codes
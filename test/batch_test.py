@@ -0,0 +1,91 @@
+import io
+import json
+import sys
+import unittest
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class BatchTestCase(DebuggableTestCase):
+    @classmethod
+    def setUpClass(cls):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.compatibility_matrix import RosterCompatibilityMatrix
+        cls.data_src = AcListerVillagerDataReader()
+        cls.roster_matrix = RosterCompatibilityMatrix(cls.data_src)
+
+    def test_a_island_report(self):
+        from src.island_report import island_report
+        from src.utils import calculate_compatibility_matrix, evaluate_compatibility
+
+        island = ["Alice", "Bob", "Bree", "Chow", "Felicity", "Verdun"]
+        report = island_report(self.roster_matrix, island, with_pairs=True)
+        comp_matrix = calculate_compatibility_matrix(island, self.data_src)
+        expected = {"GOOD": 0, "AVERAGE": 0, "BAD": 0, None: 0}
+        for i in range(len(island)):
+            for j in range(i + 1, len(island)):
+                comp = comp_matrix[i][j]
+                expected[evaluate_compatibility(list(comp.values())).name if comp else None] += 1
+        self.assertEqual(island, report["villagers"])
+        self.assertEqual(expected["GOOD"], report["good_pairs"])
+        self.assertEqual(expected["AVERAGE"], report["average_pairs"])
+        self.assertEqual(expected["BAD"], report["bad_pairs"])
+        self.assertEqual(expected[None], report["no_data_pairs"])
+        self.assertEqual(len(island) * (len(island) - 1) // 2, len(report["pairs"]))
+        self.assertEqual(
+            {"villagers": ["Alice", "Bob"], "species": "CLOVER", "personality": "CROSS", "star_sign": "DIAMOND",
+             "verdict": "AVERAGE"},
+            report["pairs"][0]
+        )
+        self.assertEqual(None, report["pairs"][-1]["verdict"])
+        self.assertRaises(ValueError, island_report, self.roster_matrix, ["Alice", "Nobody"])
+
+    def test_b_jsonl(self):
+        from src.batch import run_batch
+
+        fp_in = io.StringIO('["Bob", "Alice"]\n\n["Bob", "Nobody"]\nnot json\n{"Bob": 1}\n')
+        fp_out = io.StringIO()
+        self.assertEqual(4, run_batch(fp_in, fp_out, data_src=self.data_src))
+        records = [json.loads(line) for line in fp_out.getvalue().splitlines()]
+        self.assertEqual([1, 3, 4, 5], [r["line"] for r in records])
+        self.assertEqual(["Bob", "Alice"], records[0]["villagers"])
+        self.assertEqual(1, records[0]["average_pairs"])
+        self.assertNotIn("pairs", records[0])
+        self.assertTrue(all("error" in r for r in records[1:]))
+
+    def test_c_csv(self):
+        from src.batch import score_islands, guess_input_format
+
+        self.assertEqual("csv", guess_input_format("islands.CSV"))
+        self.assertEqual("jsonl", guess_input_format("islands.jsonl"))
+        self.assertEqual("jsonl", guess_input_format(None))
+        records = [
+            json.loads(r) for r in score_islands(["Bob, Alice,\n", "Chow,Bree\n"], "csv", with_pairs=True,
+                                                 data_src=self.data_src)
+        ]
+        self.assertEqual([["Bob", "Alice"], ["Chow", "Bree"]], [r["villagers"] for r in records])
+        self.assertEqual(1, len(records[1]["pairs"]))
+        self.assertRaises(ValueError, list, score_islands([], "xml"))
+
+    def test_d_workers(self):
+        from src.batch import score_islands
+
+        ids = self.roster_matrix.villager_ids
+        lines = [json.dumps(ids[i:i + 10]) for i in range(0, 200, 7)] + ['["Nobody"]']
+        expected = list(score_islands(lines, data_src=self.data_src))
+        self.assertEqual(len(lines), len(expected))
+        self.assertEqual(expected, list(score_islands(lines, workers=2, chunk_size=3)))
+        self.assertEqual(sorted(expected), sorted(score_islands(lines, workers=2, ordered=False, chunk_size=3)))
+
+
+if __name__ == '__main__':
+    unittest.main()
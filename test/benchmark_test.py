@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+import unittest
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class BenchmarkTestCase(DebuggableTestCase):
+    def test_a_synthetic_roster(self):
+        from bench.synthetic_roster import generate_roster, write_roster
+        from src.data_reader import AcListerVillagerDataReader
+
+        self.assertEqual(generate_roster(50, seed=3), generate_roster(50, seed=3))
+        self.assertNotEqual(generate_roster(50, seed=3), generate_roster(50, seed=4))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            roster_loc = write_roster(os.path.join(tmp_dir, "roster.json"), 300, missing_ratio=0.1)
+            data_src = AcListerVillagerDataReader(roster_loc, use_snapshot=False)
+            villager_ids = data_src.get_all_villager_ids()
+            self.assertEqual(300, len(villager_ids))
+            villagers = data_src.get_many(villager_ids)
+            self.assertTrue(all(v.species and v.personality for v in villagers))
+            missing = sum(1 for v in villagers if v.birthday is None)
+            self.assertTrue(0 < missing < 100)
+
+    def test_b_run_and_compare(self):
+        from bench.run_benchmarks import Benchmark, run_benchmarks, compare_results
+
+        benchmarks = [
+            Benchmark("sum", {"n": 1000}, lambda: lambda: sum(range(1000)), 1000),
+            Benchmark("list", {}, lambda: lambda: list(range(10000)), 1),
+        ]
+        results = run_benchmarks(benchmarks, min_time=0.001, repeat=2)
+        self.assertEqual(["sum[n=1000]", "list"], [r["key"] for r in results["results"]])
+        for result in results["results"]:
+            self.assertGreater(result["best"], 0)
+            self.assertLessEqual(result["best"], result["median"])
+            self.assertGreaterEqual(result["number"], 1)
+        self.assertGreater(results["results"][1]["peak_memory"], 10000 * 8)
+
+        comparison = compare_results(results, results)
+        self.assertEqual([1.0, 1.0], [ratio for _, _, _, ratio in comparison])
+        self.assertRaises(ValueError, compare_results, dict(results, format_version=0), results)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import sys
+import unittest
+
+from src.cache import BoundedCache
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class BoundedCacheTestCase(DebuggableTestCase):
+    def test_a_lru(self):
+        cache = BoundedCache(2, "lru")
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(1, cache.get("a"))
+        cache.put("c", 3)
+        self.assertTrue("a" in cache)
+        self.assertFalse("b" in cache)
+        self.assertEqual(None, cache.get("b"))
+        self.assertEqual({"size": 2, "max_size": 2, "hits": 1, "misses": 1, "evictions": 1}, cache.stats())
+
+    def test_b_fifo(self):
+        cache = BoundedCache(2, "fifo")
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(1, cache.get("a"))
+        cache.put("c", 3)
+        self.assertFalse("a" in cache)
+        self.assertEqual(2, cache.get("b"))
+
+    def test_c_disabled_and_invalid(self):
+        cache = BoundedCache(0)
+        cache.put("a", 1)
+        self.assertEqual(0, len(cache))
+        self.assertEqual("default", cache.get("a", "default"))
+        self.assertRaises(ValueError, BoundedCache, 1, "random")
+        self.assertRaises(ValueError, BoundedCache, -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import itertools
+import random
+import sys
+import unittest
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class CliqueFinderTestCase(DebuggableTestCase):
+    @classmethod
+    def setUpClass(cls):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.compatibility_bitsets import CompatibilityBitsets
+        from src.compatibility_matrix import RosterCompatibilityMatrix
+        cls.roster_matrix = RosterCompatibilityMatrix(AcListerVillagerDataReader())
+        cls.bitsets = CompatibilityBitsets(roster_matrix=cls.roster_matrix)
+        cls.villager_ids = cls.roster_matrix.villager_ids
+
+    def is_clique(self, villagers, mode):
+        from src.data_model import Compatibility
+        for a, b in itertools.combinations(villagers, 2):
+            verdict = self.roster_matrix.get_verdict(a, b)
+            if verdict is None or (verdict != Compatibility.GOOD if mode == "good" else verdict == Compatibility.BAD):
+                return False
+        return all(self.roster_matrix.get_verdict(v, v) is not None for v in villagers)
+
+    def brute_force_maximal(self, pool, mode):
+        cliques = [
+            set(c) for size in range(1, len(pool) + 1) for c in itertools.combinations(pool, size)
+            if self.is_clique(c, mode)
+        ]
+        return [c for c in cliques if not any(c < other for other in cliques)]
+
+    def test_a_small_rosters(self):
+        from src.clique_finder import find_maximal_cliques, find_maximum_clique
+        rng = random.Random(7)
+        for mode in ["good", "not_bad"]:
+            for _ in range(6):
+                pool = rng.sample(self.villager_ids, 12)
+                excluded = [v for v in self.villager_ids if v not in pool]
+                expected = self.brute_force_maximal(pool, mode)
+
+                result = find_maximum_clique(self.bitsets, mode=mode, excluded=excluded)
+                self.assertTrue(result.complete)
+                self.assertTrue(self.is_clique(result.largest, mode))
+                self.assertEqual(max(len(c) for c in expected), len(result.largest))
+
+                result = find_maximal_cliques(self.bitsets, mode=mode, excluded=excluded, min_size=1)
+                self.assertTrue(result.complete)
+                self.assertEqual(sorted(sorted(c) for c in expected), sorted(sorted(c) for c in result.cliques))
+
+                largest = max(len(c) for c in expected)
+                result = find_maximal_cliques(self.bitsets, mode=mode, excluded=excluded)
+                self.assertEqual(sorted(sorted(c) for c in expected if len(c) == largest),
+                                 sorted(sorted(c) for c in result.cliques))
+
+    def test_b_pinned(self):
+        from src.clique_finder import find_maximal_cliques, find_maximum_clique
+        pool = self.villager_ids[:40] + ["Bob", "Zucker"]
+        excluded = [v for v in self.villager_ids if v not in pool]
+        unpinned = find_maximal_cliques(self.bitsets, excluded=excluded, min_size=1)
+        pinned = find_maximal_cliques(self.bitsets, pinned=["Bob", "Zucker"], excluded=excluded, min_size=1)
+        self.assertEqual(
+            sorted(sorted(c) for c in unpinned.cliques if "Bob" in c and "Zucker" in c),
+            sorted(sorted(c) for c in pinned.cliques)
+        )
+        for clique in pinned.cliques:
+            self.assertEqual(["Bob", "Zucker"], clique[:2])
+
+        result = find_maximum_clique(self.bitsets, pinned=["Bob", "Zucker"], excluded=excluded)
+        self.assertEqual(max(len(c) for c in pinned.cliques), len(result.largest))
+
+    def test_c_full_roster(self):
+        from src.clique_finder import find_maximal_cliques, find_maximum_clique
+        result = find_maximum_clique(self.bitsets)
+        self.assertTrue(result.complete)
+        self.assertTrue(self.is_clique(result.largest, "good"))
+        result_all = find_maximal_cliques(self.bitsets, limit=5)
+        for clique in result_all.cliques:
+            self.assertEqual(len(result.largest), len(clique))
+            self.assertTrue(self.is_clique(clique, "good"))
+
+        # Far too many groups to prove the largest one within the timeout, the best one so far is returned
+        result = find_maximum_clique(self.bitsets, mode="not_bad", timeout=0.5)
+        self.assertFalse(result.complete)
+        self.assertTrue(self.is_clique(result.largest, "not_bad"))
+        self.assertGreater(len(result.largest), 100)
+
+        result = find_maximal_cliques(self.bitsets, min_size=1, limit=3)
+        self.assertEqual(3, len(result.cliques))
+        self.assertFalse(result.complete)
+
+    def test_d_errors(self):
+        from src.clique_finder import find_maximum_clique
+        with self.assertRaises(ValueError):
+            find_maximum_clique(self.bitsets, mode="average")
+        with self.assertRaises(ValueError):
+            find_maximum_clique(self.bitsets, pinned=["Bob"], excluded=["Bob"])
+        with self.assertRaises(ValueError):
+            find_maximum_clique(self.bitsets, pinned=["Verdun"])
+        with self.assertRaises(ValueError):
+            find_maximum_clique(self.bitsets, pinned=["Nobody"])
+        bad_partner = self.bitsets.from_mask(self.bitsets.bad_mask(self.roster_matrix.get_ordinal("Bob")))[0]
+        with self.assertRaises(ValueError):
+            find_maximum_clique(self.bitsets, mode="not_bad", pinned=["Bob", bad_partner])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import random
+import sys
+import unittest
+
+from src.data_model import Compatibility
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class CompatibilityBitsetsTestCase(DebuggableTestCase):
+    @classmethod
+    def setUpClass(cls):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.compatibility_bitsets import CompatibilityBitsets
+        from src.compatibility_matrix import RosterCompatibilityMatrix
+        cls.data_src = AcListerVillagerDataReader()
+        cls.roster_matrix = RosterCompatibilityMatrix(cls.data_src)
+        cls.bitsets = CompatibilityBitsets(roster_matrix=cls.roster_matrix)
+        cls.villager_ids = cls.roster_matrix.villager_ids
+
+    def verdict(self, villager_a, villager_b):
+        from src.utils import calc_villager_compatibility, evaluate_compatibility
+        comp = calc_villager_compatibility(self.data_src.get_data_by_villager_id(villager_a),
+                                           self.data_src.get_data_by_villager_id(villager_b))
+        return None if comp is None else evaluate_compatibility(list(comp.values()))
+
+    def test_a_neighborhoods(self):
+        for villager_id in ["Bob", "Zucker", "Verdun"]:
+            ordinal = self.roster_matrix.get_ordinal(villager_id)
+            good = self.bitsets.from_mask(self.bitsets.good_mask(ordinal))
+            bad = self.bitsets.from_mask(self.bitsets.bad_mask(ordinal))
+            others = [v for v in self.villager_ids if v != villager_id]
+            self.assertEqual([v for v in others if self.verdict(villager_id, v) == Compatibility.GOOD], good)
+            self.assertEqual([v for v in others if self.verdict(villager_id, v) == Compatibility.BAD], bad)
+        self.assertFalse(self.bitsets.valid_mask & self.bitsets.to_mask(["Verdun"]))
+
+    def test_b_set_queries(self):
+        import itertools
+        rng = random.Random(3)
+        for _ in range(20):
+            island = rng.sample(self.villager_ids, rng.randint(2, 10))
+            verdicts = [self.verdict(a, b) for a, b in itertools.combinations(island, 2)]
+            self.assertEqual(verdicts.count(Compatibility.GOOD), self.bitsets.count_good_pairs(island))
+            self.assertEqual(verdicts.count(Compatibility.BAD), self.bitsets.count_bad_pairs(island))
+            self.assertEqual(Compatibility.BAD in verdicts, self.bitsets.has_bad_pair(island))
+
+        group = ["Bob", "Alice"]
+        self.assertEqual(
+            [v for v in self.villager_ids if all(self.verdict(g, v) == Compatibility.GOOD for g in group if g != v)
+             and v not in group],
+            self.bitsets.good_with_all(group)
+        )
+        self.assertEqual(
+            [v for v in self.villager_ids if v not in group and self.verdict("Bob", v) is not None and
+             all(self.verdict(g, v) != Compatibility.BAD for g in group)],
+            self.bitsets.not_bad_with_all(group)
+        )
+        candidates = self.villager_ids[:50]
+        self.assertEqual([v for v in self.bitsets.good_with_all(group) if v in candidates],
+                         self.bitsets.good_with_all(group, candidates))
+        self.assertRaises(ValueError, self.bitsets.count_good_pairs, ["Bob", "Nobody"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import sys
+import unittest
+
+from src.data_model import Compatibility
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class CompatibilityIndexTestCase(DebuggableTestCase):
+    @classmethod
+    def setUpClass(cls):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.compatibility_index import CompatibilityIndex
+        cls.data_src = AcListerVillagerDataReader()
+        cls.index = CompatibilityIndex(cls.data_src)
+
+    def scan(self, villager_ids, verdict):
+        from src.utils import calc_villager_compatibility, evaluate_compatibility
+        partners = []
+        for villager_id in sorted(self.data_src.get_all_villager_ids()):
+            if villager_id in villager_ids:
+                continue
+            other = self.data_src.get_data_by_villager_id(villager_id)
+            for target in villager_ids:
+                comp = calc_villager_compatibility(self.data_src.get_data_by_villager_id(target), other)
+                if not comp or evaluate_compatibility(list(comp.values())) != verdict:
+                    break
+            else:
+                partners.append(villager_id)
+        return partners
+
+    def test_a_single_villager(self):
+        for villager_id in ["Bob", "Zucker", "Audie"]:
+            for verdict in Compatibility:
+                self.assertEqual(self.scan([villager_id], verdict),
+                                 list(self.index.get_partners(villager_id, verdict)))
+        self.assertEqual(self.index.get_partners("Bob", Compatibility.BAD), self.index.get_partners("Bob", "bad"))
+        self.assertEqual((), self.index.get_partners("Verdun", "good"))
+
+    def test_b_group(self):
+        for group in [["Bob", "Alice"], ["Bob", "Chow", "Zucker"], ["Audie", "Audie"]]:
+            for verdict in Compatibility:
+                self.assertEqual(self.scan(group, verdict), self.index.get_group_partners(group, verdict))
+
+    def test_c_pagination(self):
+        partners = list(self.index.get_partners("Bob", "average"))
+        pages = []
+        offset = 0
+        while offset is not None:
+            page = self.index.query("Bob", "average", offset, 7)
+            self.assertEqual(len(partners), page.total)
+            pages.extend(page.villagers)
+            offset = page.next_offset
+        self.assertEqual(partners, pages)
+        self.assertEqual(partners, self.index.query(["Bob"], "average").villagers)
+        self.assertEqual([], self.index.query("Bob", "average", len(partners) + 10, 5).villagers)
+
+    def test_d_errors(self):
+        self.assertRaises(ValueError, self.index.get_partners, "qwertyQWERTY", "good")
+        self.assertRaises(ValueError, self.index.get_partners, "Bob", "great")
+        self.assertRaises(ValueError, self.index.get_group_partners, [], "good")
+        self.assertRaises(ValueError, self.index.query, "Bob", "good", -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import sys
+import unittest
+
+from src.data_model import CompatibilityScoreMark, Compatibility
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class RosterCompatibilityMatrixTestCase(DebuggableTestCase):
+    @classmethod
+    def setUpClass(cls):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.compatibility_matrix import RosterCompatibilityMatrix
+        cls.data_src = AcListerVillagerDataReader()
+        cls.roster_matrix = RosterCompatibilityMatrix(cls.data_src)
+
+    def test_a_pack_unpack(self):
+        from src.compatibility_matrix import pack_compatibility, unpack_compatibility, unpack_verdict, NO_DATA_CODE
+        marks = list(CompatibilityScoreMark)
+        for species in marks:
+            for personality in marks:
+                for star_sign in marks:
+                    comp = {"personality": personality, "species": species, "star_sign": star_sign}
+                    code = pack_compatibility(comp)
+                    self.assertNotEqual(NO_DATA_CODE, code)
+                    self.assertEqual(comp, unpack_compatibility(code))
+                    self.assertIsInstance(unpack_verdict(code), Compatibility)
+        self.assertEqual(NO_DATA_CODE, pack_compatibility(None))
+        self.assertEqual(None, unpack_compatibility(NO_DATA_CODE))
+        self.assertEqual(None, unpack_verdict(NO_DATA_CODE))
+
+    def test_b_same_as_calculate_compatibility_matrix(self):
+        from src.utils import calculate_compatibility_matrix
+        villagers = self.data_src.get_all_villager_ids()[::11] + ["Verdun", "Zucker", "Audie"]
+        expected = calculate_compatibility_matrix(villagers, self.data_src)
+        self.assertEqual(expected, self.roster_matrix.sub_matrix(villagers))
+        self.assertEqual(
+            expected, calculate_compatibility_matrix(villagers, self.data_src, roster_matrix=self.roster_matrix)
+        )
+
+    def test_c_pair_lookup(self):
+        from src.utils import calc_villager_compatibility, evaluate_compatibility
+        for vid_a, vid_b in [("Zucker", "Vivian"), ("Audie", "Jakey"), ("Megan", "Dom"), ("Zucker", "Zucker")]:
+            expected = calc_villager_compatibility(
+                self.data_src.get_data_by_villager_id(vid_a), self.data_src.get_data_by_villager_id(vid_b)
+            )
+            self.assertEqual(expected, self.roster_matrix.get_compatibility(vid_a, vid_b))
+            self.assertEqual(evaluate_compatibility(list(expected.values())),
+                             self.roster_matrix.get_verdict(vid_a, vid_b))
+        self.assertEqual(None, self.roster_matrix.get_compatibility("Zucker", "Verdun"))
+        self.assertEqual(None, self.roster_matrix.get_verdict("Verdun", "Verdun"))
+
+    def test_d_invalid_villager_id(self):
+        self.assertFalse("qwertyQWERTY" in self.roster_matrix)
+        self.assertRaises(ValueError, self.roster_matrix.get_compatibility, "Zucker", "qwertyQWERTY")
+        self.assertRaises(ValueError, self.roster_matrix.sub_matrix, ["Zucker", "qwertyQWERTY"])
+        self.assertEqual([self.roster_matrix.get_ordinal("Zucker"), self.roster_matrix.get_ordinal("Bob")],
+                         self.roster_matrix.get_ordinals(["Zucker", "Bob"]))
+        with self.assertRaisesRegex(ValueError, "2th villager"):
+            self.roster_matrix.get_ordinals(["Zucker", "qwertyQWERTY"])
+
+    def test_e_symmetry_and_triangular_storage(self):
+        from src.compatibility_matrix import RosterCompatibilityMatrix
+        from src.utils import calculate_compatibility_matrix, iter_compatibility_matrix
+        villagers = self.data_src.get_all_villager_ids()[::13] + ["Verdun", "Zucker"]
+        # Every cell computed, not mirrored
+        full = list(iter_compatibility_matrix(villagers, self.data_src))
+        self.assertEqual(full, calculate_compatibility_matrix(villagers, self.data_src))
+        for i in range(len(villagers)):
+            for j in range(len(villagers)):
+                self.assertEqual(full[i][j], full[j][i])
+        # The mirrored cells don't share their dict
+        mirrored = calculate_compatibility_matrix(villagers, self.data_src)
+        mirrored[0][1]["species"] = None
+        self.assertEqual(full[1][0], mirrored[1][0])
+
+        triangular = RosterCompatibilityMatrix(self.data_src, storage="triangular")
+        n = len(self.roster_matrix)
+        self.assertEqual(n * (n + 1) // 2, triangular.nbytes)
+        self.assertEqual(n * n, self.roster_matrix.nbytes)
+        self.assertEqual(full, triangular.sub_matrix(villagers))
+        for villager_id in villagers:
+            self.assertEqual(bytes(self.roster_matrix.get_row_codes(villager_id)),
+                             bytes(triangular.get_row_codes(villager_id)))
+        self.assertRaises(ValueError, RosterCompatibilityMatrix, self.data_src, storage="sparse")
+
+    def test_f_unique_pairs(self):
+        from src.utils import calculate_compatibility_matrix, iter_unique_pairs
+        from src.compatibility_matrix import unpack_compatibility
+        villagers = ["Bob", "Alice", "Verdun", "Chow", "Zucker"]
+        matrix = calculate_compatibility_matrix(villagers, self.data_src)
+        expected = [(villagers[i], villagers[j], matrix[i][j])
+                    for i in range(len(villagers)) for j in range(i + 1, len(villagers))]
+        self.assertEqual(len(villagers) * (len(villagers) - 1) // 2, len(expected))
+        self.assertEqual(expected, list(iter_unique_pairs(villagers, self.data_src)))
+        self.assertEqual(expected, list(iter_unique_pairs(villagers, self.data_src, self.roster_matrix)))
+        self.assertEqual(expected, [(a, b, unpack_compatibility(code))
+                                    for a, b, code in self.roster_matrix.iter_unique_pairs(villagers)])
+
+        with_diagonal = list(iter_unique_pairs(villagers, self.data_src, include_diagonal=True))
+        self.assertEqual(len(expected) + len(villagers), len(with_diagonal))
+        self.assertEqual([(v, v, matrix[i][i]) for i, v in enumerate(villagers)],
+                         [p for p in with_diagonal if p[0] == p[1]])
+        n = len(self.roster_matrix)
+        self.assertEqual(n * (n - 1) // 2, sum(1 for _ in self.roster_matrix.iter_unique_pairs()))
+        self.assertRaises(ValueError, next, iter_unique_pairs(["Bob", "Nobody"], self.data_src))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import contextlib
+import io
+import os
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix domain sockets are not available")
+class DaemonTestCase(DebuggableTestCase):
+    @classmethod
+    def setUpClass(cls):
+        from src.daemon import CompatibilityDaemon
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.socket_path = os.path.join(cls.tmp_dir.name, "daemon.sock")
+        cls.daemon = CompatibilityDaemon(cls.socket_path)
+        cls.daemon_thread = threading.Thread(target=cls.daemon.serve_forever)
+        cls.daemon_thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        from src.daemon import stop_daemon
+        stop_daemon(cls.socket_path)
+        cls.daemon_thread.join()
+        cls.daemon.server_close()
+        cls.tmp_dir.cleanup()
+
+    def render_locally(self, villager):
+        from src.compatibility_caculator import compatibility_calculator
+        from src.data_model import set_console_escape_support
+
+        output = io.StringIO()
+        set_console_escape_support(False)
+        try:
+            with contextlib.redirect_stdout(output):
+                compatibility_calculator(villager, self.daemon.data_src)
+        except ValueError as ve:
+            return str(ve), output.getvalue()
+        finally:
+            set_console_escape_support(None)
+        return None, output.getvalue()
+
+    def test_a_render(self):
+        from src.daemon_client import send_request
+
+        self.assertEqual((None, "pong\n"), send_request("ping", socket_path=self.socket_path))
+        for villager in [["Bob", "Alice", "Chow"], ["Renée", "Bob"], ["Bob", "Nobody"]]:
+            self.assertEqual(self.render_locally(villager),
+                             send_request("render", ["0"] + villager, socket_path=self.socket_path))
+        error, output = send_request("render", ["1", "Bob", "Alice"], socket_path=self.socket_path)
+        self.assertIsNone(error)
+        self.assertIn("\x1b[", output)
+        self.assertEqual("Unknown daemon command fly", send_request("fly", socket_path=self.socket_path)[0])
+
+    def test_b_already_running(self):
+        from src.daemon import CompatibilityDaemon
+        from src.daemon_client import forward_compatibility_calculator, send_request
+
+        self.assertRaises(ValueError, CompatibilityDaemon, self.socket_path)
+        missing_path = os.path.join(self.tmp_dir.name, "missing.sock")
+        self.assertIsNone(send_request("ping", socket_path=missing_path))
+        self.assertFalse(forward_compatibility_calculator(["Bob"], missing_path))
+
+
+class NoUnixSocketTestCase(DebuggableTestCase):
+    def test_a_not_forwarded(self):
+        import types
+        from unittest import mock
+        import src.daemon_client
+        from src.daemon import run_daemon
+
+        # Windows has neither AF_UNIX nor os.getuid
+        no_unix_os = types.SimpleNamespace(environ={}, path=os.path)
+        no_unix_socket = types.SimpleNamespace(socket=socket.socket, AF_INET=socket.AF_INET)
+        with mock.patch.object(src.daemon_client, "os", no_unix_os), \
+                mock.patch.object(src.daemon_client, "socket", no_unix_socket):
+            self.assertFalse(src.daemon_client.daemon_supported())
+            self.assertTrue(src.daemon_client.default_socket_path().endswith("ac-villager-compatibility.sock"))
+            self.assertIsNone(src.daemon_client.send_request("ping"))
+            self.assertFalse(src.daemon_client.forward_compatibility_calculator(["Bob"]))
+            self.assertRaises(ValueError, run_daemon)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -178,6 +178,52 @@ class AcListerVillagerDataReaderTestCase(DebuggableTestCase):
         self.assertEqual(None, villager_reader.get_data_by_villager_id("qwertyQWERTY"))
         self.assertEqual(None, villager_reader.get_raw_data_by_villager_id("qwertyQWERTY"))
 
+    def test_e_villager_cache(self):
+        villager_reader = AcListerVillagerDataReader(cache_size=2)
+        ace = villager_reader.get_data_by_villager_id("Ace")
+        self.assertIs(ace, villager_reader.get_data_by_villager_id("Ace"))
+        self.assertEqual(1, villager_reader.villager_cache.hits)
+        self.assertEqual(1, villager_reader.villager_cache.misses)
+
+        villager_reader.get_data_by_villager_id("Jakey")
+        villager_reader.get_data_by_villager_id("Candi")
+        self.assertEqual(1, villager_reader.villager_cache.evictions)
+        self.assertIsNot(ace, villager_reader.get_data_by_villager_id("Ace"))
+        self.assertEqual(ace, villager_reader.get_data_by_villager_id("Ace"))
+
+        uncached_reader = AcListerVillagerDataReader(cache_size=0)
+        self.assertIsNot(uncached_reader.get_data_by_villager_id("Ace"), uncached_reader.get_data_by_villager_id("Ace"))
+        self.assertRaises(ValueError, AcListerVillagerDataReader, cache_policy="random")
+
+    def test_f_get_many(self):
+        villager_reader = AcListerVillagerDataReader()
+        villagers = villager_reader.get_many(["Ace", "qwertyQWERTY", "Verdun"])
+        self.assertEqual(3, len(villagers))
+        self.assertEqual("Ace", villagers[0].villager_id)
+        self.assertEqual(None, villagers[1])
+        self.assertEqual(None, villagers[2].birthday)
+
+
+    def test_g_shared_villagers_read_only(self):
+        import pickle
+        for villager_reader in [AcListerVillagerDataReader(), AcListerVillagerDataReader(use_snapshot=False)]:
+            bob = villager_reader.get_data_by_villager_id("Bob")
+            with self.assertRaises(AttributeError):
+                bob._species = None
+            with self.assertRaises(AttributeError):
+                bob.parse_species("Dog")
+            self.assertEqual(Species.Cat, villager_reader.get_data_by_villager_id("Bob").species)
+            self.assertEqual(bob, pickle.loads(pickle.dumps(bob)))
+
+    def test_h_preloaded_raw_data(self):
+        raw_data = AcListerVillagerDataReader(use_snapshot=False).raw_data
+        villager_reader = AcListerVillagerDataReader(aclister_loc="missing.json", raw_data=raw_data[:3])
+        self.assertFalse(villager_reader.from_snapshot)
+        self.assertEqual([v["id"] for v in raw_data[:3]], villager_reader.get_all_villager_ids())
+        self.assertEqual(raw_data[1], villager_reader.get_raw_data_by_villager_id(raw_data[1]["id"]))
+        self.assertEqual(raw_data[2]["name"], villager_reader.get_data_by_villager_id(raw_data[2]["id"]).name)
+        self.assertIsNone(villager_reader.get_data_by_villager_id("Bob"))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,79 @@
+import io
+import re
+import sys
+import unittest
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class GridRendererTestCase(DebuggableTestCase):
+    @classmethod
+    def setUpClass(cls):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.compatibility_matrix import RosterCompatibilityMatrix
+        cls.data_src = AcListerVillagerDataReader()
+        cls.roster_matrix = RosterCompatibilityMatrix(cls.data_src)
+
+    def render(self, villagers, roster_matrix=None, colored=False):
+        from src.grid_renderer import print_compatibility_grid
+        out = io.StringIO()
+        print_compatibility_grid(villagers, self.data_src, roster_matrix, colored, out)
+        return out.getvalue()
+
+    def test_a_same_as_tabulate(self):
+        from tabulate import tabulate
+        from src.utils import calculate_compatibility_matrix, evaluate_compatibility
+
+        # Every column holds an Average cell, tabulate then picks the same widths
+        villagers = ["Bob", "Alice", "Agent S"]
+        comp_matrix = calculate_compatibility_matrix(villagers, self.data_src)
+        content = [
+            [v] + ["".join(m.get_text() for m in [c["species"], c["personality"], c["star_sign"]]) + " | " +
+                   evaluate_compatibility(list(c.values())).get_text() for c in row]
+            for v, row in zip(villagers, comp_matrix)
+        ]
+        expected = tabulate(content, headers=[""] + villagers, tablefmt="fancy_grid") + "\n"
+        self.assertEqual(expected, self.render(villagers))
+        self.assertEqual(expected, self.render(villagers, self.roster_matrix))
+
+    def test_b_no_data_and_widths(self):
+        from src.grid_renderer import CELL_WIDTH
+
+        villagers = ["Bob", "Verdun", "Agent S"]
+        lines = self.render(villagers).splitlines()
+        self.assertEqual(3 * 2 + 3, len(lines))
+        self.assertEqual(1, len(set(len(line) for line in lines)))
+        self.assertEqual(len("│ Agent S │") + 3 * (CELL_WIDTH + 3), len(lines[0]))
+        verdun_row = lines[5]
+        self.assertTrue(verdun_row.startswith("│ Verdun  │ N/A "))
+        self.assertEqual(3, verdun_row.count("N/A"))
+        self.assertEqual(1, lines[3].count("N/A"))
+        self.assertEqual(self.render(villagers), self.render(villagers, self.roster_matrix))
+
+    def test_c_colored(self):
+        villagers = ["Bob", "Alice", "Chow"]
+        colored = self.render(villagers, colored=True)
+        self.assertIn("\x1b[", colored)
+        self.assertEqual(self.render(villagers), re.sub("\x1b\\[[0-9;]*m", "", colored))
+
+    def test_d_unknown_villager(self):
+        out = io.StringIO()
+        from src.grid_renderer import print_compatibility_grid
+        with self.assertRaises(ValueError):
+            print_compatibility_grid(["Bob", "Nobody"], self.data_src, out=out)
+        self.assertEqual("", out.getvalue())
+        self.assertRaises(ValueError, print_compatibility_grid, ["Nobody"], self.data_src, self.roster_matrix,
+                          False, out)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import http.client
+import json
+import sys
+import threading
+import unittest
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class HttpApiTestCase(DebuggableTestCase):
+    @classmethod
+    def setUpClass(cls):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.http_api import CompatibilityApi, CompatibilityApiServer
+        cls.data_src = AcListerVillagerDataReader()
+        cls.api = CompatibilityApi(cls.data_src, cache_size=4)
+        cls.server = CompatibilityApiServer(cls.api, port=0, quiet=True)
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever)
+        cls.server_thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.server_thread.join()
+
+    def test_a_handle(self):
+        from src.utils import calculate_compatibility_matrix
+
+        status, villager = self.api.handle("GET", "/villagers/Bob")
+        self.assertEqual(200, status)
+        self.assertEqual({"id": "Bob", "name": "Bob", "species": "Cat", "personality": "Lazy",
+                          "birthday": [1, 1], "star_sign": "Capricorn"},
+                         {k: villager[k] for k in ["id", "name", "species", "personality", "birthday", "star_sign"]})
+        self.assertEqual(404, self.api.handle("GET", "/villagers/Nobody")[0])
+        self.assertEqual(404, self.api.handle("GET", "/nowhere")[0])
+        self.assertIn("Bob", self.api.handle("GET", "/villagers")[1])
+
+        status, pair = self.api.handle("GET", "/compatibility/Bob/Alice")
+        self.assertEqual(200, status)
+        self.assertEqual({"species": "CLOVER", "personality": "CROSS", "star_sign": "DIAMOND", "verdict": "AVERAGE"},
+                         pair["compatibility"])
+        self.assertEqual(None, self.api.handle("GET", "/compatibility/Bob/Verdun")[1]["compatibility"])
+
+        island = ["Chow", "Alice", "Verdun", "Bob"]
+        status, report = self.api.handle("GET", "/island?villagers=" + ",".join(island))
+        self.assertEqual(200, status)
+        self.assertEqual(island, report["villagers"])
+        expected = calculate_compatibility_matrix(island, self.data_src)
+        for i in range(len(island)):
+            for j in range(len(island)):
+                cell = report["matrix"][i][j]
+                if expected[i][j] is None:
+                    self.assertIsNone(cell)
+                else:
+                    self.assertEqual({k: m.name for k, m in expected[i][j].items()},
+                                     {k: cell[k] for k in ["species", "personality", "star_sign"]})
+        self.assertEqual(3, report["no_data_pairs"])
+
+        self.assertEqual(400, self.api.handle("POST", "/island", b"{")[0])
+        self.assertEqual(400, self.api.handle("POST", "/island", b"[]")[0])
+        self.assertEqual(404, self.api.handle("POST", "/island", b'["Bob", "Nobody"]')[0])
+
+    def test_b_recommendations(self):
+        from src.recommendations import recommend
+        status, report = self.api.handle("GET", "/recommendations?villagers=Bob,Alice&k=3")
+        self.assertEqual(200, status)
+        self.assertEqual(recommend(self.api._roster_matrix, ["Bob", "Alice"], 3), report)
+        self.assertEqual(3, len(report["candidates"]))
+        self.assertEqual(400, self.api.handle("GET", "/recommendations?villagers=Bob,Bob")[0])
+        self.assertEqual(400, self.api.handle("GET", "/recommendations?villagers=Bob&k=x")[0])
+        self.assertEqual(404, self.api.handle("GET", "/recommendations?villagers=Nobody")[0])
+
+    def test_c_cache_canonical_key(self):
+        cache = self.api.island_cache
+        hits = cache.hits
+        first = self.api.get_island(["Bree", "Felicity", "Bob"])
+        second = self.api.get_island(["Bob", "Bree", "Felicity"])
+        self.assertEqual(hits + 1, cache.hits)
+        self.assertEqual(["Bob", "Bree", "Felicity"], second["villagers"])
+        self.assertEqual(first["matrix"][2][0], second["matrix"][0][1])
+        self.assertEqual(first["good_pairs"], second["good_pairs"])
+
+    def test_b_partners(self):
+        from src.utils import calc_villager_compatibility, evaluate_compatibility
+        bob = self.data_src.get_data_by_villager_id("Bob")
+        expected = []
+        for villager_id in sorted(self.data_src.get_all_villager_ids()):
+            comp = calc_villager_compatibility(bob, self.data_src.get_data_by_villager_id(villager_id))
+            if villager_id != "Bob" and comp and evaluate_compatibility(list(comp.values())).name == "GOOD":
+                expected.append(villager_id)
+
+        status, page = self.api.handle("GET", "/partners?villagers=Bob&verdict=good&limit=5")
+        self.assertEqual(200, status)
+        self.assertEqual(expected[:5], page["partners"])
+        self.assertEqual(len(expected), page["total"])
+        self.assertEqual(5, page["next_offset"])
+        status, page = self.api.handle("GET", "/partners?villagers=Bob&offset=5&limit=1000")
+        self.assertEqual(expected[5:], page["partners"])
+        self.assertIsNone(page["next_offset"])
+
+        self.assertEqual(400, self.api.handle("GET", "/partners?villagers=Bob&verdict=great")[0])
+        self.assertEqual(400, self.api.handle("GET", "/partners?villagers=Bob&limit=x")[0])
+        self.assertEqual(400, self.api.handle("GET", "/partners")[0])
+        self.assertEqual(404, self.api.handle("GET", "/partners?villagers=Nobody")[0])
+
+    def test_d_keep_alive(self):
+        conn = http.client.HTTPConnection(*self.server.server_address[:2])
+        try:
+            conn.request("GET", "/villagers/Bob")
+            response = conn.getresponse()
+            self.assertEqual(200, response.status)
+            self.assertEqual("Bob", json.loads(response.read().decode("utf-8"))["id"])
+            sock = conn.sock
+            conn.request("POST", "/island", body=json.dumps(["Bob", "Alice"]),
+                         headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            self.assertEqual(200, response.status)
+            self.assertEqual(1, json.loads(response.read().decode("utf-8"))["average_pairs"])
+            self.assertIs(sock, conn.sock)
+            conn.request("GET", "/villagers/Nobody")
+            response = conn.getresponse()
+            self.assertEqual(404, response.status)
+            self.assertIn("error", json.loads(response.read().decode("utf-8")))
+        finally:
+            conn.close()
+
+    def test_e_invalid_content_length(self):
+        for length in ["abc", "-5"]:
+            conn = http.client.HTTPConnection(*self.server.server_address[:2])
+            try:
+                conn.putrequest("POST", "/island")
+                conn.putheader("Content-Length", length)
+                conn.endheaders()
+                response = conn.getresponse()
+                self.assertEqual(400, response.status)
+                self.assertIn("error", json.loads(response.read().decode("utf-8")))
+            finally:
+                conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
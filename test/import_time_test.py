@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+import unittest
+
+# Generous enough for slow CI machines, a module doing real work at import time blows well past it
+IMPORT_TIME_BUDGET_US = 150000
+
+_PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir)
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+def run_python(code, *options):
+    return subprocess.run(
+        [sys.executable] + list(options) + ["-c", code], cwd=_PROJECT_DIR, check=True,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True
+    )
+
+
+class ImportTimeTestCase(DebuggableTestCase):
+    def test_a_import_time_budget(self):
+        for module in ["src.compatibility_caculator", "src.utils", "src.data_model"]:
+            # Best of three, to keep the budget check robust against a busy machine
+            cumulative_us = []
+            for _ in range(3):
+                stderr = run_python("import {}".format(module), "-X", "importtime").stderr
+                for line in stderr.splitlines():
+                    fields = [f.strip() for f in line.split("|")]
+                    if len(fields) == 3 and fields[2] == module:
+                        cumulative_us.append(int(fields[1]))
+            self.assertTrue(cumulative_us)
+            self.assertLess(min(cumulative_us), IMPORT_TIME_BUDGET_US, "{} imports too slowly".format(module))
+
+    def test_b_deferred_work(self):
+        stdout = run_python(
+            "import sys\n"
+            "import src.compatibility_caculator\n"
+            "import src.utils, src.data_model\n"
+            "print('tabulate' in sys.modules, 'platform' in sys.modules,\n"
+            "      bool(src.utils._personality_comp_score_matrix), src.data_model._console_escape_support)\n"
+        ).stdout
+        self.assertEqual("False False False None", stdout.strip())
+
+    def test_c_loaded_on_first_use(self):
+        stdout = run_python(
+            "import sys\n"
+            "from src.data_model import Personality, CompatibilityScoreMark, CONSOLE_ESCAPE_SUPPORT\n"
+            "from src.utils import calculate_compatibility_score_by_personality\n"
+            "print(calculate_compatibility_score_by_personality(Personality.Uchi, Personality.Uchi).name,\n"
+            "      str(CompatibilityScoreMark.HEART), CONSOLE_ESCAPE_SUPPORT)\n"
+        ).stdout
+        self.assertEqual("HEART ♥ False", stdout.strip())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import itertools
+import sys
+import unittest
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class IslandOptimizerTestCase(DebuggableTestCase):
+    @classmethod
+    def setUpClass(cls):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.compatibility_matrix import RosterCompatibilityMatrix
+        cls.data_src = AcListerVillagerDataReader()
+        cls.roster_matrix = RosterCompatibilityMatrix(cls.data_src)
+        cls.all_villagers = cls.data_src.get_all_villager_ids()
+
+    def find(self, **kwargs):
+        from src.island_optimizer import find_best_island
+        return find_best_island(self.data_src, roster_matrix=self.roster_matrix, **kwargs)
+
+    def test_a_same_as_brute_force(self):
+        from src.island_optimizer import IslandObjective
+        pool = self.all_villagers[3::29] + ["Bob", "Alice", "Verdun"]
+        excluded = [v for v in self.all_villagers if v not in pool]
+        for minimize_bad in (False, True):
+            objective = IslandObjective(self.roster_matrix, 5, minimize_bad)
+
+            def score(island):
+                good, bad = objective.count_pairs(list(island))
+                return (good, -bad) if minimize_bad else good
+
+            result = self.find(island_size=5, excluded=excluded, minimize_bad=minimize_bad)
+            self.assertTrue(result.optimal)
+            self.assertEqual(5, len(result.villagers))
+            self.assertTrue(set(result.villagers).issubset(pool))
+            self.assertEqual(max(score(c) for c in itertools.combinations(pool, 5)), score(result.villagers))
+            self.assertEqual(objective.count_pairs(result.villagers), (result.good_pairs, result.bad_pairs))
+
+    def test_b_required_and_excluded(self):
+        result = self.find(required=["Bob", "Alice"], excluded=["Charlise"], minimize_bad=True)
+        self.assertEqual(10, len(result.villagers))
+        self.assertEqual(10, len(set(result.villagers)))
+        self.assertEqual(["Bob", "Alice"], result.villagers[:2])
+        self.assertFalse("Charlise" in result.villagers)
+
+    def test_c_parallel_same_score(self):
+        sequential = self.find(required=["Bob", "Alice"], minimize_bad=True)
+        parallel = self.find(required=["Bob", "Alice"], minimize_bad=True, workers=2)
+        self.assertTrue(sequential.optimal)
+        self.assertTrue(parallel.optimal)
+        self.assertEqual((sequential.good_pairs, sequential.bad_pairs), (parallel.good_pairs, parallel.bad_pairs))
+
+    def test_d_invalid_arguments(self):
+        self.assertRaises(ValueError, self.find, required=["qwertyQWERTY"])
+        self.assertRaises(ValueError, self.find, required=["Bob"], excluded=["Bob"])
+        self.assertRaises(ValueError, self.find, island_size=2, required=["Bob", "Alice", "Chow"])
+        self.assertRaises(ValueError, self.find, island_size=3, excluded=self.all_villagers[2:])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import sys
+import unittest
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class IslandSearchTestCase(DebuggableTestCase):
+    @classmethod
+    def setUpClass(cls):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.compatibility_matrix import RosterCompatibilityMatrix
+        cls.data_src = AcListerVillagerDataReader()
+        cls.roster_matrix = RosterCompatibilityMatrix(cls.data_src)
+
+    def search(self, **kwargs):
+        from src.island_search import search_island
+        return search_island(self.data_src, roster_matrix=self.roster_matrix, **kwargs)
+
+    def test_a_deterministic_with_seed(self):
+        kwargs = dict(required=["Bob", "Alice"], minimize_bad=True, time_budget=None, max_iterations=3000, chains=2)
+        r1 = self.search(seed=7, **kwargs)
+        r2 = self.search(seed=7, **kwargs)
+        self.assertEqual(r1.villagers, r2.villagers)
+        self.assertEqual(6000, r1.iterations)
+        self.assertEqual(7, r1.seed)
+
+    def test_b_island_is_consistent(self):
+        from src.island_optimizer import IslandObjective
+        result = self.search(required=["Bob", "Verdun"], excluded=["Alice"], time_budget=0.1)
+        self.assertEqual(10, len(set(result.villagers)))
+        self.assertEqual(["Bob", "Verdun"], result.villagers[:2])
+        self.assertFalse("Alice" in result.villagers)
+        self.assertEqual(
+            IslandObjective(self.roster_matrix).count_pairs(result.villagers), (result.good_pairs, result.bad_pairs)
+        )
+
+    def test_c_reaches_exact_optimum_on_small_pool(self):
+        from src.island_optimizer import find_best_island
+        all_villagers = self.data_src.get_all_villager_ids()
+        excluded = [v for v in all_villagers if v not in all_villagers[::20]]
+        exact = find_best_island(self.data_src, island_size=5, excluded=excluded, roster_matrix=self.roster_matrix)
+        found = self.search(island_size=5, excluded=excluded, time_budget=None, max_iterations=5000, chains=2)
+        self.assertEqual(exact.good_pairs, found.good_pairs)
+
+    def test_d_progress_reports(self):
+        reports = []
+        result = self.search(time_budget=None, max_iterations=2000, progress=reports.append)
+        self.assertTrue(reports)
+        self.assertEqual(result.good_pairs, max(r.good_pairs for r in reports))
+        self.assertRaises(ValueError, self.search, time_budget=None)
+
+
+if __name__ == '__main__':
+    unittest.main()
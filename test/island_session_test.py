@@ -0,0 +1,117 @@
+import random
+import sys
+import unittest
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class IslandSessionTestCase(DebuggableTestCase):
+    @classmethod
+    def setUpClass(cls):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.compatibility_matrix import RosterCompatibilityMatrix
+        cls.data_src = AcListerVillagerDataReader()
+        cls.roster_matrix = RosterCompatibilityMatrix(cls.data_src)
+
+    def assertSameAsReport(self, session):
+        from src.island_report import island_report
+        expected = island_report(self.roster_matrix, session.villagers, with_pairs=True)
+        report = session.report(with_pairs=True)
+        tallies = report.pop("villager_tallies")
+        self.assertEqual(expected, report)
+
+        for villager_id in session.villagers:
+            others = [v for v in session.villagers if v != villager_id]
+            expected_tally = {"good_pairs": 0, "average_pairs": 0, "bad_pairs": 0, "no_data_pairs": 0}
+            for other_id in others:
+                verdict = self.roster_matrix.get_verdict(villager_id, other_id)
+                key = "no_data_pairs" if verdict is None else verdict.name.lower() + "_pairs"
+                expected_tally[key] += 1
+            self.assertEqual(expected_tally, tallies[villager_id])
+            self.assertEqual(expected_tally, session.villager_tally(villager_id))
+
+    def test_a_incremental_updates(self):
+        from src.island_session import IslandSession
+        island = ["Bob", "Alice", "Verdun", "Chow", "Zucker"]
+        session = IslandSession(self.data_src, island)
+        self.assertEqual(island, session.villagers)
+        self.assertSameAsReport(session)
+
+        session.remove("Alice")
+        self.assertEqual(["Bob", "Verdun", "Chow", "Zucker"], session.villagers)
+        self.assertSameAsReport(session)
+
+        session.swap("Verdun", "Audie")
+        self.assertEqual(["Bob", "Audie", "Chow", "Zucker"], session.villagers)
+        self.assertSameAsReport(session)
+
+        session.add("Alice")
+        self.assertEqual(["Bob", "Audie", "Chow", "Zucker", "Alice"], session.villagers)
+        self.assertSameAsReport(session)
+        self.assertEqual(self.roster_matrix.get_compatibility("Zucker", "Audie"),
+                         session.get_compatibility("Zucker", "Audie"))
+        self.assertEqual(self.roster_matrix.get_verdict("Bob", "Bob"), session.get_verdict("Bob", "Bob"))
+
+    def test_b_random_edits(self):
+        from src.island_session import IslandSession
+        rng = random.Random(7)
+        roster = self.roster_matrix.villager_ids
+        python_session = IslandSession(self.data_src)
+        matrix_session = IslandSession(self.data_src, roster_matrix=self.roster_matrix)
+        for _ in range(200):
+            island = python_session.villagers
+            action = rng.random()
+            if len(island) < 3 or (action < 0.4 and len(island) < 10):
+                villager_id = rng.choice([v for v in roster if v not in island])
+                python_session.add(villager_id)
+                matrix_session.add(villager_id)
+            elif action < 0.7:
+                villager_id = rng.choice(island)
+                python_session.remove(villager_id)
+                matrix_session.remove(villager_id)
+            else:
+                villager_out = rng.choice(island)
+                villager_in = rng.choice([v for v in roster if v not in island])
+                python_session.swap(villager_out, villager_in)
+                matrix_session.swap(villager_out, villager_in)
+            self.assertEqual(python_session.report(with_pairs=True), matrix_session.report(with_pairs=True))
+        self.assertSameAsReport(python_session)
+
+    def test_c_errors(self):
+        from src.island_session import IslandSession
+        session = IslandSession(self.data_src, ["Bob", "Alice"], max_size=3)
+        self.assertRaises(ValueError, session.add, "Bob")
+        self.assertRaises(ValueError, session.add, "qwertyQWERTY")
+        self.assertRaises(ValueError, session.remove, "Chow")
+        self.assertRaises(ValueError, session.swap, "Chow", "Zucker")
+        self.assertRaises(ValueError, session.swap, "Bob", "Alice")
+        self.assertRaises(ValueError, session.swap, "Bob", "qwertyQWERTY")
+        # A failed swap leaves the island as it was
+        self.assertEqual(["Bob", "Alice"], session.villagers)
+        self.assertEqual(1, session.good_pairs + session.average_pairs + session.bad_pairs + session.no_data_pairs)
+        session.add("Chow")
+        self.assertRaises(ValueError, session.add, "Zucker")
+        self.assertTrue("Chow" in session)
+        self.assertEqual(3, len(session))
+
+    def test_d_count_slots(self):
+        from src.compatibility_matrix import NO_DATA_CODE
+        from src.island_report import COUNT_KEYS, count_slot, pair_record
+        self.assertEqual("no_data_pairs", COUNT_KEYS[count_slot(NO_DATA_CODE)])
+        self.assertEqual({"species": None, "personality": None, "star_sign": None, "verdict": None},
+                         pair_record(NO_DATA_CODE))
+        code = self.roster_matrix.get_code_by_ordinal(*self.roster_matrix.get_ordinals(["Bob", "Alice"]))
+        self.assertEqual(pair_record(code)["verdict"].lower() + "_pairs", COUNT_KEYS[count_slot(code)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+import sys
+import unittest
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class OutputFormatsTestCase(DebuggableTestCase):
+    villagers = ["Bob", "Alice", "Verdun", "Chow"]
+
+    @classmethod
+    def setUpClass(cls):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.compatibility_matrix import RosterCompatibilityMatrix
+        from src.utils import calculate_compatibility_matrix
+        cls.data_src = AcListerVillagerDataReader()
+        cls.roster_matrix = RosterCompatibilityMatrix(cls.data_src)
+        cls.expected = calculate_compatibility_matrix(cls.villagers, cls.data_src)
+
+    def expected_fields(self, i, j):
+        from src.utils import evaluate_compatibility
+        comp = self.expected[i][j]
+        if comp is None:
+            return [None] * 4
+        return [comp["species"].name, comp["personality"].name, comp["star_sign"].name,
+                evaluate_compatibility(list(comp.values())).name]
+
+    def test_a_iter_compatibility_matrix(self):
+        from src.utils import iter_compatibility_matrix
+
+        rows = iter_compatibility_matrix(self.villagers, self.data_src)
+        self.assertEqual(self.expected[0], next(rows))
+        self.assertEqual(self.expected[1:], list(rows))
+        self.assertEqual(self.expected, list(iter_compatibility_matrix(self.villagers, self.data_src,
+                                                                       self.roster_matrix)))
+        self.assertRaises(ValueError, next, iter_compatibility_matrix(["Bob", "Nobody"], self.data_src))
+
+    def test_b_ndjson_and_csv(self):
+        from src.compatibility_caculator import compatibility_calculator
+        from src.output_formats import CSV_HEADER
+
+        out = io.StringIO()
+        compatibility_calculator(self.villagers, self.data_src, output_format="ndjson", out=out)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(self.villagers) ** 2, len(records))
+        for idx, record in enumerate(records):
+            i, j = divmod(idx, len(self.villagers))
+            self.assertEqual([self.villagers[i], self.villagers[j]] + self.expected_fields(i, j),
+                             [record[k] for k in CSV_HEADER])
+
+        out = io.StringIO()
+        compatibility_calculator(self.villagers, self.data_src, self.roster_matrix, output_format="csv", out=out)
+        lines = list(csv.reader(io.StringIO(out.getvalue())))
+        self.assertEqual(CSV_HEADER, lines[0])
+        for idx, line in enumerate(lines[1:]):
+            i, j = divmod(idx, len(self.villagers))
+            self.assertEqual([self.villagers[i], self.villagers[j]] + [f or "" for f in self.expected_fields(i, j)],
+                             line)
+
+    def test_c_binary(self):
+        from src.compatibility_caculator import compatibility_calculator
+        from src.output_formats import read_binary_edges
+
+        out = io.BytesIO()
+        compatibility_calculator(self.villagers, self.data_src, output_format="binary", out=out)
+        villagers, edges = read_binary_edges(io.BytesIO(out.getvalue()))
+        self.assertEqual(self.villagers, villagers)
+        self.assertEqual(
+            [(a, b, self.expected[i][j]) for i, a in enumerate(self.villagers) for j, b in enumerate(self.villagers)],
+            list(edges)
+        )
+        self.assertRaises(ValueError, read_binary_edges, io.BytesIO(b"NOTEDGES" + bytes(6)))
+
+    def test_d_unique_pairs(self):
+        from src.compatibility_caculator import compatibility_calculator
+        from src.output_formats import read_binary_edges
+
+        out = io.StringIO()
+        compatibility_calculator(self.villagers, self.data_src, output_format="ndjson", out=out, unique_pairs=True)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        n = len(self.villagers)
+        self.assertEqual(n * (n - 1) // 2, len(records))
+        pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+        for (i, j), record in zip(pairs, records):
+            self.assertEqual([self.villagers[i], self.villagers[j]], [record["villager_a"], record["villager_b"]])
+            self.assertEqual(self.expected_fields(i, j), [record[k] for k in ["species", "personality", "star_sign",
+                                                                              "verdict"]])
+
+        out = io.BytesIO()
+        compatibility_calculator(self.villagers, self.data_src, self.roster_matrix, output_format="binary", out=out,
+                                 unique_pairs=True)
+        _, edges = read_binary_edges(io.BytesIO(out.getvalue()))
+        self.assertEqual([(self.villagers[i], self.villagers[j], self.expected[i][j]) for i, j in pairs], list(edges))
+
+    def test_e_errors(self):
+        from src.compatibility_caculator import compatibility_calculator
+
+        for output_format in ["ndjson", "csv"]:
+            out = io.StringIO()
+            self.assertRaises(ValueError, compatibility_calculator, ["Bob", "Nobody"], self.data_src,
+                              output_format=output_format, out=out)
+            self.assertEqual("", out.getvalue())
+        self.assertRaises(ValueError, compatibility_calculator, ["Bob"], self.data_src, output_format="xml",
+                          out=io.StringIO())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import contextlib
+import io
+import sys
+import unittest
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class ProfilingTestCase(DebuggableTestCase):
+    def test_a_stages(self):
+        from src.compatibility_caculator import compatibility_calculator
+        from src.data_reader import AcListerVillagerDataReader
+        from src.profiling import profiling, get_active_profiler
+
+        recorded = []
+        with profiling() as profiler:
+            profiler.add_hook(lambda name, seconds: recorded.append(name))
+            data_src = AcListerVillagerDataReader()
+            with contextlib.redirect_stdout(io.StringIO()):
+                compatibility_calculator(["Bob", "Alice", "Chow"], data_src)
+        self.assertIsNone(get_active_profiler())
+
+        stats = profiler.stats()
+        self.assertEqual(["load", "lookup", "matrix", "verdict", "render"], list(stats.keys()))
+        self.assertEqual(9, stats["verdict"][0])
+        self.assertEqual(2, stats["render"][0])
+        self.assertEqual(3, stats["matrix"][0])
+        self.assertGreaterEqual(stats["lookup"][0], 3)
+        self.assertTrue(all(seconds >= 0 for _, seconds in stats.values()))
+        self.assertEqual(sum(calls for calls, _ in stats.values()), len(recorded))
+        self.assertIn("verdict", profiler.format_table())
+
+        # Nothing is recorded once the profiler is no longer active
+        with contextlib.redirect_stdout(io.StringIO()):
+            compatibility_calculator(["Bob", "Alice"], data_src)
+        self.assertEqual(stats, profiler.stats())
+
+    def test_b_prometheus(self):
+        from src.profiling import Profiler
+
+        profiler = Profiler()
+        profiler.record("matrix", 0.5)
+        profiler.record("matrix", 0.25)
+        profiler.record("custom", 1.0)
+        lines = profiler.to_prometheus().splitlines()
+        self.assertIn("# TYPE villager_compatibility_stage_calls_total counter", lines)
+        self.assertIn('villager_compatibility_stage_calls_total{stage="matrix"} 2', lines)
+        self.assertIn('villager_compatibility_stage_seconds_total{stage="matrix"} 0.75', lines)
+        self.assertIn('villager_compatibility_stage_calls_total{stage="custom"} 1', lines)
+        profiler.reset()
+        self.assertEqual({}, profiler.stats())
+
+    def test_c_http_metrics(self):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.http_api import CompatibilityApi
+        from src.profiling import profiling
+
+        api = CompatibilityApi(AcListerVillagerDataReader())
+        self.assertEqual(404, api.handle("GET", "/metrics")[0])
+        with profiling():
+            api.handle("GET", "/island?villagers=Bob,Alice")
+            status, metrics = api.handle("GET", "/metrics")
+        self.assertEqual(200, status)
+        self.assertIn('villager_compatibility_stage_calls_total{stage="matrix"} 1', metrics.splitlines())
+
+
+if __name__ == '__main__':
+    unittest.main()
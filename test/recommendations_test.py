@@ -0,0 +1,74 @@
+import sys
+import unittest
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class RecommendationsTestCase(DebuggableTestCase):
+    @classmethod
+    def setUpClass(cls):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.compatibility_matrix import RosterCompatibilityMatrix
+        cls.data_src = AcListerVillagerDataReader()
+        cls.roster_matrix = RosterCompatibilityMatrix(cls.data_src)
+
+    def candidates(self, island):
+        return [v for v in self.roster_matrix.villager_ids
+                if v not in island and self.roster_matrix.get_compatibility(v, v) is not None]
+
+    def test_a_top_k(self):
+        from src.island_report import island_report
+        from src.recommendations import recommend
+        island = ["Bob", "Alice", "Chow", "Bree", "Felicity", "Zucker"]
+        before = island_report(self.roster_matrix, island)
+        expected = []
+        for candidate in self.candidates(island):
+            after = island_report(self.roster_matrix, island + [candidate])
+            expected.append({"villager": candidate,
+                             "good_pairs_added": after["good_pairs"] - before["good_pairs"],
+                             "bad_pairs_added": after["bad_pairs"] - before["bad_pairs"]})
+        expected.sort(key=lambda c: (-c["good_pairs_added"], c["bad_pairs_added"]))
+
+        report = recommend(self.roster_matrix, island, k=15)
+        self.assertEqual(before["good_pairs"], report["good_pairs"])
+        self.assertEqual(before["bad_pairs"], report["bad_pairs"])
+        self.assertEqual(expected[:15], report["candidates"])
+        self.assertEqual(len(expected), len(recommend(self.roster_matrix, island, k=10000)["candidates"]))
+        self.assertEqual([], recommend(self.roster_matrix, island, k=0)["candidates"])
+
+    def test_b_best_swap(self):
+        from src.island_report import island_report
+        from src.recommendations import recommend
+        for island in [["Bob", "Alice", "Chow", "Bree", "Felicity", "Zucker"], ["Audie", "Verdun"], ["Bob"]]:
+            best = None
+            for idx, villager_out in enumerate(island):
+                for candidate in self.candidates(island):
+                    after = island_report(self.roster_matrix, island[:idx] + [candidate] + island[idx + 1:])
+                    key = (after["good_pairs"], -after["bad_pairs"])
+                    if best is None or key > best:
+                        best = key
+            swap = recommend(self.roster_matrix, island)["best_swap"]
+            self.assertEqual(best, (swap["good_pairs"], -swap["bad_pairs"]))
+            swapped = [swap["villager_in"] if v == swap["villager_out"] else v for v in island]
+            after = island_report(self.roster_matrix, swapped)
+            self.assertEqual((after["good_pairs"], after["bad_pairs"]), (swap["good_pairs"], swap["bad_pairs"]))
+        self.assertIsNone(recommend(self.roster_matrix, [])["best_swap"])
+
+    def test_c_errors(self):
+        from src.recommendations import recommend
+        self.assertRaises(ValueError, recommend, self.roster_matrix, ["Bob", "Nobody"])
+        self.assertRaises(ValueError, recommend, self.roster_matrix, ["Bob", "Bob"])
+        self.assertRaises(ValueError, recommend, self.roster_matrix, ["Bob"], -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
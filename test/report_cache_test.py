@@ -0,0 +1,147 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from src.utils import get_villager_data_path, get_personality_compatibility_data_path
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class IslandReportCacheTestCase(DebuggableTestCase):
+    def setUp(self):
+        from src.data_reader import AcListerVillagerDataReader
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_loc = os.path.join(self.tmp_dir, "reports.sqlite")
+        self.aclister_loc = os.path.join(self.tmp_dir, "villager.json")
+        shutil.copy(get_villager_data_path(), self.aclister_loc)
+        self.data_files = [self.aclister_loc, get_personality_compatibility_data_path()]
+        self.data_src = AcListerVillagerDataReader(self.aclister_loc, use_snapshot=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_a_matrix_any_order(self):
+        from src.report_cache import IslandReportCache
+        from src.utils import calculate_compatibility_matrix
+        island = ["Bob", "Alice", "Verdun", "Chow"]
+        reordered = ["Chow", "Verdun", "Bob", "Alice"]
+        with IslandReportCache(self.cache_loc, data_files=self.data_files) as cache:
+            expected = calculate_compatibility_matrix(island, self.data_src)
+            self.assertEqual(expected, calculate_compatibility_matrix(island, self.data_src, report_cache=cache))
+            self.assertEqual((0, 1), (cache.hits, cache.misses))
+        with IslandReportCache(self.cache_loc, data_files=self.data_files) as cache:
+            self.assertEqual(calculate_compatibility_matrix(reordered, self.data_src),
+                             calculate_compatibility_matrix(reordered, self.data_src, report_cache=cache))
+            self.assertEqual((1, 0), (cache.hits, cache.misses))
+            self.assertEqual(1, len(cache))
+            duplicated = ["Bob", "Chow", "Bob"]
+            self.assertEqual(calculate_compatibility_matrix(duplicated, self.data_src),
+                             calculate_compatibility_matrix(duplicated, self.data_src, report_cache=cache))
+            self.assertEqual(calculate_compatibility_matrix(duplicated, self.data_src),
+                             calculate_compatibility_matrix(duplicated, self.data_src, report_cache=cache))
+            self.assertRaises(ValueError, calculate_compatibility_matrix, ["Bob", "Nobody"], self.data_src,
+                              report_cache=cache)
+            self.assertEqual(2, len(cache))
+
+    def test_b_grid(self):
+        from src.compatibility_caculator import compatibility_calculator
+        from src.report_cache import IslandReportCache
+        island = ["Bob", "Alice", "Chow"]
+        with redirect_stdout(io.StringIO()) as expected:
+            compatibility_calculator(island, self.data_src)
+        with IslandReportCache(self.cache_loc, data_files=self.data_files) as cache:
+            for hits in [0, 1]:
+                with redirect_stdout(io.StringIO()) as out:
+                    compatibility_calculator(island, self.data_src, report_cache=cache)
+                self.assertEqual(expected.getvalue(), out.getvalue())
+                self.assertEqual(hits, cache.hits)
+
+    def test_c_eviction_and_invalidation(self):
+        from src.report_cache import IslandReportCache
+        islands = [["Bob", "Alice"], ["Bob", "Chow"], ["Alice", "Chow"]]
+        with IslandReportCache(self.cache_loc, max_entries=2, data_files=self.data_files) as cache:
+            cache.put_codes(islands[0], [[1, 2], [2, 1]])
+            cache.put_codes(islands[1], [[1, 3], [3, 1]])
+            self.assertEqual([[1, 2], [2, 1]], cache.get_codes(islands[0]))
+            cache.put_codes(islands[2], [[1, 4], [4, 1]])
+            self.assertEqual(2, len(cache))
+            # The least recently used island is gone
+            self.assertIsNone(cache.get_codes(islands[1]))
+            self.assertEqual([[1, 4], [4, 1]], cache.get_codes(["Chow", "Alice"]))
+
+        with IslandReportCache(self.cache_loc, data_files=self.data_files) as cache:
+            self.assertEqual(2, len(cache))
+        with open(self.aclister_loc, "a") as fp:
+            fp.write("\n")
+        with IslandReportCache(self.cache_loc, data_files=self.data_files) as cache:
+            self.assertEqual(0, len(cache))
+        self.assertRaises(ValueError, IslandReportCache, self.cache_loc, 0, self.data_files)
+
+    def test_d_other_data_src(self):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.report_cache import IslandReportCache, default_data_files
+        from src.utils import calculate_compatibility_matrix
+        from src.villager_sources import MergedVillagerDataReader
+        island = ["Bob", "Alice"]
+        with IslandReportCache(self.cache_loc, data_files=self.data_files) as cache:
+            # The default villager DB is not the one the cache is bound to, nor are villagers without data files
+            for data_src in [AcListerVillagerDataReader(),
+                             AcListerVillagerDataReader(raw_data=self.data_src.raw_data)]:
+                self.assertRaises(ValueError, calculate_compatibility_matrix, island, data_src, report_cache=cache)
+            self.assertEqual(0, len(cache))
+
+        merged = MergedVillagerDataReader([self.aclister_loc], use_cache=False)
+        self.assertEqual(default_data_files(merged)[0], self.aclister_loc)
+        with IslandReportCache(self.cache_loc, data_src=merged) as cache:
+            calculate_compatibility_matrix(island, merged, report_cache=cache)
+            calculate_compatibility_matrix(island, self.data_src, report_cache=cache)
+            self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_e_machine_readable(self):
+        from src.compatibility_caculator import compatibility_calculator
+        from src.report_cache import IslandReportCache
+        island = ["Bob", "Alice", "Chow"]
+        with IslandReportCache(self.cache_loc, data_files=self.data_files) as cache:
+            for output_format in ["ndjson", "csv"]:
+                for unique_pairs in [False, True]:
+                    expected, out = io.StringIO(), io.StringIO()
+                    compatibility_calculator(island, self.data_src, output_format=output_format, out=expected,
+                                             unique_pairs=unique_pairs)
+                    compatibility_calculator(island, self.data_src, output_format=output_format, out=out,
+                                             unique_pairs=unique_pairs, report_cache=cache)
+                    self.assertEqual(expected.getvalue(), out.getvalue())
+            self.assertEqual((3, 1), (cache.hits, cache.misses))
+
+
+    def test_f_stale_writer(self):
+        from src.report_cache import IslandReportCache
+        island = ["Bob", "Alice"]
+        with IslandReportCache(self.cache_loc, data_files=self.data_files) as old_cache:
+            with open(self.aclister_loc, "a") as fp:
+                fp.write("\n")
+            with IslandReportCache(self.cache_loc, data_files=self.data_files) as new_cache:
+                # Computed from the data files before the change, never served to the process that saw the change
+                old_cache.put_codes(island, [[1, 2], [2, 1]])
+                self.assertEqual([[1, 2], [2, 1]], old_cache.get_codes(island))
+                self.assertIsNone(new_cache.get_codes(island))
+                self.assertEqual(0, len(new_cache))
+                new_cache.put_codes(island, [[1, 3], [3, 1]])
+                self.assertEqual([[1, 3], [3, 1]], new_cache.get_codes(island))
+                self.assertEqual([[1, 2], [2, 1]], old_cache.get_codes(island))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from src.data_model import Personality, Species
+from src.utils import get_villager_data_path, get_personality_compatibility_data_path
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class RosterSnapshotTestCase(DebuggableTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.aclister_loc = os.path.join(self.tmp_dir, "villager.json")
+        shutil.copy(get_villager_data_path(), self.aclister_loc)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_a_same_data_as_json(self):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.roster_snapshot import compile_snapshot
+        compile_snapshot(self.aclister_loc, get_personality_compatibility_data_path())
+
+        json_reader = AcListerVillagerDataReader(aclister_loc=self.aclister_loc, use_snapshot=False)
+        snapshot_reader = AcListerVillagerDataReader(aclister_loc=self.aclister_loc)
+        self.assertFalse(json_reader.from_snapshot)
+        self.assertTrue(snapshot_reader.from_snapshot)
+
+        self.assertEqual(json_reader.get_all_villager_ids(), snapshot_reader.get_all_villager_ids())
+        for villager_id in json_reader.get_all_villager_ids():
+            self.assertEqual(
+                json_reader.get_data_by_villager_id(villager_id), snapshot_reader.get_data_by_villager_id(villager_id)
+            )
+        self.assertEqual(None, snapshot_reader.get_data_by_villager_id("qwertyQWERTY"))
+        self.assertEqual(
+            json_reader.get_raw_data_by_villager_id("Carmen (2)"),
+            snapshot_reader.get_raw_data_by_villager_id("Carmen (2)")
+        )
+
+    def test_b_stale_snapshot_falls_back_to_json(self):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.roster_snapshot import compile_snapshot
+        compile_snapshot(self.aclister_loc, get_personality_compatibility_data_path())
+        with open(self.aclister_loc, "a") as fp:
+            fp.write("\n")
+        self.assertFalse(AcListerVillagerDataReader(aclister_loc=self.aclister_loc).from_snapshot)
+
+        with open(os.path.join(self.tmp_dir, "villager.snapshot"), "wb") as fp:
+            fp.write(b"garbage")
+        self.assertFalse(AcListerVillagerDataReader(aclister_loc=self.aclister_loc).from_snapshot)
+
+    def test_c_personality_table(self):
+        from src.roster_snapshot import compile_snapshot, RosterSnapshot
+        from src.utils import calculate_compatibility_score_by_personality
+        snapshot = RosterSnapshot(compile_snapshot(self.aclister_loc, get_personality_compatibility_data_path()))
+        self.assertEqual(len(Personality) ** 2, len(snapshot.get_personality_marks()))
+        for (p1, p2), mark_value in snapshot.get_personality_marks().items():
+            self.assertEqual(calculate_compatibility_score_by_personality(p1, p2).value, mark_value)
+        snapshot.close()
+
+
+    def test_d_species_table(self):
+        from src.roster_snapshot import compile_snapshot, open_fresh_snapshot
+        from src.utils import calculate_compatibility_score_by_species, get_species_compatibility_data_path
+        species_loc = os.path.join(self.tmp_dir, "species_compatibility.json")
+        shutil.copy(get_species_compatibility_data_path(), species_loc)
+        compile_snapshot(self.aclister_loc, get_personality_compatibility_data_path(), species_comp_loc=species_loc)
+
+        snapshot = open_fresh_snapshot(self.aclister_loc, get_personality_compatibility_data_path(),
+                                       species_comp_loc=species_loc)
+        self.assertEqual(len(Species) ** 2, len(snapshot.get_species_marks()))
+        for (s1, s2), mark_value in snapshot.get_species_marks().items():
+            self.assertEqual(calculate_compatibility_score_by_species(s1, s2).value, mark_value)
+        snapshot.close()
+
+        # Editing the species rules makes the snapshot stale
+        with open(species_loc, "a") as fp:
+            fp.write("\n")
+        self.assertIsNone(open_fresh_snapshot(self.aclister_loc, get_personality_compatibility_data_path(),
+                                              species_comp_loc=species_loc))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -201,5 +201,92 @@ class UtilsTestCase(DebuggableTestCase):
         self.assertEqual(None, check("Zucker", "Verdun"))
 
 
+    def test_g_compiled_rule_tables(self):
+        import itertools
+        from src.utils import (
+            evaluate_compatibility, get_star_sign_by_birthday, _evaluate_marks, _star_sign_by_day
+        )
+        self.assertEqual(366, len(_star_sign_by_day))
+        for birth in [(2, 30), (4, 31), (6, 0), (12, 32)]:
+            self.assertRaises(ValueError, get_star_sign_by_birthday, birth)
+        self.assertEqual(StarSigns.Capricorn, get_star_sign_by_birthday((12, 31)))
+
+        for marks in itertools.product(CompatibilityScoreMark, repeat=3):
+            self.assertEqual(_evaluate_marks(list(marks)), evaluate_compatibility(list(marks)))
+
+    def test_h_species_rules_file(self):
+        import json
+        import os
+        import tempfile
+        from src.utils import (
+            calculate_compatibility_score_by_species, get_species_compatibility_data_path,
+            load_species_compatibility_data
+        )
+        with open(get_species_compatibility_data_path(), "r", encoding="utf-8") as fp:
+            rules = json.load(fp)
+        self.assertEqual(len(Species), len(rules))
+        for s1 in Species:
+            for s2 in Species:
+                self.assertEqual(rules[s1.name][s2.name],
+                                 calculate_compatibility_score_by_species(s1, s2).get_text())
+
+        tmp_dir = tempfile.mkdtemp()
+        tweaked_loc = os.path.join(tmp_dir, "species_compatibility.json")
+        try:
+            rules["Penguin"]["Octopus"] = rules["Octopus"]["Penguin"] = "♥"
+            with open(tweaked_loc, "w", encoding="utf-8") as fp:
+                json.dump(rules, fp, ensure_ascii=False)
+            load_species_compatibility_data(tweaked_loc)
+            self.assertEqual(CompatibilityScoreMark.HEART,
+                             calculate_compatibility_score_by_species(Species.Octopus, Species.Penguin))
+
+            # A one-way rule is refused, the loaded table stays
+            rules["Alligator"]["Anteater"] = "×"
+            rules["Anteater"]["Alligator"] = "♣"
+            with open(tweaked_loc, "w", encoding="utf-8") as fp:
+                json.dump(rules, fp, ensure_ascii=False)
+            self.assertRaisesRegex(ValueError, "Alligator / Anteater", load_species_compatibility_data, tweaked_loc)
+            self.assertEqual(CompatibilityScoreMark.HEART,
+                             calculate_compatibility_score_by_species(Species.Octopus, Species.Penguin))
+
+            del rules["Penguin"]["Octopus"]
+            with open(tweaked_loc, "w", encoding="utf-8") as fp:
+                json.dump(rules, fp, ensure_ascii=False)
+            self.assertRaises(ValueError, load_species_compatibility_data, tweaked_loc)
+        finally:
+            load_species_compatibility_data()
+            os.remove(tweaked_loc)
+            os.rmdir(tmp_dir)
+        self.assertEqual(CompatibilityScoreMark.CLOVER,
+                         calculate_compatibility_score_by_species(Species.Octopus, Species.Penguin))
+
+    def test_i_concurrent_personality_load(self):
+        import threading
+        import src.utils
+        from src.utils import calculate_compatibility_score_by_personality
+        expected = {(p1, p2): calculate_compatibility_score_by_personality(p1, p2)
+                    for p1 in Personality for p2 in Personality}
+        errors = []
+        barrier = threading.Barrier(8)
+
+        def look_up():
+            barrier.wait()
+            try:
+                for (p1, p2), mark in expected.items():
+                    if calculate_compatibility_score_by_personality(p1, p2) != mark:
+                        errors.append((p1, p2))
+            except Exception as e:
+                errors.append(e)
+
+        for _ in range(5):
+            src.utils._personality_comp_score_matrix = dict()
+            threads = [threading.Thread(target=look_up) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual([], errors)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,99 @@
+import sys
+import unittest
+
+from src import vectorized_engine
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+@unittest.skipUnless(vectorized_engine.is_available(), "numpy is not installed")
+class VectorizedEngineTestCase(DebuggableTestCase):
+    @classmethod
+    def setUpClass(cls):
+        from src.data_reader import AcListerVillagerDataReader
+        cls.data_src = AcListerVillagerDataReader()
+
+    def test_a_same_matrix_as_python_engine(self):
+        from src.utils import calculate_compatibility_matrix
+        villagers = self.data_src.get_all_villager_ids()[::5] + ["Verdun", "Zucker"]
+        self.assertEqual(
+            calculate_compatibility_matrix(villagers, self.data_src, engine="python"),
+            calculate_compatibility_matrix(villagers, self.data_src, engine="numpy")
+        )
+
+    def test_b_batch_pairs(self):
+        from src.utils import calc_villager_compatibility, evaluate_compatibility
+        villagers_a = [self.data_src.get_data_by_villager_id(v) for v in ["Zucker", "Audie", "Megan", "Verdun"]]
+        villagers_b = [self.data_src.get_data_by_villager_id(v) for v in ["Vivian", "Jakey", "Dom"]]
+        arrays = vectorized_engine.calc_villager_compatibility_batch(villagers_a, villagers_b)
+        for i, va in enumerate(villagers_a):
+            for j, vb in enumerate(villagers_b):
+                expected = calc_villager_compatibility(va, vb)
+                self.assertEqual(expected is not None, bool(arrays["valid"][i, j]))
+                if expected is None:
+                    continue
+                self.assertEqual(expected["species"].value, arrays["species"][i, j])
+                self.assertEqual(expected["personality"].value, arrays["personality"][i, j])
+                self.assertEqual(expected["star_sign"].value, arrays["star_sign"][i, j])
+                self.assertEqual(evaluate_compatibility(list(expected.values())).value, arrays["verdict"][i, j])
+
+    def test_c_roster_matrix(self):
+        from src.compatibility_matrix import RosterCompatibilityMatrix
+        python_matrix = RosterCompatibilityMatrix(self.data_src, engine="python")
+        numpy_matrix = RosterCompatibilityMatrix(self.data_src, engine="numpy")
+        villagers = self.data_src.get_all_villager_ids()
+        self.assertEqual(python_matrix.sub_matrix(villagers), numpy_matrix.sub_matrix(villagers))
+        # The numpy engine doesn't go through the villager classes, they are only built when asked for
+        self.assertIsNone(numpy_matrix._villager_classes)
+        self.assertEqual(len(python_matrix.villager_classes), len(numpy_matrix.villager_classes))
+
+    def test_d_invalid_engine(self):
+        from src.utils import calculate_compatibility_matrix
+        self.assertRaises(ValueError, calculate_compatibility_matrix, ["Zucker"], self.data_src, None, "fortran")
+
+    def test_e_species_rules_reload(self):
+        import json
+        import os
+        import tempfile
+        from src.compatibility_matrix import RosterCompatibilityMatrix
+        from src.data_model import CompatibilityScoreMark
+        from src.utils import calculate_compatibility_matrix, get_species_compatibility_data_path, \
+            load_species_compatibility_data
+        villagers = ["Aurora", "Octavian", "Bob"]
+        # Warm up the lookup tables with the shipped rules
+        calculate_compatibility_matrix(villagers, self.data_src, engine="numpy")
+        with open(get_species_compatibility_data_path(), "r", encoding="utf-8") as fp:
+            rules = json.load(fp)
+
+        tmp_dir = tempfile.mkdtemp()
+        tweaked_loc = os.path.join(tmp_dir, "species_compatibility.json")
+        try:
+            rules["Penguin"]["Octopus"] = rules["Octopus"]["Penguin"] = "♥"
+            with open(tweaked_loc, "w", encoding="utf-8") as fp:
+                json.dump(rules, fp, ensure_ascii=False)
+            load_species_compatibility_data(tweaked_loc)
+            python_matrix = calculate_compatibility_matrix(villagers, self.data_src, engine="python")
+            self.assertEqual(CompatibilityScoreMark.HEART, python_matrix[0][1]["species"])
+            self.assertEqual(python_matrix, calculate_compatibility_matrix(villagers, self.data_src, engine="numpy"))
+            self.assertEqual(RosterCompatibilityMatrix(self.data_src, engine="python").sub_matrix(villagers),
+                             RosterCompatibilityMatrix(self.data_src, engine="numpy").sub_matrix(villagers))
+        finally:
+            load_species_compatibility_data()
+            os.remove(tweaked_loc)
+            os.rmdir(tmp_dir)
+        python_matrix = calculate_compatibility_matrix(villagers, self.data_src, engine="python")
+        self.assertEqual(CompatibilityScoreMark.CLOVER, python_matrix[0][1]["species"])
+        self.assertEqual(python_matrix, calculate_compatibility_matrix(villagers, self.data_src, engine="numpy"))
+
+
+if __name__ == '__main__':
+    unittest.main()
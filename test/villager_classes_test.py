@@ -0,0 +1,69 @@
+import sys
+import unittest
+
+from src.data_model import Compatibility
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class VillagerClassesTestCase(DebuggableTestCase):
+    @classmethod
+    def setUpClass(cls):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.villager_classes import VillagerClasses
+        cls.data_src = AcListerVillagerDataReader()
+        cls.classes = VillagerClasses(cls.data_src)
+
+    def test_a_buckets(self):
+        from src.utils import get_star_sign_by_birthday, get_star_sign_group
+        villager_ids = self.data_src.get_all_villager_ids()
+        self.assertEqual(villager_ids, self.classes.villager_ids)
+        self.assertLess(len(self.classes), len(villager_ids))
+        self.assertLessEqual(len(self.classes), 35 * 8 * 4)
+        members = []
+        for class_id in range(len(self.classes)):
+            species, personality, group = self.classes.get_class_key(class_id)
+            for villager_id in self.classes.get_members(class_id):
+                v = self.data_src.get_data_by_villager_id(villager_id)
+                self.assertEqual((species, personality, group),
+                                 (v.species, v.personality, get_star_sign_group(get_star_sign_by_birthday(v.birthday))))
+                self.assertEqual(class_id, self.classes.get_class(villager_id))
+            members.extend(self.classes.get_members(class_id))
+        self.assertEqual(sorted(v for v in villager_ids if self.classes.get_class(v) is not None), sorted(members))
+        self.assertIsNone(self.classes.get_class("Verdun"))
+        self.assertEqual(sorted(members), sorted(self.classes.expand(range(len(self.classes)))))
+        self.assertRaises(ValueError, self.classes.get_class, "qwertyQWERTY")
+
+    def test_b_same_as_calc_villager_compatibility(self):
+        from src.utils import calc_villager_compatibility
+        villagers = self.data_src.get_all_villager_ids()[::7] + ["Verdun", "Zucker", "Audie"]
+        for villager_a in villagers:
+            data_a = self.data_src.get_data_by_villager_id(villager_a)
+            for villager_b in villagers:
+                self.assertEqual(calc_villager_compatibility(data_a, self.data_src.get_data_by_villager_id(villager_b)),
+                                 self.classes.get_compatibility(villager_a, villager_b))
+
+    def test_c_partners(self):
+        from src.compatibility_index import CompatibilityIndex
+        from src.compatibility_matrix import RosterCompatibilityMatrix
+        roster_matrix = RosterCompatibilityMatrix(self.data_src)
+        self.assertEqual(len(self.classes), len(roster_matrix.villager_classes))
+        index = CompatibilityIndex(self.data_src, roster_matrix)
+        for villager_id in ["Bob", "Zucker", "Audie"]:
+            for verdict in Compatibility:
+                self.assertEqual(list(index.get_partners(villager_id, verdict)),
+                                 sorted(self.classes.get_partners(villager_id, verdict)))
+        self.assertEqual([], self.classes.get_partners("Verdun", "good"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from src.data_model import Personality, Species
+from src.utils import get_villager_data_path, get_data_dir_path
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class VillagerSourcesTestCase(DebuggableTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.aclister_loc = os.path.join(self.tmp_dir, "villager.json")
+        shutil.copy(get_villager_data_path(), self.aclister_loc)
+        self.acnh_loc = os.path.join(get_data_dir_path(), "test", "acnh_villager")
+        self.patch_loc = os.path.join(self.tmp_dir, "patch.txt")
+        with open(self.patch_loc, "w") as fp:
+            fp.write("# New villagers\n\nVerdun/Bear/Cranky/March 1\nNewbie/Cat/Peppy/July 4\nBob/Tiger\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_a_formats(self):
+        from src.villager_sources import guess_source_format, parse_name_species_source
+        self.assertEqual("aclister", guess_source_format(self.aclister_loc))
+        self.assertEqual("name-species", guess_source_format(self.acnh_loc))
+        self.assertEqual("name-species", guess_source_format(self.patch_loc))
+        self.assertRaises(ValueError, guess_source_format, "roster.xml")
+
+        records = parse_name_species_source(self.acnh_loc)
+        self.assertEqual({"id": "Admiral", "name": "Admiral", "species": "Bird"},
+                         {k: v for k, v in records[0].items() if v is not None})
+        for bad_line in ["Bob", "Bob/Dragon", "Bob/Cat/Grumpy", "Bob/Cat/Lazy/Smarch 1",
+                         "Bob/Cat/Lazy/February 30"]:
+            bad_loc = os.path.join(self.tmp_dir, "bad.txt")
+            with open(bad_loc, "w") as fp:
+                fp.write(bad_line + "\n")
+            self.assertRaises(ValueError, parse_name_species_source, bad_loc)
+
+    def test_b_merge_precedence(self):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.villager_sources import MergedVillagerDataReader
+        aclister = AcListerVillagerDataReader(self.aclister_loc, use_snapshot=False)
+        merged = MergedVillagerDataReader([self.aclister_loc, self.acnh_loc, self.patch_loc], use_cache=False)
+        self.assertEqual(aclister.get_all_villager_ids() + ["Newbie"], merged.get_all_villager_ids())
+
+        # Only the fields the later sources know are replaced
+        self.assertEqual(aclister.get_data_by_villager_id("Alice"), merged.get_data_by_villager_id("Alice"))
+        bob = merged.get_data_by_villager_id("Bob")
+        self.assertEqual((Species.Tiger, Personality.Lazy, (1, 1)), (bob.species, bob.personality, bob.birthday))
+        verdun = merged.get_data_by_villager_id("Verdun")
+        self.assertEqual((Species.Bear, Personality.Cranky, (3, 1)),
+                         (verdun.species, verdun.personality, verdun.birthday))
+        newbie = merged.get_data_by_villager_id("Newbie")
+        self.assertEqual(("Newbie", "", Species.Cat), (newbie.name, newbie.wiki, newbie.species))
+
+        acnh_only = MergedVillagerDataReader([self.acnh_loc], use_cache=False)
+        self.assertIsNone(acnh_only.get_data_by_villager_id("Admiral").personality)
+        self.assertIsNone(merged.get_data_by_villager_id("qwertyQWERTY"))
+
+    def test_c_cache(self):
+        from src.villager_sources import MergedVillagerDataReader, merge_sources
+        cache_loc = os.path.join(self.tmp_dir, "merged.json")
+        sources = [self.aclister_loc, (self.patch_loc, "name-species")]
+        first = MergedVillagerDataReader(sources, cache_loc)
+        self.assertFalse(first.from_cache)
+        second = MergedVillagerDataReader(sources, cache_loc)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(merge_sources(sources), second.raw_data)
+        self.assertFalse(MergedVillagerDataReader(sources[::-1], cache_loc).from_cache)
+
+        with open(self.patch_loc, "a") as fp:
+            fp.write("Latecomer/Dog\n")
+        third = MergedVillagerDataReader(sources, cache_loc)
+        self.assertFalse(third.from_cache)
+        self.assertIn("Latecomer", third.get_all_villager_ids())
+
+        with open(cache_loc, "w") as fp:
+            fp.write("garbage")
+        self.assertFalse(MergedVillagerDataReader(sources, cache_loc).from_cache)
+        self.assertTrue(MergedVillagerDataReader(sources, cache_loc).from_cache)
+
+    def test_d_errors(self):
+        from src.villager_sources import merge_sources, register_source_format, get_source_formats
+        self.assertRaises(ValueError, merge_sources, [])
+        self.assertRaises(ValueError, merge_sources, [(self.patch_loc, "xml")])
+        with open(self.patch_loc, "a") as fp:
+            fp.write("Newbie/Dog\n")
+        self.assertRaises(ValueError, merge_sources, [self.patch_loc])
+
+        register_source_format("single", lambda path: [{"id": "Solo", "species": "Cat"}], [".solo"])
+        try:
+            self.assertEqual([{"id": "Solo", "name": "", "species": "Cat", "personality": "", "coffee": "",
+                               "birthday": "", "wiki": ""}], merge_sources(["roster.solo"]))
+        finally:
+            from src import villager_sources
+            del villager_sources._source_formats["single"]
+        self.assertNotIn("single", get_source_formats())
+
+
+if __name__ == '__main__':
+    unittest.main()
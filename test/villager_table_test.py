@@ -0,0 +1,80 @@
+import sys
+import unittest
+
+
+class DebuggableTestCase(unittest.TestCase):
+    def __add_error_replacement(self, _, err):
+        value, traceback = err[1:]
+        raise value.with_traceback(traceback)
+
+    def run(self, result=None):
+        if result and sys.gettrace() is not None:
+            result.addError = self.__add_error_replacement
+        super().run(result)
+
+
+class VillagerTableTestCase(DebuggableTestCase):
+    def test_a_same_data_as_reader(self):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.villager_table import VillagerTable
+        from src.utils import get_star_sign_by_birthday
+        data_src = AcListerVillagerDataReader()
+        table = VillagerTable.from_reader(data_src)
+        self.assertEqual(data_src.get_all_villager_ids(), table.get_all_villager_ids())
+        for villager_id in data_src.get_all_villager_ids():
+            expected = data_src.get_data_by_villager_id(villager_id)
+            row = table.get_data_by_villager_id(villager_id)
+            self.assertEqual(expected, row)
+            self.assertEqual(expected.species, row.species)
+            self.assertEqual(expected.personality, row.personality)
+            self.assertEqual(expected.birthday, row.birthday)
+            self.assertEqual(get_star_sign_by_birthday(expected.birthday) if expected.birthday else None, row.star_sign)
+        self.assertEqual(None, table.get_data_by_villager_id("qwertyQWERTY"))
+        self.assertEqual("Verdun", table[table.get_ordinal("Verdun")].villager_id)
+        self.assertRaises(IndexError, table.__getitem__, len(table))
+
+    def test_b_rows_have_no_dict(self):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.villager_table import VillagerTable
+        row = VillagerTable.from_reader(AcListerVillagerDataReader()).get_data_by_villager_id("Ace")
+        self.assertFalse(hasattr(row, "__dict__"))
+        self.assertRaises(AttributeError, setattr, row, "extra", 1)
+
+    def test_c_smaller_than_parsed_reader(self):
+        import gc
+        import tracemalloc
+        from src.data_reader import AcListerVillagerDataReader
+        from src.villager_table import VillagerTable
+
+        tracemalloc.start()
+        try:
+            gc.collect()
+            baseline = tracemalloc.get_traced_memory()[0]
+            data_src = AcListerVillagerDataReader(use_snapshot=False)
+            villagers = data_src.get_many(data_src.get_all_villager_ids())
+            gc.collect()
+            reader_footprint = tracemalloc.get_traced_memory()[0] - baseline
+
+            table = VillagerTable(villagers)
+            del data_src, villagers
+            gc.collect()
+            table_footprint = tracemalloc.get_traced_memory()[0] - baseline
+        finally:
+            tracemalloc.stop()
+        self.assertTrue(len(table))
+        self.assertLess(table_footprint * 2, reader_footprint)
+
+    def test_d_usable_as_data_source(self):
+        from src.data_reader import AcListerVillagerDataReader
+        from src.villager_table import VillagerTable
+        from src.utils import calculate_compatibility_matrix
+        data_src = AcListerVillagerDataReader()
+        villagers = ["Zucker", "Vivian", "Audie", "Jakey", "Verdun"]
+        self.assertEqual(
+            calculate_compatibility_matrix(villagers, data_src),
+            calculate_compatibility_matrix(villagers, VillagerTable.from_reader(data_src))
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()